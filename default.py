@@ -5,6 +5,10 @@ import xbmcaddon
 from resources.lib.simple_logging import SimpleLogging
 from resources.lib.functions import main_entry_point
 from resources.lib.tracking import set_timing_enabled
+from resources.lib.response_cache import response_cache
+from resources.lib.downloadutils import request_single_flight
+from resources.lib.network_stats import network_stats
+from resources.lib.traffic_capture import traffic_capture
 
 log = SimpleLogging('default')
 
@@ -17,5 +21,13 @@ log.debug("About to enter mainEntryPoint()")
 
 main_entry_point()
 
+# save the request stats and captured traffic from this invocation
+network_stats.flush()
+traffic_capture.flush()
+
+if log_timing_data:
+    response_cache.log_stats(force=True)
+    request_single_flight.log_stats(force=True)
+
 # clear done and exit.
 # sys.modules.clear()
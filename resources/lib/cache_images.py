@@ -20,7 +20,7 @@ from .simple_logging import SimpleLogging
 from .jsonrpc import JsonRpc
 from .translation import string_load
 from .datamanager import DataManager
-from .utils import get_art, double_urlencode
+from .utils import ArtworkResolver, double_urlencode
 from .kodi_utils import HomeWindow
 
 downloadUtils = DownloadUtils()
@@ -226,30 +226,30 @@ class CacheArtwork(threading.Thread):
         url += "&ImageTypeLimit=1"
         url += "&format=json"
 
-        data_manager = DataManager()
-        results = data_manager.get_content(url)
-        if results is None:
-            results = []
-
-        if isinstance(results, dict):
-            results = results.get("Items")
-
         server = downloadUtils.get_server()
-        log.debug("Emby Item Count Count: {0}", len(results))
-
-        if self.stop_all_activity:
-            return None
+        artwork = ArtworkResolver(server)
 
         progress.update(0, string_load(30359))
 
         texture_urls = set()
+        item_count = 0
+
+        # stream the items, on a large library the full response does not fit in memory
+        data_manager = DataManager()
+        results = data_manager.get_content_items(url)
 
         # image_types = ["thumb", "poster", "banner", "clearlogo", "tvshow.poster", "tvshow.banner", "tvshow.landscape"]
         for item in results:
-            art = get_art(item, server)
+            if self.stop_all_activity:
+                results.close()
+                return None
+            item_count += 1
+            art = artwork.get_art(item)
             for art_type in art:
                 texture_urls.add(art[art_type])
 
+        log.debug("Emby Item Count Count: {0}", item_count)
+
         return texture_urls
 
     def cache_artwork(self, progress):
@@ -0,0 +1,115 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import time
+from urllib.parse import urlparse, parse_qsl
+
+import xbmc
+
+from .kodi_utils import HomeWindow
+from .simple_logging import SimpleLogging
+from .cache_store import cache_store, get_parent_ids
+from .item_functions import apply_user_data, NoneDict
+
+log = SimpleLogging(__name__)
+
+# query params that make the list contents or order depend on the user data, these are dropped not patched
+USER_DATA_PARAMS = {"filters", "isplayed", "isfavorite", "isresumable"}
+USER_DATA_SORTS = {"dateplayed", "playcount", "isplayed", "isfavoriteorliked", "isunplayed", "random"}
+
+
+def set_websocket_connected(connected):
+    # lists synced after this time are kept up to date by the websocket messages
+    home_window = HomeWindow()
+    if connected:
+        home_window.set_property("websocket_connected_at", str(time.time()))
+    else:
+        home_window.clear_property("websocket_connected_at")
+
+
+def is_kept_in_sync(cached_item):
+    # True when the websocket has been connected since the list was last synced and the
+    # list is linked to its folder so a LibraryChanged message for it would have dropped it
+    connected_at = HomeWindow().get_property("websocket_connected_at")
+    if not connected_at or cached_item.last_sync is None:
+        return False
+    if float(connected_at) > cached_item.last_sync:
+        return False
+    parent_ids = get_parent_ids(cached_item.items_url)
+    if not parent_ids:
+        return False
+    # entries saved before the index existed are not linked yet
+    entries = cache_store.find_entries(parent_ids, cached_item.user_id)
+    return (cached_item.url_hash, cached_item.user_id) in entries
+
+
+def depends_on_user_data(items_url):
+    for name, value in parse_qsl(urlparse(items_url).query):
+        name = name.lower()
+        if name in USER_DATA_PARAMS:
+            return True
+        if name == "sortby":
+            for sort_name in value.lower().split(","):
+                if sort_name in USER_DATA_SORTS:
+                    return True
+    return False
+
+
+def apply_user_data_changes(user_id, user_data_list):
+    # patch the new user data into the cached lists holding the items, returns the number of lists updated
+    from .datamanager import CacheManagerThread
+
+    user_data_by_id = {}
+    for user_data in user_data_list:
+        if user_data.get("ItemId"):
+            user_data_by_id[user_data["ItemId"]] = NoneDict(user_data)
+    if not user_data_by_id:
+        return 0
+
+    last_content_url = HomeWindow().get_property("last_content_url")
+    updated = 0
+    for url_hash, entry_user_id in cache_store.find_entries(user_data_by_id.keys(), user_id):
+        cache_item = cache_store.load(url_hash, entry_user_id)
+        if cache_item is None or not cache_item.item_list:
+            continue
+
+        if depends_on_user_data(cache_item.items_url):
+            log.debug("CacheInvalidation : dropping {0}, it is filtered or sorted by user data", cache_item.items_url)
+            cache_store.delete(url_hash, entry_user_id)
+            continue
+
+        for item in cache_item.item_list:
+            user_data = user_data_by_id.get(item.id)
+            if user_data is not None:
+                apply_user_data(item, user_data)
+
+        cache_item.item_fingerprints = CacheManagerThread.get_fingerprints(cache_item.item_list)
+        cache_item.date_saved = time.time()
+        cache_store.save(cache_item)
+        updated += 1
+
+        if cache_item.items_url == last_content_url:
+            log.debug("CacheInvalidation : Sending container refresh")
+            xbmc.executebuiltin("Container.Refresh")
+
+    log.debug("CacheInvalidation : user data of {0} items patched into {1} lists", len(user_data_by_id), updated)
+    return updated
+
+
+def invalidate_library_changes(user_id, data):
+    # drop only the cached lists of the changed folders and items, returns the number of lists dropped
+    item_ids = set()
+    for name in ["FoldersAddedTo", "FoldersRemovedFrom", "ItemsRemoved", "ItemsUpdated"]:
+        item_ids.update(data.get(name) or [])
+
+    if data.get("ItemsAdded"):
+        # the folders of new items are not always all listed, lists not dropped here are rechecked when viewed
+        set_websocket_connected(True)
+
+    entries = set()
+    if item_ids:
+        entries = cache_store.find_entries(item_ids, user_id)
+    for url_hash, entry_user_id in entries:
+        cache_store.delete(url_hash, entry_user_id)
+
+    log.debug("CacheInvalidation : library change for {0} ids dropped {1} lists", len(item_ids), len(entries))
+    return len(entries)
@@ -0,0 +1,300 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+
+import xbmc
+import xbmcaddon
+import xbmcvfs
+
+from .kodi_utils import HomeWindow
+from .simple_logging import SimpleLogging
+from .settings_snapshot import get_settings
+
+log = SimpleLogging(__name__)
+
+# the folder a list url shows, lists of a changed folder are dropped on a LibraryChanged message
+PARENT_ID_PATTERN = re.compile(r"(?:[?&]ParentId=|[?&]seasonId=|/Shows/)([0-9a-fA-F-]{8,})", re.IGNORECASE)
+
+
+def get_parent_ids(items_url):
+    if not items_url:
+        return set()
+    return set(PARENT_ID_PATTERN.findall(items_url))
+
+
+class CacheStore:
+    """
+        Directory list cache in one SQLite database in WAL mode, one row per url and user.
+        Readers do not block each other or the single writer so no lock files are needed,
+        each thread keeps its connection open for the life of the process,
+        last used, saved date and size are indexed so eviction is one query.
+        The cache_index table maps the item and parent folder ids of each list to its entry
+        so websocket messages can update or drop only the lists they touch.
+    """
+
+    addon_dir = xbmcvfs.translatePath(xbmcaddon.Addon().getAddonInfo('profile'))
+    db_file = os.path.join(addon_dir, "cache.db")
+    busy_timeout = 5
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.schema_ready = False
+        self.local = threading.local()
+
+    def connect(self):
+        # one connection per thread kept open, closing the last connection checkpoints the WAL
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            return conn
+        conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout)
+        # a per connection setting, the default FULL syncs the disk on every commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self.schema_ready:
+            with self.lock:
+                if not self.schema_ready:
+                    self.create_schema(conn)
+                    self.schema_ready = True
+        self.local.conn = conn
+        return conn
+
+    @staticmethod
+    def create_schema(conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_items ("
+                     "url_hash TEXT NOT NULL, "
+                     "user_id TEXT NOT NULL, "
+                     "items_url TEXT, "
+                     "date_saved REAL, "
+                     "date_last_used REAL, "
+                     "size INTEGER, "
+                     "data BLOB, "
+                     "last_sync REAL, "
+                     "PRIMARY KEY (url_hash, user_id))")
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(cache_items)")]
+        if "last_sync" not in columns:
+            conn.execute("ALTER TABLE cache_items ADD COLUMN last_sync REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_items_last_used ON cache_items (date_last_used)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_items_saved ON cache_items (date_saved)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_items_size ON cache_items (size)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_index ("
+                     "item_id TEXT NOT NULL, "
+                     "url_hash TEXT NOT NULL, "
+                     "user_id TEXT NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_index_item ON cache_index (item_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_index_entry ON cache_index (url_hash, user_id)")
+        # evict, delete_unused and clear only touch cache_items
+        conn.execute("CREATE TRIGGER IF NOT EXISTS cache_items_delete AFTER DELETE ON cache_items BEGIN "
+                     "DELETE FROM cache_index WHERE url_hash = old.url_hash AND user_id = old.user_id; END")
+        conn.commit()
+
+    def load(self, url_hash, user_id):
+        conn = self.connect()
+        row = conn.execute("SELECT data, last_sync FROM cache_items WHERE url_hash = ? AND user_id = ?",
+                           (url_hash, user_id)).fetchone()
+        if row is None:
+            return None
+        data, last_sync = row
+
+        cache_item = self.decode(data)
+        # last_sync can be moved on by touch() without saving the data again
+        if last_sync is not None:
+            cache_item.last_sync = last_sync
+        return cache_item
+
+    def exists(self, url_hash, user_id):
+        conn = self.connect()
+        row = conn.execute("SELECT 1 FROM cache_items WHERE url_hash = ? AND user_id = ?",
+                           (url_hash, user_id)).fetchone()
+        return row is not None
+
+    @staticmethod
+    def encode(cache_item):
+        return pickle.dumps(cache_item, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def decode(data):
+        return pickle.loads(data)
+
+    @staticmethod
+    def get_index_ids(cache_item):
+        item_ids = get_parent_ids(cache_item.items_url)
+        if cache_item.item_list:
+            item_ids.update([item.id for item in cache_item.item_list if item.id])
+        return item_ids
+
+    def save(self, cache_item):
+        data = self.encode(cache_item)
+        index_rows = [(item_id, cache_item.url_hash, cache_item.user_id)
+                      for item_id in self.get_index_ids(cache_item)]
+        conn = self.connect()
+        with conn:
+            # REPLACE does not fire the delete trigger, clear the old index rows here
+            conn.execute("DELETE FROM cache_index WHERE url_hash = ? AND user_id = ?",
+                         (cache_item.url_hash, cache_item.user_id))
+            conn.execute("INSERT OR REPLACE INTO cache_items "
+                         "(url_hash, user_id, items_url, date_saved, date_last_used, size, data, last_sync) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (cache_item.url_hash, cache_item.user_id, cache_item.items_url,
+                          cache_item.date_saved, cache_item.date_last_used, len(data), sqlite3.Binary(data),
+                          cache_item.last_sync))
+            conn.executemany("INSERT INTO cache_index (item_id, url_hash, user_id) VALUES (?, ?, ?)", index_rows)
+
+    def touch(self, url_hash, user_id, date_last_used, last_sync=None):
+        # only the index columns, no need to write the data again
+        conn = self.connect()
+        with conn:
+            conn.execute("UPDATE cache_items SET date_last_used = ?, last_sync = COALESCE(?, last_sync) "
+                         "WHERE url_hash = ? AND user_id = ?",
+                         (date_last_used, last_sync, url_hash, user_id))
+
+    def delete(self, url_hash, user_id):
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM cache_items WHERE url_hash = ? AND user_id = ?", (url_hash, user_id))
+
+    def find_entries(self, item_ids, user_id):
+        # (url_hash, user_id) of the cached lists holding any of the item or parent ids
+        item_ids = list(item_ids)
+        entries = set()
+        conn = self.connect()
+        # keep under the sqlite host parameter limit
+        for start in range(0, len(item_ids), 500):
+            chunk = item_ids[start:start + 500]
+            rows = conn.execute("SELECT DISTINCT url_hash, user_id FROM cache_index "
+                                "WHERE user_id = ? AND item_id IN (%s)" % ",".join("?" * len(chunk)),
+                                [user_id] + chunk).fetchall()
+            entries.update(rows)
+        return entries
+
+    def delete_unused(self, max_age):
+        conn = self.connect()
+        with conn:
+            unused = conn.execute("SELECT url_hash, user_id FROM cache_items "
+                                  "WHERE date_last_used IS NULL OR date_last_used < ?",
+                                  (time.time() - max_age,)).fetchall()
+            conn.executemany("DELETE FROM cache_items WHERE url_hash = ? AND user_id = ?", unused)
+        return len(unused)
+
+    def clear(self):
+        conn = self.connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM cache_items")
+            del_count = cursor.rowcount
+            conn.execute("DELETE FROM cache_index")
+        conn.execute("VACUUM")
+        return del_count
+
+    def get_usage(self):
+        conn = self.connect()
+        row = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_items").fetchone()
+        return row[0], row[1]
+
+    def evict(self, max_bytes, max_entries, batch_size=20, should_stop=None):
+        # drop the least recently used entries until both budgets are met, a small batch per transaction
+        # so plugin calls saving a list never wait long on the write lock, returns the number evicted
+        evicted = 0
+        while should_stop is None or not should_stop():
+            count, total_size = self.get_usage()
+            if total_size <= max_bytes and count <= max_entries:
+                break
+
+            conn = self.connect()
+            rows = conn.execute("SELECT url_hash, user_id, size FROM cache_items "
+                                "ORDER BY date_last_used ASC LIMIT ?", (batch_size,)).fetchall()
+            victims = []
+            for url_hash, user_id, size in rows:
+                if total_size <= max_bytes and count <= max_entries:
+                    break
+                victims.append((url_hash, user_id))
+                total_size -= size or 0
+                count -= 1
+            with conn:
+                conn.executemany("DELETE FROM cache_items WHERE url_hash = ? AND user_id = ?", victims)
+            evicted += len(victims)
+            if not victims:
+                break
+        return evicted
+
+    def migrate_pickle_files(self):
+        # move the cache_<hash>.pickle files of older versions into the database
+        migrated = 0
+        for filename in os.listdir(self.addon_dir):
+            file_path = os.path.join(self.addon_dir, filename)
+            if filename.startswith("cache_") and filename.endswith(".pickle"):
+                try:
+                    with open(file_path, "rb") as handle:
+                        cache_item = pickle.load(handle)
+                    cache_item.url_hash = filename[len("cache_"):-len(".pickle")]
+                    if cache_item.user_id is None:
+                        cache_item.user_id = ""
+                    self.save(cache_item)
+                    migrated += 1
+                except Exception as error:
+                    log.error("CacheStore : Could not migrate {0} : {1}", filename, error)
+                os.remove(file_path)
+            elif filename.startswith("cache_") and filename.endswith(".pickle.lock"):
+                os.remove(file_path)
+
+        if migrated > 0:
+            log.info("CacheStore : Migrated {0} pickle cache files", migrated)
+        return migrated
+
+
+cache_store = CacheStore()
+
+
+class CacheEvictionThread(threading.Thread):
+    """
+        Keeps the directory cache inside the size and entry budgets from the settings,
+        evicting least recently used lists in the background, and publishes the usage
+        in the cache_usage_items and cache_usage_bytes home window properties
+    """
+
+    exit_now = False
+    check_interval = 30
+    batch_pause = 0.1
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.home_window = HomeWindow()
+
+    def stop(self):
+        self.exit_now = True
+
+    def should_stop(self):
+        if self.exit_now:
+            return True
+        # let other writers in between batches
+        time.sleep(self.batch_pause)
+        return self.exit_now
+
+    def run(self):
+        log.debug("CacheEvictionThread : Started")
+        monitor = xbmc.Monitor()
+        while not self.exit_now and not monitor.abortRequested():
+
+            settings = get_settings()
+            max_bytes = settings.cache_max_size * 1024 * 1024
+            max_entries = settings.cache_max_entries
+            try:
+                if max_bytes > 0 and max_entries > 0:
+                    evicted = cache_store.evict(max_bytes, max_entries, should_stop=self.should_stop)
+                    if evicted > 0:
+                        log.info("CacheEvictionThread : Evicted {0} cache entries", evicted)
+
+                count, total_size = cache_store.get_usage()
+                self.home_window.set_property("cache_usage_items", str(count))
+                self.home_window.set_property("cache_usage_bytes", str(total_size))
+                log.debug("CacheEvictionThread : Cache usage {0} entries {1} bytes", count, total_size)
+            except Exception as error:
+                log.error("CacheEvictionThread : {0}", error)
+
+            if self.exit_now or monitor.waitForAbort(self.check_interval):
+                break
+
+        log.debug("CacheEvictionThread : Exited")
@@ -0,0 +1,137 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import random
+import threading
+import time
+
+import xbmc
+
+from .kodi_utils import HomeWindow
+from .simple_logging import SimpleLogging
+
+log = SimpleLogging(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+        Tracks connection failures to the server across the plugin and service processes.
+        After failure_threshold failures in a row requests fail fast until the cooling period
+        is over, then one trial request is let through to close it again or reopen it with
+        a longer, jittered, cooling period.
+        The state is kept in the home window, server_circuit_state can be used by skins.
+    """
+
+    failure_threshold = 3
+    base_cooldown = 5
+    max_cooldown = 300
+
+    def __init__(self):
+        self.home_window = HomeWindow()
+        self.lock = threading.Lock()
+
+    def load(self, server):
+        # server|state|failures|attempts|retry_at in one property so each check is one read
+        value = self.home_window.get_property("server_circuit")
+        if value:
+            parts = value.split("|")
+            if len(parts) == 5 and parts[0] == server:
+                return parts[1], int(parts[2]), int(parts[3]), float(parts[4])
+        return STATE_CLOSED, 0, 0, 0.0
+
+    def save(self, server, state, failures, attempts, retry_at):
+        value = "%s|%s|%s|%s|%s" % (server, state, failures, attempts, retry_at)
+        self.home_window.set_property("server_circuit", value)
+        self.home_window.set_property("server_circuit_state", state)
+
+    def get_state(self, server):
+        return self.load(server)[0]
+
+    def is_open(self):
+        # for the service loop and skins, any server
+        return self.home_window.get_property("server_circuit_state") in [STATE_OPEN, STATE_HALF_OPEN]
+
+    def get_retry_at(self):
+        value = self.home_window.get_property("server_circuit")
+        if value:
+            parts = value.split("|")
+            if len(parts) == 5 and parts[1] != STATE_CLOSED:
+                return parts[0], float(parts[4])
+        return None, 0.0
+
+    def allow_request(self, server):
+        with self.lock:
+            state, failures, attempts, retry_at = self.load(server)
+            if state == STATE_CLOSED:
+                return True
+            now = time.time()
+            if now < retry_at:
+                return False
+            # cooling period over, this request is the trial, others keep failing fast while it runs
+            log.info("CircuitBreaker : trial request to {0} after {1} attempts", server, attempts)
+            self.save(server, STATE_HALF_OPEN, failures, attempts, now + self.base_cooldown)
+            return True
+
+    def record_success(self, server):
+        with self.lock:
+            state, failures, attempts, retry_at = self.load(server)
+            if state == STATE_CLOSED and failures == 0:
+                return
+            if state != STATE_CLOSED:
+                log.info("CircuitBreaker : server {0} is reachable again, closing circuit", server)
+            self.save(server, STATE_CLOSED, 0, 0, 0.0)
+
+    def record_failure(self, server):
+        with self.lock:
+            state, failures, attempts, retry_at = self.load(server)
+            failures += 1
+            if state == STATE_HALF_OPEN or failures >= self.failure_threshold:
+                attempts += 1
+                cooldown = min(self.max_cooldown, self.base_cooldown * (2 ** (attempts - 1)))
+                cooldown = random.uniform(cooldown / 2.0, cooldown)
+                log.error("CircuitBreaker : {0} failures to {1}, failing fast for {2:.1f} sec",
+                          failures, server, cooldown)
+                self.save(server, STATE_OPEN, failures, attempts, time.time() + cooldown)
+            else:
+                self.save(server, state, failures, attempts, retry_at)
+
+
+circuit_breaker = CircuitBreaker()
+
+
+class ServerProbeThread(threading.Thread):
+    """
+        While the circuit is open send the trial request when the cooling period
+        ends so it closes again even if nothing else is talking to the server
+    """
+
+    exit_now = False
+    check_interval = 1
+    probe_timeout = 5
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+
+    def stop(self):
+        self.exit_now = True
+
+    def run(self):
+        from .downloadutils import DownloadUtils
+
+        log.debug("ServerProbeThread : Started")
+        monitor = xbmc.Monitor()
+        while not self.exit_now and not monitor.abortRequested():
+
+            server, retry_at = circuit_breaker.get_retry_at()
+            if server and time.time() >= retry_at:
+                log.debug("ServerProbeThread : probing server {0}", server)
+                DownloadUtils().download_url("{server}/emby/System/Info/Public?format=json",
+                                             suppress=True, authenticate=False, timeout=self.probe_timeout)
+
+            if self.exit_now or monitor.waitForAbort(self.check_interval):
+                break
+
+        log.debug("ServerProbeThread : Exited")
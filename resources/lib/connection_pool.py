@@ -0,0 +1,205 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import http.client
+import ssl
+import select
+import threading
+import time
+
+from .simple_logging import SimpleLogging
+
+log = SimpleLogging(__name__)
+
+# errors that mean a kept alive socket was closed by the server while it was idle in the pool
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected,
+                           http.client.BadStatusLine,
+                           http.client.CannotSendRequest,
+                           ConnectionResetError,
+                           ConnectionAbortedError,
+                           BrokenPipeError,
+                           ssl.SSLEOFError)
+
+# methods that are safe to send again when a stale connection drops the response
+RETRY_METHODS = ("GET", "HEAD")
+
+
+class ConnectionPool:
+    """
+        Keep-alive HTTP/HTTPS connections shared between all the threads of a process,
+        idle connections are kept per (protocol, cert check, host:port)
+    """
+
+    max_idle_per_host = 4
+    max_idle_total = 8
+    max_idle_time = 30
+    stats_log_interval = 50
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle_connections = {}
+        self.idle_count = 0
+        self.verified_context = None
+        self.unverified_context = None
+        self.hits = 0
+        self.misses = 0
+        self.retries = 0
+        self.discarded = 0
+
+    def get_ssl_context(self, verify_cert):
+        # building an ssl context loads the cert store, only do it once per process
+        with self.lock:
+            if verify_cert:
+                if self.verified_context is None:
+                    self.verified_context = ssl.create_default_context()
+                return self.verified_context
+            else:
+                if self.unverified_context is None:
+                    self.unverified_context = ssl._create_unverified_context()
+                return self.unverified_context
+
+    def new_connection(self, pool_key, timeout):
+        use_https, verify_cert, server = pool_key
+        if use_https:
+            log.debug("Connection: HTTPS, Cert checked: {0}", verify_cert)
+            conn = http.client.HTTPSConnection(server, timeout=timeout, context=self.get_ssl_context(verify_cert))
+        else:
+            log.debug("Connection: HTTP")
+            conn = http.client.HTTPConnection(server, timeout=timeout)
+        conn.pool_key = pool_key
+        return conn
+
+    @staticmethod
+    def is_connection_dropped(conn):
+        # an idle keep-alive socket should have nothing to read,
+        # if it is readable the server has closed it (EOF) or sent junk
+        sock = conn.sock
+        if sock is None:
+            return True
+        try:
+            readable, writable, errored = select.select([sock], [], [], 0)
+            return len(readable) > 0
+        except (OSError, ValueError):
+            return True
+
+    def get_connection(self, pool_key, timeout):
+        now = time.time()
+        with self.lock:
+            idle_list = self.idle_connections.get(pool_key)
+            while idle_list:
+                conn, last_used = idle_list.pop()
+                self.idle_count -= 1
+                if (now - last_used) < self.max_idle_time and not self.is_connection_dropped(conn):
+                    self.hits += 1
+                    conn.timeout = timeout
+                    conn.sock.settimeout(timeout)
+                    return conn, True
+                self.discarded += 1
+                self.close_connection(conn)
+            self.misses += 1
+
+        return self.new_connection(pool_key, timeout), False
+
+    def release_connection(self, conn, response):
+        # only put the connection back if the response has been fully read
+        # and the server did not ask for the connection to be closed
+        if conn is None:
+            return
+
+        reusable = (response is not None
+                    and response.isclosed()
+                    and not response.will_close
+                    and conn.sock is not None)
+
+        if not reusable:
+            self.close_connection(conn)
+            return
+
+        with self.lock:
+            idle_list = self.idle_connections.setdefault(conn.pool_key, [])
+            if len(idle_list) >= self.max_idle_per_host or self.idle_count >= self.max_idle_total:
+                self.discarded += 1
+                self.close_connection(conn)
+            else:
+                idle_list.append((conn, time.time()))
+                self.idle_count += 1
+
+    def discard_connection(self, conn):
+        if conn is not None:
+            self.close_connection(conn)
+
+    @staticmethod
+    def close_connection(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def request(self, pool_key, timeout, method, url_path, body, headers):
+        conn, reused = self.get_connection(pool_key, timeout)
+        conn.retries = 0
+        sent = False
+        try:
+            conn.request(method=method, url=url_path, body=body, headers=headers)
+            sent = True
+            response = conn.getresponse()
+        except STALE_CONNECTION_ERRORS as error:
+            self.close_connection(conn)
+            if not reused:
+                raise
+            # a POST the server may have acted on is not sent twice
+            if sent and method not in RETRY_METHODS:
+                raise
+            # the pooled socket was stale, retry once on a new connection
+            log.debug("Pooled connection was stale, retrying on a new connection : {0}", error)
+            with self.lock:
+                self.retries += 1
+            conn = self.new_connection(pool_key, timeout)
+            conn.retries = 1
+            try:
+                conn.request(method=method, url=url_path, body=body, headers=headers)
+                response = conn.getresponse()
+            except Exception:
+                self.close_connection(conn)
+                raise
+        except Exception:
+            self.close_connection(conn)
+            raise
+
+        self.log_stats()
+        return conn, response
+
+    def get_stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            hit_rate = 0.0
+            if total > 0:
+                hit_rate = (float(self.hits) / float(total)) * 100.0
+            stats = {
+                "requests": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "retries": self.retries,
+                "discarded": self.discarded,
+                "idle": self.idle_count,
+                "hit_rate": hit_rate
+            }
+        return stats
+
+    def log_stats(self, force=False):
+        total = self.hits + self.misses
+        if force or (total > 0 and total % self.stats_log_interval == 0):
+            stats = self.get_stats()
+            log.info("ConnectionPool : requests={0} hits={1} misses={2} retries={3} discarded={4} idle={5} hit_rate={6:.1f}%",
+                     stats["requests"], stats["hits"], stats["misses"], stats["retries"],
+                     stats["discarded"], stats["idle"], stats["hit_rate"])
+
+    def close_all(self):
+        with self.lock:
+            for idle_list in self.idle_connections.values():
+                for conn, last_used in idle_list:
+                    self.close_connection(conn)
+            self.idle_connections = {}
+            self.idle_count = 0
+
+
+connection_pool = ConnectionPool()
@@ -1,20 +1,24 @@
 # Gnu General Public License - see LICENSE.TXT
 
 import json
-from collections import defaultdict
+import codecs
+import re
+from urllib.parse import urlparse, parse_qsl
 import threading
 import hashlib
 import os
-import pickle
 import time
 
 from .downloadutils import DownloadUtils
 from .simple_logging import SimpleLogging
-from .item_functions import extract_item_info
+from .item_functions import extract_item_info, NoneDict
 from .kodi_utils import HomeWindow
 from .translation import string_load
 from .tracking import timer
-from .filelock import FileLock
+from .cache_store import cache_store
+from .response_cache import response_cache
+from .prefetch import record_prefetch_hit
+from .cache_invalidation import is_kept_in_sync
 
 import xbmc
 import xbmcaddon
@@ -23,16 +27,135 @@ import xbmcgui
 
 log = SimpleLogging(__name__)
 
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# the rest of the buffer after a number, if it is all number chars the number can go on in the next chunk
+JSON_NUMBER_TAIL = re.compile(r"[-+.eE0-9]*\Z")
+
+# lists that can be refreshed with only the items changed since the last sync
+DELTA_URL_PATTERN = re.compile(r"/emby/Users/\{userid\}/Items\?", re.IGNORECASE)
+# query params that make the cached list a page or depend on play state, delta results can not be merged into those
+DELTA_UNSAFE_PARAMS = {"startindex", "limit", "filters", "isplayed", "isfavorite", "isresumable", "minpremieredate"}
+# sort orders that do not change when the user data changes
+DELTA_SAFE_SORTS = {"sortname", "name", "productionyear", "premieredate", "datecreated", "criticrating",
+                    "communityrating", "officialrating", "runtime", "indexnumber", "parentindexnumber",
+                    "airedepisodeorder", "album", "albumartist", "artist"}
+# allowance for the clock difference between us and the server
+DELTA_SYNC_MARGIN = 300
+
+# item fields compared to find changed items, a change to the visible ones needs a container refresh
+FINGERPRINT_VISIBLE_FIELDS = ("name", "play_count", "resume_time", "recursive_unplayed_items_count", "etag")
+FINGERPRINT_HIDDEN_FIELDS = ("favorite",)
+
+
+def iter_json_items(chunks, object_hook=None, list_key="Items"):
+    """
+        Incrementally parse a {"Items": [...], ...} response from an iterable of byte chunks
+        and yield the list entries one at a time as soon as each one is complete.
+        Only the unparsed tail of the text and the current entry are held in memory.
+        A top level list yields its entries, other top level values yield nothing.
+    """
+    decoder = json.JSONDecoder(object_hook=object_hook)
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunk_iter = iter(chunks)
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def read_more():
+        # drop the parsed text and append the next chunk
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = next(chunk_iter, None)
+        if chunk is None:
+            eof = True
+            buffer = buffer[pos:] + text_decoder.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        return True
+
+    def next_char():
+        # skip white space and return the next char without consuming it, None at the end of the data
+        nonlocal pos
+        while True:
+            pos = JSON_WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read_more():
+                return None
+
+    def decode_value():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # a number at the end of the buffer, "-2." or "1.5e" included, might continue in the next chunk
+                is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                if eof or not is_number or not JSON_NUMBER_TAIL.match(buffer, end):
+                    pos = end
+                    return value
+            except ValueError:
+                if eof:
+                    raise
+            read_more()
+
+    def iter_list():
+        nonlocal pos
+        while True:
+            char = next_char()
+            if char is None:
+                raise ValueError("Unterminated list in json data")
+            if char == "]":
+                pos += 1
+                return
+            if char == ",":
+                pos += 1
+                continue
+            yield decode_value()
+
+    char = next_char()
+    if char == "[":
+        pos += 1
+        yield from iter_list()
+        return
+    if char != "{":
+        return
+    pos += 1
+
+    while True:
+        char = next_char()
+        if char is None or char == "}":
+            return
+        if char == ",":
+            pos += 1
+            continue
+        key = decode_value()
+        if next_char() != ":":
+            raise ValueError("Expected ':' after key %s in json data" % key)
+        pos += 1
+        char = next_char()
+        if key == list_key and char == "[":
+            pos += 1
+            yield from iter_list()
+        else:
+            decode_value()
+
 
 class CacheItem:
     item_list = None
-    item_list_hash = None
+    item_fingerprints = None
     date_saved = None
     date_last_used = None
     last_action = None
     items_url = None
     file_path = None
+    url_hash = None
     user_id = None
+    last_sync = None
+    prefetched = False
+    # the address the artwork urls were made with
+    server = None
 
     def __init__(self, *args):
         pass
@@ -48,14 +171,39 @@ class DataManager:
 
     @staticmethod
     def load_json_data(json_data):
-        return json.loads(json_data, object_hook=lambda d: defaultdict(lambda: None, d))
+        return json.loads(json_data, object_hook=NoneDict)
 
     @timer
     def get_content(self, url):
         json_data = DownloadUtils().download_url(url)
+        # cached bodies are decoded again, every caller gets its own objects to change
         result = self.load_json_data(json_data)
         return result
 
+    @timer
+    def get_contents(self, urls, timeout=None, suppress=True):
+        # fetch several independent urls at once, results in url order, None for any that failed
+        results = DownloadUtils().download_many(urls, suppress=suppress, timeout=timeout)
+        return [self.load_json_data(json_data) for json_data in results]
+
+    def get_content_items(self, url, suppress=False):
+        # streaming version of get_content() for whole library queries,
+        # yields the Items one at a time while the response is still downloading
+        chunks = DownloadUtils().download_url_stream(url, suppress=suppress)
+        item_count = 0
+        try:
+            for item in iter_json_items(chunks, object_hook=NoneDict):
+                item_count += 1
+                yield item
+            # let the download finish so the connection can be reused
+            for chunk in chunks:
+                pass
+        except ValueError as error:
+            log.error("get_content_items : Unable to parse response after {0} items : {1}", item_count, error)
+        finally:
+            chunks.close()
+        log.debug("get_content_items : Loaded {0} items", item_count)
+
     @timer
     def get_items(self, url, gui_options, use_cache=False):
 
@@ -65,82 +213,51 @@ class DataManager:
 
         download_utils = DownloadUtils()
         user_id = download_utils.get_user_id()
-        server = download_utils.get_server()
-
-        m = hashlib.md5()
-        line = user_id + "|" + str(server) + "|" + url
-        m.update(line.encode("utf-8"))
-        url_hash = m.hexdigest()
-        cache_file = os.path.join(self.addon_dir, "cache_" + url_hash + ".pickle")
+        server = download_utils.get_configured_server()
 
-        # changed_url = url + "&MinDateLastSavedForUser=" + urllib.unquote("2019-09-16T13:45:30")
-        # results = self.get_content(changed_url)
-        # log.debug("DataManager Changes Since Date : {0}", results)
+        url_hash = self.get_url_hash(user_id, server, url)
+        cache_file = "cache_" + url_hash
 
         item_list = None
         total_records = 0
-        baseline_name = None
         cache_thread = CacheManagerThread()
         cache_thread.gui_options = gui_options
 
         home_window.set_property(cache_file, "true")
 
         clear_cache = home_window.get_property("skip_cache_for_" + url)
-        if clear_cache and os.path.isfile(cache_file):
+        if clear_cache:
             log.debug("Clearing cache data and loading new data")
             home_window.clear_property("skip_cache_for_" + url)
-            with FileLock(cache_file, timeout=5):
-                xbmcvfs.delete(cache_file)
+            cache_store.delete(url_hash, user_id)
 
         # try to load the list item data from the cache
-        if os.path.isfile(cache_file) and use_cache:
-            log.debug("Loading url data from cached pickle data")
-
-            with FileLock(cache_file, timeout=5):
-                with open(cache_file, 'rb') as handle:
-                    try:
-                        cache_item = pickle.load(handle)
-                        cache_thread.cached_item = cache_item
-                        item_list = cache_item.item_list
-                        total_records = cache_item.total_records
-                    except Exception as err:
-                        log.error("Pickle Data Load Failed : {0}", err)
-                        item_list = None
+        elif use_cache:
+            log.debug("Loading url data from the cache store")
+            try:
+                cache_item = cache_store.load(url_hash, user_id)
+                if cache_item is not None and cache_item.server != gui_options["server"]:
+                    log.debug("Cached list was made on another server address, reloading it")
+                    cache_item = None
+                if cache_item is not None:
+                    if cache_item.prefetched:
+                        cache_item.prefetched = False
+                        cache_thread.save_needed = True
+                        record_prefetch_hit()
+                    cache_thread.cached_item = cache_item
+                    item_list = cache_item.item_list
+                    total_records = cache_item.total_records
+            except Exception as err:
+                log.error("Cache Data Load Failed : {0}", err)
+                item_list = None
 
         # we need to load the list item data form the server
         if item_list is None or len(item_list) == 0:
             log.debug("Loading url data from server")
 
-            results = self.get_content(url)
-
-            if results is None:
-                results = []
-
-            if isinstance(results, dict):
-                total_records = results.get("TotalRecordCount", 0)
-
-            if isinstance(results, dict) and results.get("Items") is not None:
-                baseline_name = results.get("BaselineItemName")
-                results = results.get("Items", [])
-            elif isinstance(results, list) and len(results) > 0 and results[0].get("Items") is not None:
-                baseline_name = results[0].get("BaselineItemName")
-                results = results[0].get("Items")
-
-            item_list = []
-            for item in results:
-                item_data = extract_item_info(item, gui_options)
-                item_data.baseline_itemname = baseline_name
-                item_list.append(item_data)
-
-            cache_item = CacheItem()
-            cache_item.item_list = item_list
-            cache_item.file_path = cache_file
-            cache_item.items_url = url
-            cache_item.user_id = user_id
-            cache_item.last_action = "fresh_data"
-            cache_item.date_saved = time.time()
-            cache_item.date_last_used = time.time()
-            cache_item.total_records = total_records
+            cache_item = self.load_cache_item(url, gui_options, url_hash, user_id)
+            item_list = cache_item.item_list
+            total_records = cache_item.total_records
 
             cache_thread.cached_item = cache_item
             # copy.deepcopy(item_list)
@@ -150,36 +267,248 @@ class DataManager:
 
         return cache_file, item_list, total_records, cache_thread
 
+    @staticmethod
+    def get_url_hash(user_id, server, url):
+        m = hashlib.md5()
+        line = user_id + "|" + str(server) + "|" + url
+        m.update(line.encode("utf-8"))
+        return m.hexdigest()
+
+    def load_cache_item(self, url, gui_options, url_hash, user_id):
+        # a new cache item with the list loaded from the server
+        sync_started = time.time()
+        results = self.get_content(url)
+
+        if results is None:
+            results = []
+
+        total_records = 0
+        if isinstance(results, dict):
+            total_records = results.get("TotalRecordCount", 0)
+
+        baseline_name = None
+        if isinstance(results, dict) and results.get("Items") is not None:
+            baseline_name = results.get("BaselineItemName")
+            results = results.get("Items", [])
+        elif isinstance(results, list) and len(results) > 0 and results[0].get("Items") is not None:
+            baseline_name = results[0].get("BaselineItemName")
+            results = results[0].get("Items")
+
+        item_list = []
+        for item in results:
+            item_data = extract_item_info(item, gui_options)
+            item_data.baseline_itemname = baseline_name
+            item_list.append(item_data)
+
+        cache_item = CacheItem()
+        cache_item.item_list = item_list
+        cache_item.file_path = "cache_" + url_hash
+        cache_item.url_hash = url_hash
+        cache_item.items_url = url
+        cache_item.user_id = user_id
+        cache_item.last_action = "fresh_data"
+        cache_item.date_saved = time.time()
+        cache_item.date_last_used = time.time()
+        cache_item.total_records = total_records
+        cache_item.last_sync = sync_started
+        cache_item.server = gui_options["server"]
+        return cache_item
+
+    def prefetch_items(self, url, gui_options):
+        # load a list the user is likely to open next into the cache, returns True if it was fetched
+        download_utils = DownloadUtils()
+        user_id = download_utils.get_user_id()
+        server = download_utils.get_configured_server()
+        if not user_id or server is None:
+            return False
+
+        url_hash = self.get_url_hash(user_id, server, url)
+        if cache_store.exists(url_hash, user_id):
+            return False
+
+        cache_item = self.load_cache_item(url, gui_options, url_hash, user_id)
+        if not cache_item.item_list:
+            return False
+        cache_item.item_fingerprints = CacheManagerThread.get_fingerprints(cache_item.item_list)
+        cache_item.prefetched = True
+        cache_store.save(cache_item)
+        return True
+
 
 class CacheManagerThread(threading.Thread):
     cached_item = None
     gui_options = None
+    save_needed = False
 
     def __init__(self, *args):
         threading.Thread.__init__(self, *args)
 
     @staticmethod
-    def get_data_hash(items):
+    def get_fingerprint(item):
+        visible = tuple([getattr(item, name) for name in FINGERPRINT_VISIBLE_FIELDS])
+        hidden = tuple([getattr(item, name) for name in FINGERPRINT_HIDDEN_FIELDS])
+        return visible, hidden
 
-        m = hashlib.md5()
+    @staticmethod
+    def get_fingerprints(items):
+        fingerprints = {}
         for item in items:
-            item_string = "%s_%s_%s_%s_%s_%s" % (
-                item.name,
-                item.play_count,
-                item.favorite,
-                item.resume_time,
-                item.recursive_unplayed_items_count,
-                item.etag
-            )
-            item_string = item_string.encode("UTF-8")
-            m.update(item_string)
+            fingerprints[item.id] = CacheManagerThread.get_fingerprint(item)
+        return fingerprints
+
+    def diff_items(self, loaded_items):
+        # match the loaded items to the cached ones by Id, unchanged items keep the cached object,
+        # returns the patched list, its fingerprints, the diff stats and if a container refresh is needed
+        cached_items = self.cached_item.item_list
+        cached_fingerprints = self.cached_item.item_fingerprints
+        if cached_fingerprints is None:
+            cached_fingerprints = self.get_fingerprints(cached_items)
+        loaded_fingerprints = self.get_fingerprints(loaded_items)
+
+        stats = {"added": 0, "removed": 0, "changed": 0, "hidden_changed": 0, "reordered": False}
+
+        if len(cached_fingerprints) != len(cached_items) or len(loaded_fingerprints) != len(loaded_items):
+            # the Ids are not unique in this list so items can not be matched up, compare by position
+            cached_list = [(item.id, self.get_fingerprint(item)) for item in cached_items]
+            loaded_list = [(item.id, self.get_fingerprint(item)) for item in loaded_items]
+            if cached_list == loaded_list:
+                return cached_items, cached_fingerprints, stats, False
+            stats["changed"] = len(loaded_items)
+            return loaded_items, loaded_fingerprints, stats, True
+
+        cached_by_id = {}
+        for item in cached_items:
+            cached_by_id[item.id] = item
+
+        patched_items = []
+        for item in loaded_items:
+            cached_fingerprint = cached_fingerprints.get(item.id)
+            if cached_fingerprint is None:
+                stats["added"] += 1
+                patched_items.append(item)
+                continue
+
+            loaded_fingerprint = loaded_fingerprints[item.id]
+            if cached_fingerprint == loaded_fingerprint:
+                patched_items.append(cached_by_id[item.id])
+                continue
+
+            if cached_fingerprint[0] != loaded_fingerprint[0]:
+                stats["changed"] += 1
+            else:
+                stats["hidden_changed"] += 1
+            item.baseline_itemname = cached_by_id[item.id].baseline_itemname
+            patched_items.append(item)
 
-        return m.hexdigest()
+        cached_order = [item.id for item in cached_items if item.id in loaded_fingerprints]
+        stats["removed"] = len(cached_items) - len(cached_order)
+        loaded_order = [item.id for item in loaded_items if item.id in cached_fingerprints]
+        stats["reordered"] = cached_order != loaded_order
+
+        needs_refresh = (stats["added"] > 0 or stats["removed"] > 0 or stats["changed"] > 0 or stats["reordered"])
+        return patched_items, loaded_fingerprints, stats, needs_refresh
+
+    @staticmethod
+    def record_refresh_stats(stats, needs_refresh):
+        # running totals shared by all the plugin calls, to see how many container refreshes the diff saves
+        home_window = HomeWindow()
+        totals = home_window.get_property("cache_refresh_stats").split("|")
+        if len(totals) != 4:
+            totals = [0, 0, 0, 0]
+        checks, refreshes, saved, unchanged = [int(value) for value in totals]
+
+        checks += 1
+        if needs_refresh:
+            refreshes += 1
+        elif stats["hidden_changed"] > 0:
+            saved += 1
+        else:
+            unchanged += 1
+        home_window.set_property("cache_refresh_stats", "%s|%s|%s|%s" % (checks, refreshes, saved, unchanged))
+
+        log.info("CacheManagerThread : Diff added={0} removed={1} changed={2} hidden_changed={3} reordered={4} "
+                 "refresh={5} : totals checks={6} refreshes={7} refreshes_saved={8} unchanged={9}",
+                 stats["added"], stats["removed"], stats["changed"], stats["hidden_changed"], stats["reordered"],
+                 needs_refresh, checks, refreshes, saved, unchanged)
+
+    def can_load_changes(self):
+        cached_item = self.cached_item
+        if cached_item.last_sync is None or not cached_item.item_list:
+            return False
+        # a page of a bigger list, changed items might belong to other pages
+        if cached_item.total_records != len(cached_item.item_list):
+            return False
+        url = cached_item.items_url
+        if not DELTA_URL_PATTERN.search(url) or url.find("{random_movies}") != -1:
+            return False
+        for name, value in parse_qsl(urlparse(url).query):
+            name = name.lower()
+            if name in DELTA_UNSAFE_PARAMS:
+                return False
+            if name == "sortby":
+                for sort_name in value.lower().split(","):
+                    if sort_name not in DELTA_SAFE_SORTS:
+                        return False
+        return True
+
+    @staticmethod
+    def get_ids_url(url):
+        # the same query without the extra fields, images and user data, only for the order of the Ids
+        path, query = url.split("?", 1)
+        params = [param for param in query.split("&") if not param.lower().startswith("fields=")]
+        return path + "?" + "&".join(params) + "&EnableImages=false&EnableUserData=false"
+
+    def load_changed_items(self):
+        # ask only for the items saved since the last sync and merge them into the cached list by Id,
+        # returns the merged list or None when a full reload is needed
+        if not self.can_load_changes():
+            return None
+
+        since = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.cached_item.last_sync - DELTA_SYNC_MARGIN))
+        changed_url = self.cached_item.items_url + "&MinDateLastSavedForUser=" + since
+        # the Ids in list order tell us if anything was added, removed or moved
+        ids_url = self.get_ids_url(self.cached_item.items_url)
+
+        data_manager = DataManager()
+        changed_results, ids_results = data_manager.get_contents([changed_url, ids_url])
+        if (not isinstance(changed_results, dict) or changed_results.get("Items") is None
+                or not isinstance(ids_results, dict) or ids_results.get("Items") is None):
+            log.debug("CacheManagerThread : Server did not answer the delta query, doing a full reload")
+            return None
+
+        item_list = self.cached_item.item_list
+        if ids_results.get("TotalRecordCount") != len(item_list):
+            log.debug("CacheManagerThread : Item count changed {0} -> {1}, doing a full reload",
+                      len(item_list), ids_results.get("TotalRecordCount"))
+            return None
+
+        # a changed sort name or date moves the item, merging in place would keep the old order
+        if [item.get("Id") for item in ids_results.get("Items")] != [item_data.id for item_data in item_list]:
+            log.debug("CacheManagerThread : Item order changed, doing a full reload")
+            return None
+
+        positions = {}
+        for index, item_data in enumerate(item_list):
+            positions[item_data.id] = index
+
+        loaded_items = list(item_list)
+        for item in changed_results.get("Items"):
+            index = positions.get(item.get("Id"))
+            if index is None:
+                # a new item, we do not know where it goes in the list
+                log.debug("CacheManagerThread : New item in delta results, doing a full reload")
+                return None
+            item_data = extract_item_info(item, self.gui_options)
+            item_data.baseline_itemname = item_list[index].baseline_itemname
+            loaded_items[index] = item_data
+
+        log.debug("CacheManagerThread : Delta refresh merged {0} changed items into {1}",
+                  len(changed_results.get("Items")), len(loaded_items))
+        return loaded_items
 
     def run(self):
 
         log.debug("CacheManagerThread : Started")
-        # log.debug("CacheManagerThread : Cache Item : {0}", self.cached_item.__dict__)
 
         home_window = HomeWindow()
         is_fresh = False
@@ -193,70 +522,84 @@ class CacheManagerThread(threading.Thread):
 
         if is_fresh and self.cached_item.item_list is not None and len(self.cached_item.item_list) > 0:
             log.debug("CacheManagerThread : Data is still fresh, not reloading from server")
-            cached_hash = self.get_data_hash(self.cached_item.item_list)
-            self.cached_item.item_list_hash = cached_hash
+            self.cached_item.item_fingerprints = self.get_fingerprints(self.cached_item.item_list)
             self.cached_item.last_action = "cached_data"
             self.cached_item.date_saved = time.time()
             self.cached_item.date_last_used = time.time()
 
-            with FileLock(self.cached_item.file_path, timeout=5):
-                with open(self.cached_item.file_path, 'wb') as handle:
-                    pickle.dump(self.cached_item, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            cache_store.save(self.cached_item)
+
+        elif is_kept_in_sync(self.cached_item):
+            # websocket messages patch or drop this list when it changes, nothing to recheck
+            log.debug("CacheManagerThread : List is kept in sync by the websocket, not reloading")
+            self.cached_item.date_last_used = time.time()
+            if self.save_needed:
+                cache_store.save(self.cached_item)
+            else:
+                cache_store.touch(self.cached_item.url_hash, self.cached_item.user_id,
+                                  self.cached_item.date_last_used)
 
         else:
-            log.debug("CacheManagerThread : Reloading to recheck data hashes")
-            cached_hash = self.cached_item.item_list_hash
-            log.debug("CacheManagerThread : Cache Hash : {0}", cached_hash)
+            log.debug("CacheManagerThread : Reloading to recheck item fingerprints")
 
-            data_manager = DataManager()
-            results = data_manager.get_content(self.cached_item.items_url)
-            if results is None:
-                results = []
+            sync_started = time.time()
+            loaded_items = self.load_changed_items()
+            if loaded_items is not None:
+                total_records = self.cached_item.total_records
+            else:
+                data_manager = DataManager()
+                results = data_manager.get_content(self.cached_item.items_url)
+                if results is None:
+                    results = []
 
-            if isinstance(results, dict) and results.get("Items") is not None:
-                results = results.get("Items", [])
-            elif isinstance(results, list) and len(results) > 0 and results[0].get("Items") is not None:
-                results = results[0].get("Items")
+                total_records = 0
+                if isinstance(results, dict):
+                    total_records = results.get("TotalRecordCount", 0)
 
-            total_records = 0
-            if isinstance(results, dict):
-                total_records = results.get("TotalRecordCount", 0)
+                if isinstance(results, dict) and results.get("Items") is not None:
+                    results = results.get("Items", [])
+                elif isinstance(results, list) and len(results) > 0 and results[0].get("Items") is not None:
+                    results = results[0].get("Items")
 
-            loaded_items = []
-            for item in results:
-                item_data = extract_item_info(item, self.gui_options)
-                loaded_items.append(item_data)
+                loaded_items = []
+                for item in results:
+                    item_data = extract_item_info(item, self.gui_options)
+                    loaded_items.append(item_data)
 
             if loaded_items is None or len(loaded_items) == 0:
                 log.debug("CacheManagerThread : loaded_items is None or Empty so not saving it")
                 return
 
-            loaded_hash = self.get_data_hash(loaded_items)
-            log.debug("CacheManagerThread : Loaded Hash : {0}", loaded_hash)
+            self.cached_item.last_sync = sync_started
+
+            patched_items, fingerprints, stats, needs_refresh = self.diff_items(loaded_items)
+            self.record_refresh_stats(stats, needs_refresh)
 
-            # if they dont match then save the data and trigger a content reload
-            if cached_hash != loaded_hash:
-                log.debug("CacheManagerThread : Hashes different, saving new data and reloading container")
+            if needs_refresh or stats["hidden_changed"] > 0 or total_records != self.cached_item.total_records:
+                log.debug("CacheManagerThread : Items changed, saving patched data")
 
-                self.cached_item.item_list = loaded_items
-                self.cached_item.item_list_hash = loaded_hash
+                self.cached_item.item_list[:] = patched_items
+                self.cached_item.item_fingerprints = fingerprints
                 self.cached_item.last_action = "fresh_data"
                 self.cached_item.date_saved = time.time()
                 self.cached_item.date_last_used = time.time()
                 self.cached_item.total_records = total_records
 
-                with FileLock(self.cached_item.file_path, timeout=5):
-                    with open(self.cached_item.file_path, 'wb') as handle:
-                        pickle.dump(self.cached_item, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                cache_store.save(self.cached_item)
 
-                log.debug("CacheManagerThread : Sending container refresh")
-                xbmc.executebuiltin("Container.Refresh")
+                # only the visible fields need the list to be rebuilt
+                if needs_refresh:
+                    log.debug("CacheManagerThread : Sending container refresh")
+                    xbmc.executebuiltin("Container.Refresh")
+
+            elif self.save_needed:
+                self.cached_item.date_last_used = time.time()
+                cache_store.save(self.cached_item)
 
             else:
                 self.cached_item.date_last_used = time.time()
-                with FileLock(self.cached_item.file_path, timeout=5):
-                    with open(self.cached_item.file_path, 'wb') as handle:
-                        pickle.dump(self.cached_item, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                cache_store.touch(self.cached_item.url_hash, self.cached_item.user_id,
+                                  self.cached_item.date_last_used, self.cached_item.last_sync)
                 log.debug("CacheManagerThread : Updating last used date for cache data")
 
         log.debug("CacheManagerThread : Exited")
@@ -280,6 +623,9 @@ def clear_cached_server_data():
             xbmcvfs.delete(cache_file)
             del_count += 1
 
+    del_count += cache_store.clear()
+    del_count += response_cache.clear()
+
     msg = string_load(30394) % del_count
     xbmcgui.Dialog().ok(string_load(30393), msg)
 
@@ -287,43 +633,7 @@ def clear_cached_server_data():
 def clear_old_cache_data():
     log.debug("clear_old_cache_data() : called")
 
-    addon_dir = xbmcvfs.translatePath(xbmcaddon.Addon().getAddonInfo('profile'))
-    dirs, files = xbmcvfs.listdir(addon_dir)
-
-    del_count = 0
-    for filename in files:
-        if filename.startswith("cache_") and filename.endswith(".pickle"):
-            log.debug("clear_old_cache_data() : Checking CacheFile : {0}", filename)
-
-            cache_item = None
-            for x in range(0, 5):
-                try:
-                    data_file = os.path.join(addon_dir, filename)
-                    with FileLock(data_file, timeout=5):
-                        with open(data_file, 'rb') as handle:
-                            cache_item = pickle.load(handle)
-                    break
-                except Exception as error:
-                    log.debug("clear_old_cache_data() : Pickle load error : {0}", error)
-                    cache_item = None
-                    xbmc.sleep(1000)
-
-            if cache_item is not None:
-                item_last_used = -1
-                if cache_item.date_last_used is not None:
-                    item_last_used = time.time() - cache_item.date_last_used
-
-                log.debug("clear_old_cache_data() : Cache item last used : {0} sec ago", item_last_used)
-                if item_last_used == -1 or item_last_used > (3600 * 24 * 7):
-                    log.debug("clear_old_cache_data() : Deleting cache item age : {0}", item_last_used)
-                    data_file = os.path.join(addon_dir, filename)
-                    with FileLock(data_file, timeout=5):
-                        xbmcvfs.delete(data_file)
-                    del_count += 1
-            else:
-                log.debug("clear_old_cache_data() : Deleting unloadable cache item")
-                data_file = os.path.join(addon_dir, filename)
-                with FileLock(data_file, timeout=5):
-                    xbmcvfs.delete(data_file)
+    # anything not used for a week
+    del_count = cache_store.delete_unused(3600 * 24 * 7)
 
     log.debug("clear_old_cache_data() : Cache items deleted : {0}", del_count)
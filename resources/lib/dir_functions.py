@@ -1,6 +1,5 @@
 # Gnu General Public License - see LICENSE.TXT
 
-import xbmcaddon
 import xbmcplugin
 import xbmcgui
 
@@ -15,9 +14,11 @@ from .kodi_utils import HomeWindow
 from .downloadutils import DownloadUtils
 from .translation import string_load
 from .simple_logging import SimpleLogging
-from .item_functions import add_gui_item, ItemDetails
+from .item_functions import ListItemBuilder, build_gui_options, ItemDetails
 from .utils import send_event_notification
 from .tracking import timer
+from .settings_snapshot import get_settings
+from .prefetch import add_prefetch_target, request_prefetch, get_item_priority, PRIORITY_NEXT_PAGE, PRIORITY_UNWATCHED
 
 log = SimpleLogging(__name__)
 
@@ -35,7 +36,7 @@ def get_content(url, params):
     log.debug("MediaType: {0}", media_type)
     pluginhandle = int(sys.argv[1])
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     # determine view type, map it from media type to view type
     view_type = ""
     content_type = ""
@@ -77,14 +78,14 @@ def get_content(url, params):
 
     # show a progress indicator if needed
     progress = None
-    if settings.getSetting('showLoadProgress') == "true":
+    if settings.show_load_progress:
         progress = xbmcgui.DialogProgress()
         progress.create(string_load(30112))
         progress.update(0, string_load(30113))
 
     # update url for paging
     start_index = 0
-    page_limit = int(settings.getSetting('itemsPerPage'))
+    page_limit = settings.items_per_page
     url_prev = None
     url_next = None
     if page_limit > 0 and media_type.lower() in ["movies", "movie", "tvshows"]:
@@ -127,7 +128,8 @@ def get_content(url, params):
 
     use_cache = params.get("use_cache", "true") == "true"
 
-    dir_items, detected_type, total_records = process_directory(url, progress, params, use_cache)
+    prefetch_targets = []
+    dir_items, detected_type, total_records = process_directory(url, progress, params, use_cache, prefetch_targets)
     if dir_items is None:
         return
 
@@ -151,6 +153,7 @@ def get_content(url, params):
             u = sys.argv[0] + "?url=" + urllib.parse.quote(url_next) + "&mode=GET_CONTENT&media_type=movies"
             log.debug("ADDING NEXT ListItem: {0} - {1}", u, list_item)
             dir_items.append((u, list_item, True))
+            add_prefetch_target(prefetch_targets, PRIORITY_NEXT_PAGE, url_next)
 
     # set the Kodi content type
     if content_type:
@@ -194,6 +197,9 @@ def get_content(url, params):
         progress.update(100, string_load(30125))
         progress.close()
 
+    if use_cache and settings.use_cache:
+        request_prefetch(prefetch_targets)
+
     return
 
 
@@ -213,7 +219,7 @@ def set_sort(pluginhandle, view_type, default_sort):
         "7": xbmcplugin.SORT_METHOD_VIDEO_RATING
     }
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     preset_sort_order = settings.getSetting("sort-" + view_type)
     log.debug("SETTING_SORT preset_sort_order: {0}", preset_sort_order)
     if preset_sort_order in sorting_order_mapping:
@@ -239,38 +245,23 @@ def set_sort(pluginhandle, view_type, default_sort):
 
 
 @timer
-def process_directory(url, progress, params, use_cache_data=False):
+def process_directory(url, progress, params, use_cache_data=False, prefetch_targets=None):
     log.debug("== ENTER: processDirectory ==")
 
     data_manager = DataManager()
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     download_utils = DownloadUtils()
     server = download_utils.get_server()
 
-    name_format = params.get("name_format", None)
-    name_format_type = None
-    if name_format is not None:
-        name_format = urllib.parse.unquote(name_format)
-        tokens = name_format.split("|")
-        if len(tokens) == 2:
-            name_format_type = tokens[0]
-            name_format = settings.getSetting(tokens[1])
-        else:
-            name_format_type = None
-            name_format = None
-
-    gui_options = {}
-    gui_options["server"] = server
-    gui_options["name_format"] = name_format
-    gui_options["name_format_type"] = name_format_type
+    gui_options = build_gui_options(server, params.get("name_format", None))
 
-    use_cache = settings.getSetting("use_cache") == "true" and use_cache_data
+    use_cache = settings.use_cache and use_cache_data
     cache_file, item_list, total_records, cache_thread = data_manager.get_items(url, gui_options, use_cache)
 
     # flatten single season
     # if there is only one result and it is a season and you have flatten signle season turned on then
     # build a new url, set the content media type and call get content again
-    flatten_single_season = settings.getSetting("flatten_single_season") == "true"
+    flatten_single_season = settings.flatten_single_season
     if flatten_single_season and len(item_list) == 1 and item_list[0].item_type == "Season":
         season_id = item_list[0].id
         series_id = item_list[0].series_id
@@ -288,15 +279,16 @@ def process_directory(url, progress, params, use_cache_data=False):
         get_content(season_url, params)
         return None, None, None
 
-    hide_unwatched_details = settings.getSetting('hide_unwatched_details') == 'true'
+    hide_unwatched_details = settings.hide_unwatched_details
 
     display_options = {}
-    display_options["addCounts"] = settings.getSetting("addCounts") == 'true'
-    display_options["addResumePercent"] = settings.getSetting("addResumePercent") == 'true'
-    display_options["addSubtitleAvailable"] = settings.getSetting("addSubtitleAvailable") == 'true'
-    display_options["addUserRatings"] = settings.getSetting("add_user_ratings") == 'true'
+    display_options["addCounts"] = settings.add_counts
+    display_options["addResumePercent"] = settings.add_resume_percent
+    display_options["addSubtitleAvailable"] = settings.add_subtitle_available
+    display_options["addUserRatings"] = settings.add_user_ratings
+    list_item_builder = ListItemBuilder(display_options)
 
-    show_empty_folders = settings.getSetting("show_empty_folders") == 'true'
+    show_empty_folders = settings.show_empty_folders
 
     item_count = len(item_list)
     current_item = 1
@@ -324,7 +316,7 @@ def process_directory(url, progress, params, use_cache_data=False):
             detected_type = item_details.item_type
 
         if item_details.item_type == "Season" and first_season_item is None:
-            log.debug("Setting First Season to : {0}", item_details.__dict__)
+            log.debug("Setting First Season to : {0} {1}", item_details.id, item_details.name)
             first_season_item = item_details
 
         total_unwatched += item_details.unwatched_episodes
@@ -366,11 +358,13 @@ def process_directory(url, progress, params, use_cache_data=False):
             default_sort = item_details.item_type == "Playlist"
 
             if show_empty_folders or item_details.recursive_item_count != 0:
-                gui_item = add_gui_item(u, item_details, display_options, default_sort=default_sort)
+                gui_item = list_item_builder.build(u, item_details, default_sort=default_sort)
                 if gui_item:
                     dir_items.append(gui_item)
+                    if prefetch_targets is not None:
+                        add_prefetch_target(prefetch_targets, get_item_priority(item_details), u)
             else:
-                log.debug("Dropping empty folder item : {0}", item_details.__dict__)
+                log.debug("Dropping empty folder item : {0} {1}", item_details.id, item_details.name)
 
         elif item_details.item_type == "MusicArtist":
             u = ('{server}/emby/Users/{userid}/items' +
@@ -379,18 +373,18 @@ def process_directory(url, progress, params, use_cache_data=False):
                  '&CollapseBoxSetItems=false' +
                  '&Recursive=true' +
                  '&format=json')
-            gui_item = add_gui_item(u, item_details, display_options)
+            gui_item = list_item_builder.build(u, item_details)
             if gui_item:
                 dir_items.append(gui_item)
 
         else:
             u = item_details.id
-            gui_item = add_gui_item(u, item_details, display_options, folder=False)
+            gui_item = list_item_builder.build(u, item_details, folder=False)
             if gui_item:
                 dir_items.append(gui_item)
 
     # add the all episodes item
-    show_all_episodes = settings.getSetting('show_all_episodes') == 'true'
+    show_all_episodes = settings.show_all_episodes
     if (show_all_episodes
             and first_season_item is not None
             and len(dir_items) > 1
@@ -424,9 +418,11 @@ def process_directory(url, progress, params, use_cache_data=False):
         item_details.watched_episodes = total_watched
         item_details.mode = "GET_CONTENT"
 
-        gui_item = add_gui_item(series_url, item_details, display_options, folder=True)
+        gui_item = list_item_builder.build(series_url, item_details, folder=True)
         if gui_item:
             dir_items.append(gui_item)
+            if prefetch_targets is not None:
+                add_prefetch_target(prefetch_targets, PRIORITY_UNWATCHED, series_url, item_details.name_format)
 
     if cache_thread is not None:
         cache_thread.start()
@@ -3,15 +3,16 @@
 import xbmcgui
 import xbmcaddon
 
-import http.client
 import hashlib
-import ssl
+import time
 from io import BytesIO
 import gzip
+import zlib
 import json
 from urllib.parse import urlparse
 import urllib.request, urllib.parse, urllib.error
 from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
 
 from .kodi_utils import HomeWindow
@@ -19,9 +20,36 @@ from .clientinfo import ClientInformation
 from .simple_logging import SimpleLogging
 from .translation import string_load
 from .tracking import timer
+from .connection_pool import connection_pool
+from .response_cache import response_cache
+from .single_flight import SingleFlight
+from .circuit_breaker import circuit_breaker
+from .network_stats import network_stats
+from .traffic_capture import traffic_capture
+from .server_address import server_address_selector, parse_addresses
+from .settings_snapshot import get_settings, invalidate_settings
 
 log = SimpleLogging(__name__)
 
+# how much of the response body download_url_stream() reads at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+# how many requests download_many() runs at the same time, matches the idle connections kept per host
+DOWNLOAD_MANY_WORKERS = 4
+
+# identical GET requests in flight at the same time in this process share one server call
+request_single_flight = SingleFlight()
+
+# X-Emby-Authorization headers keyed by (authenticate, user id, token, device id, device name),
+# the key is read from the home window on every call so a token renewed by the other add-on
+# process is picked up, clear_auth_header_cache() drops them all
+auth_header_cache = {}
+
+
+def clear_auth_header_cache():
+    if auth_header_cache:
+        log.debug("Clearing cached auth headers")
+    auth_header_cache.clear()
+
 
 def save_user_details(settings, user_name, user_password):
     save_user_to_settings = settings.getSetting("save_user_to_settings") == "true"
@@ -34,6 +62,8 @@ def save_user_details(settings, user_name, user_password):
         home_window = HomeWindow()
         home_window.set_property("username", user_name)
         home_window.set_property("password", user_password)
+    invalidate_settings()
+    clear_auth_header_cache()
 
 
 def load_user_details(settings):
@@ -54,10 +84,10 @@ def load_user_details(settings):
 
 def get_details_string():
 
-    addon_settings = xbmcaddon.Addon()
-    include_media = addon_settings.getSetting("include_media") == "true"
-    include_people = addon_settings.getSetting("include_people") == "true"
-    include_overview = addon_settings.getSetting("include_overview") == "true"
+    settings = get_settings()
+    include_media = settings.include_media
+    include_people = settings.include_people
+    include_overview = settings.include_overview
 
     filer_list = [
         "DateCreated",
@@ -99,14 +129,12 @@ class DownloadUtils:
     verify_cert = False
 
     def __init__(self, *args):
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
 
-        self.use_https = False
-        if settings.getSetting('protocol') == "1":
-            self.use_https = True
+        self.use_https = settings.use_https
         log.debug("use_https: {0}", self.use_https)
 
-        self.verify_cert = settings.getSetting('verify_cert') == 'true'
+        self.verify_cert = settings.verify_cert
         log.debug("verify_cert: {0}", self.verify_cert)
 
     @timer
@@ -348,24 +376,27 @@ class DownloadUtils:
 
         return play_info_result
 
-    def get_server(self):
-        settings = xbmcaddon.Addon()
-        host = settings.getSetting('ipaddress')
+    def get_configured_server(self):
+        # the server from the settings, the cache keys use it whichever address is picked
+        host = get_settings().ipaddress
 
         if len(host) == 0 or host == "<none>":
             return None
 
-        port = settings.getSetting('port')
+        port = get_settings().port
 
         if not port and self.use_https:
             port = "443"
-            settings.setSetting("port", port)
+            xbmcaddon.Addon().setSetting("port", port)
+            invalidate_settings()
         elif not port:
             port = "80"
-            settings.setSetting("port", port)
+            xbmcaddon.Addon().setSetting("port", port)
+            invalidate_settings()
 
         # if user entered a full path i.e. http://some_host:port
         if host.lower().strip().startswith("http://") or host.lower().strip().startswith("https://"):
+            settings = xbmcaddon.Addon()
             log.debug("Extracting host info from url: {0}", host)
             url_bits = urlparse(host.strip())
 
@@ -388,6 +419,8 @@ class DownloadUtils:
                 port = str(url_bits.port)
                 settings.setSetting("port", port)
 
+            invalidate_settings()
+
         if self.use_https:
             server = "https://" + host + ":" + port
         else:
@@ -395,6 +428,23 @@ class DownloadUtils:
 
         return server
 
+    def get_server(self):
+        server = self.get_configured_server()
+        if server is None:
+            return None
+
+        # other addresses for the same server, use whichever one is quickest from where we are now
+        server_addresses = get_settings().server_addresses
+        if server_addresses:
+            candidates = [server]
+            for address in parse_addresses(server_addresses):
+                if address not in candidates:
+                    candidates.append(address)
+            if len(candidates) > 1:
+                server = server_address_selector.get_server(candidates, self.verify_cert)
+
+        return server
+
     @staticmethod
     def get_all_artwork(item, server):
         all_art = defaultdict(lambda: "")
@@ -531,8 +581,7 @@ class DownloadUtils:
             log.debug("EmbyCon DownloadUtils -> Returning saved UserID: {0}", userid)
             return userid
 
-        settings = xbmcaddon.Addon()
-        user_details = load_user_details(settings)
+        user_details = load_user_details(get_settings())
         user_name = user_details.get("username", "")
 
         if not user_name:
@@ -591,6 +640,7 @@ class DownloadUtils:
 
         window.set_property("userid", userid)
         window.set_property("userimage", user_image)
+        clear_auth_header_cache()
 
         return userid
 
@@ -607,9 +657,9 @@ class DownloadUtils:
             log.debug("EmbyCon DownloadUtils -> Returning saved AccessToken: {0}", token)
             return token
 
-        settings = xbmcaddon.Addon()
-        port = settings.getSetting("port")
-        host = settings.getSetting("ipaddress")
+        settings = get_settings()
+        port = settings.port
+        host = settings.ipaddress
         if host is None or host == "" or port is None or port == "":
             return ""
 
@@ -644,6 +694,7 @@ class DownloadUtils:
             log.debug("User Id: {0}", userid)
             window.set_property("AccessToken", access_token)
             window.set_property("userid", userid)
+            clear_auth_header_cache()
             # WINDOW.setProperty("userimage", "")
 
             self.post_capabilities()
@@ -654,16 +705,31 @@ class DownloadUtils:
             window.set_property("AccessToken", "")
             window.set_property("userid", "")
             window.set_property("userimage", "")
+            clear_auth_header_cache()
             return ""
 
+    @staticmethod
+    def get_auth_header_key(authenticate, userid, auth_token, device_id, device_name):
+        if authenticate is False:
+            # the user and token are not part of the header
+            return False, "", "", device_id, device_name
+        return True, userid, auth_token, device_id, device_name
+
     def get_auth_header(self, authenticate=True):
+        window = HomeWindow()
         client_info = ClientInformation()
         txt_mac = client_info.get_device_id()
+        device_name = get_settings().device_name
+
+        cache_key = self.get_auth_header_key(authenticate, window.get_property("userid"),
+                                             window.get_property("AccessToken"), txt_mac, device_name)
+        cached_headers = auth_header_cache.get(cache_key)
+        if cached_headers is not None:
+            return dict(cached_headers)
+
         version = client_info.get_version()
         client = client_info.get_client()
 
-        settings = xbmcaddon.Addon()
-        device_name = settings.getSetting('deviceName')
         # remove none ascii chars
         # deviceName = deviceName.decode("ascii", errors='ignore')
         # remove some chars not valid for names
@@ -674,12 +740,14 @@ class DownloadUtils:
         headers = {}
         headers["Accept-encoding"] = "gzip"
         headers["Accept-Charset"] = "UTF-8,*"
+        headers["User-Agent"] = "EmbyCon-" + version
 
         if authenticate is False:
             auth_string = "MediaBrowser Client=\"" + client + "\",Device=\"" + device_name + "\",DeviceId=\"" + txt_mac + "\",Version=\"" + version + "\""
             # headers["Authorization"] = authString
             headers['X-Emby-Authorization'] = auth_string
-            return headers
+            auth_header_cache[cache_key] = headers
+            return dict(headers)
         else:
             userid = self.get_user_id()
             auth_string = "MediaBrowser UserId=\"" + userid + "\",Client=\"" + client + "\",Device=\"" + device_name + "\",DeviceId=\"" + txt_mac + "\",Version=\"" + version + "\""
@@ -691,42 +759,44 @@ class DownloadUtils:
                 headers["X-MediaBrowser-Token"] = auth_token
 
             log.debug("EmbyCon Authentication Header: {0}", headers)
-            return headers
 
-    @timer
-    def download_url(self, url, suppress=False, post_body=None, method="GET", authenticate=True, headers=None):
-        log.debug("DownloadUrl : {0}", url)
+            # only keep the header once we have a user and a token, until then rebuild it every time
+            if userid and auth_token:
+                cache_key = self.get_auth_header_key(authenticate, userid, auth_token, txt_mac, device_name)
+                auth_header_cache[cache_key] = headers
+            return dict(headers)
 
-        return_data = "null"
-        settings = xbmcaddon.Addon()
-        user_details = load_user_details(settings)
-        username = user_details.get("username", "")
-        server = None
-
-        http_timeout = int(settings.getSetting("http_timeout"))
-
-        if authenticate and username == "":
-            return return_data
+    @staticmethod
+    def renew_auth(head):
+        # after a 401, before the saved credentials are touched: if the other add-on process has
+        # not logged in again already, drop the rejected token so authenticate() logs in again
+        clear_auth_header_cache()
+        window = HomeWindow()
+        if window.get_property("AccessToken") == head.get("X-MediaBrowser-Token", ""):
+            log.debug("Server rejected the access token, logging in again")
+            window.set_property("AccessToken", "")
 
-        if settings.getSetting("suppressErrors") == "true":
-            suppress = True
+    def build_request(self, url, post_body=None, authenticate=True):
+        # fill in the url place holders and build the headers,
+        # returns (server, pool_key, url_path, post_body, headers) or None if the request can not be made
+        settings = get_settings()
 
         log.debug("Before: {0}", url)
 
         if url.find("{server}") != -1:
             server = self.get_server()
             if server is None:
-                return return_data
+                return None
             url = url.replace("{server}", server)
 
         if url.find("{userid}") != -1:
             userid = self.get_user_id()
             if not userid:
-                return return_data
+                return None
             url = url.replace("{userid}", userid)
 
         if url.find("{ItemLimit}") != -1:
-            show_x_filtered_items = settings.getSetting("show_x_filtered_items")
+            show_x_filtered_items = settings.show_x_filtered_items
             url = url.replace("{ItemLimit}", show_x_filtered_items)
 
         if url.find("{field_filters}") != -1:
@@ -737,76 +807,167 @@ class DownloadUtils:
             home_window = HomeWindow()
             random_movies = home_window.get_property("random-movies")
             if not random_movies:
-                return return_data
+                return None
             url = url.replace("{random_movies}", random_movies)
 
         log.debug("After: {0}", url)
-        conn = None
 
-        try:
+        url_bits = urlparse(url.strip())
+
+        protocol = url_bits.scheme
+        host_name = url_bits.hostname
+        port = url_bits.port
+        user_name = url_bits.username
+        user_password = url_bits.password
+        url_path = url_bits.path
+        url_puery = url_bits.query
 
-            url_bits = urlparse(url.strip())
+        if not host_name or host_name == "<none>":
+            return None
 
-            protocol = url_bits.scheme
-            host_name = url_bits.hostname
-            port = url_bits.port
-            user_name = url_bits.username
-            user_password = url_bits.password
-            url_path = url_bits.path
-            url_puery = url_bits.query
+        local_use_https = False
+        if protocol.lower() == "https":
+            local_use_https = True
 
-            if not host_name or host_name == "<none>":
-                return return_data
+        server = "%s:%s" % (host_name, port)
+        url_path = url_path + "?" + url_puery
 
-            local_use_https = False
-            if protocol.lower() == "https":
-                local_use_https = True
+        head = self.get_auth_header(authenticate)
 
-            server = "%s:%s" % (host_name, port)
-            url_path = url_path + "?" + url_puery
+        if user_name and user_password:
+            # add basic auth headers
+            user_and_pass = b64encode(b"%s:%s" % (user_name, user_password)).decode("ascii")
+            head["Authorization"] = 'Basic %s' % user_and_pass
 
-            if local_use_https and self.verify_cert:
-                log.debug("Connection: HTTPS, Cert checked")
-                conn = http.client.HTTPSConnection(server, timeout=http_timeout)
-            elif local_use_https and not self.verify_cert:
-                log.debug("Connection: HTTPS, Cert NOT checked")
-                conn = http.client.HTTPSConnection(server, timeout=http_timeout, context=ssl._create_unverified_context())
+        log.debug("HEADERS: {0}", head)
+
+        if post_body is not None:
+            if isinstance(post_body, dict):
+                content_type = "application/json"
+                post_body = json.dumps(post_body)
             else:
-                log.debug("Connection: HTTP")
-                conn = http.client.HTTPConnection(server, timeout=http_timeout)
+                content_type = "application/x-www-form-urlencoded"
 
-            head = self.get_auth_header(authenticate)
+            head["Content-Type"] = content_type
+            log.debug("Content-Type: {0}", content_type)
 
-            if user_name and user_password:
-                # add basic auth headers
-                user_and_pass = b64encode(b"%s:%s" % (user_name, user_password)).decode("ascii")
-                head["Authorization"] = 'Basic %s' % user_and_pass
+            log.debug("POST DATA: {0}", post_body)
 
-            head["User-Agent"] = "EmbyCon-" + ClientInformation().get_version()
-            log.debug("HEADERS: {0}", head)
+        pool_key = (local_use_https, local_use_https and self.verify_cert, server)
+        return server, pool_key, url_path, post_body, head
 
-            if post_body is not None:
-                if isinstance(post_body, dict):
-                    content_type = "application/json"
-                    post_body = json.dumps(post_body)
-                else:
-                    content_type = "application/x-www-form-urlencoded"
+    def handle_error_response(self, data, username, suppress):
+        # read the error body so the connection can go back in the pool
+        data.read()
 
-                head["Content-Type"] = content_type
-                log.debug("Content-Type: {0}", content_type)
+        if int(data.status) == 401:
+            clear_auth_header_cache()
+            # remove any saved password
+            m = hashlib.md5()
+            m.update(username)
+            hashed_username = m.hexdigest()
+            log.error("HTTP response error 401 auth error, removing any saved passwords for user: {0}", hashed_username)
+            addon_settings = xbmcaddon.Addon()
+            addon_settings.setSetting("saved_user_password_" + hashed_username, "")
+            save_user_details(addon_settings, "", "")
 
-                log.debug("POST DATA: {0}", post_body)
-                conn.request(method=method, url=url_path, body=post_body, headers=head)
-            else:
-                conn.request(method=method, url=url_path, headers=head)
+        log.error("HTTP response error: {0} {1}", data.status, data.reason)
+        if suppress is False:
+            xbmcgui.Dialog().notification(string_load(30316),
+                                          string_load(30200) % str(data.reason),
+                                          icon="special://home/addons/plugin.video.embycon/icon.png")
+
+    @timer
+    def download_url(self, url, suppress=False, post_body=None, method="GET", authenticate=True, headers=None, timeout=None):
+        if method == "GET" and post_body is None and headers is None:
+            # the place holders fill in the same for the same user so the raw url is enough for the key,
+            # callers only share a request made with their own timeout and error dialog choice
+            flight_key = (authenticate, HomeWindow().get_property("userid"), url, timeout, suppress)
+            return request_single_flight.do(flight_key, self.send_request, url, suppress, post_body,
+                                            method, authenticate, headers, timeout)
+        return self.send_request(url, suppress, post_body, method, authenticate, headers, timeout)
+
+    def send_request(self, url, suppress, post_body, method, authenticate, headers, timeout, auth_retry=True):
+        log.debug("DownloadUrl : {0}", url)
+
+        return_data = "null"
+        settings = get_settings()
+        user_details = load_user_details(settings)
+        username = user_details.get("username", "")
+        server = None
+
+        http_timeout = settings.http_timeout
+        if timeout is not None:
+            http_timeout = timeout
+
+        if authenticate and username == "":
+            return return_data
+
+        if settings.suppress_errors:
+            suppress = True
+
+        conn = None
+        data = None
+        request_body = post_body
+
+        try:
+
+            request = self.build_request(url, post_body, authenticate)
+            if request is None:
+                return return_data
+            server, pool_key, url_path, post_body, head = request
+
+            cache_key = None
+            cache_entry = None
+            if method == "GET" and post_body is None and response_cache.is_cacheable(url_path):
+                # keyed on the configured server, a switch between its addresses keeps the entries
+                cache_server = server
+                if url.find("{server}") != -1:
+                    cache_server = self.get_configured_server()
+                cache_key = response_cache.get_key(cache_server, url_path)
+                cache_entry = response_cache.get(cache_key)
+                if cache_entry is not None:
+                    if response_cache.is_fresh(cache_entry):
+                        log.debug("Response cache fresh hit : {0}", url_path)
+                        response_cache.hit(cache_key)
+                        return cache_entry["body"]
+                    head.update(response_cache.conditional_headers(cache_entry))
+
+            if not circuit_breaker.allow_request(server):
+                log.debug("Server circuit open, failing fast : {0}", url_path)
+                if cache_entry is not None:
+                    # stale is better than nothing while the server is unreachable
+                    return cache_entry["body"]
+                return return_data
+
+            record_stats = network_stats.is_enabled()
+            capture_traffic = traffic_capture.is_enabled()
+            request_started = time.time()
+            try:
+                conn, data = connection_pool.request(pool_key, http_timeout, method, url_path, post_body, head)
+            except Exception:
+                circuit_breaker.record_failure(server)
+                if settings.server_addresses:
+                    # pick the address again, we might have moved to another network
+                    server_address_selector.invalidate()
+                raise
+            circuit_breaker.record_success(server)
+            response_started = time.time()
+            bytes_compressed = 0
+            bytes_uncompressed = 0
 
-            data = conn.getresponse()
             log.debug("HTTP response: {0} {1}", data.status, data.reason)
             log.debug("GET URL HEADERS: {0}", data.getheaders())
 
-            if int(data.status) == 200:
+            if int(data.status) == 304 and cache_entry is not None:
+                data.read()
+                log.debug("Response cache not modified : {0}", url_path)
+                return_data = response_cache.revalidated(cache_key, cache_entry, data)
+
+            elif int(data.status) == 200:
                 ret_data = data.read()
                 content_type = data.getheader('content-encoding')
+                bytes_compressed = len(ret_data)
                 log.debug("Data Len Before: {0}", len(ret_data))
                 if content_type == "gzip":
                     ret_data = BytesIO(ret_data)
@@ -814,30 +975,44 @@ class DownloadUtils:
                     return_data = gzipper.read()
                 else:
                     return_data = ret_data
+                bytes_uncompressed = len(return_data)
                 if headers is not None and isinstance(headers, dict):
                     headers.update(data.getheaders())
+                if cache_key is not None:
+                    return_data = response_cache.store(cache_key, url_path, return_data, data)
                 log.debug("Data Len After: {0}", len(return_data))
                 log.debug("====== 200 returned =======")
                 log.debug("Content-Type: {0}", content_type)
                 log.debug("{0}", return_data)
                 log.debug("====== 200 finished ======")
 
+            elif int(data.status) == 401 and authenticate and auth_retry:
+                data.read()
+                connection_pool.release_connection(conn, data)
+                conn = None
+                self.renew_auth(head)
+                return self.send_request(url, suppress, request_body, method, authenticate, headers, timeout,
+                                         auth_retry=False)
+
             elif int(data.status) >= 400:
+                self.handle_error_response(data, username, suppress)
 
-                if int(data.status) == 401:
-                    # remove any saved password
-                    m = hashlib.md5()
-                    m.update(username)
-                    hashed_username = m.hexdigest()
-                    log.error("HTTP response error 401 auth error, removing any saved passwords for user: {0}", hashed_username)
-                    settings.setSetting("saved_user_password_" + hashed_username, "")
-                    save_user_details(settings, "", "")
-
-                log.error("HTTP response error: {0} {1}", data.status, data.reason)
-                if suppress is False:
-                    xbmcgui.Dialog().notification(string_load(30316),
-                                                  string_load(30200) % str(data.reason),
-                                                  icon="special://home/addons/plugin.video.embycon/icon.png")
+            else:
+                data.read()
+
+            if record_stats:
+                network_stats.record(method, url_path, data.status, time.time() - request_started,
+                                     response_started - request_started, bytes_compressed, bytes_uncompressed, conn.retries)
+
+            if capture_traffic:
+                captured_body = None
+                if int(data.status) in (200, 304):
+                    captured_body = return_data
+                traffic_capture.record(method, url, url_path, post_body, data.status, data.getheaders(), captured_body,
+                                       bytes_compressed, request_started, response_started, time.time())
+
+            connection_pool.release_connection(conn, data)
+            conn = None
 
         except Exception as msg:
             log.error("Unable to connect to {0} : {1}", server, msg)
@@ -847,10 +1022,151 @@ class DownloadUtils:
                                               icon="special://home/addons/plugin.video.embycon/icon.png")
 
         finally:
-            try:
+            if conn is not None:
                 log.debug("Closing HTTP connection: {0}", conn)
-                conn.close()
-            except:
-                pass
+                connection_pool.discard_connection(conn)
 
         return return_data
+
+    @timer
+    def download_many(self, urls, suppress=True, timeout=None, max_workers=DOWNLOAD_MANY_WORKERS):
+        # run a batch of independent GET requests at the same time over the pooled connections,
+        # results are in the same order as the urls and a failed request gives "null" like download_url()
+        if len(urls) < 2:
+            return [self.download_url(url, suppress=suppress, timeout=timeout) for url in urls]
+
+        results = ["null"] * len(urls)
+        worker_count = min(max_workers, len(urls))
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            futures = []
+            for url in urls:
+                futures.append(executor.submit(self.download_url, url, suppress=suppress, timeout=timeout))
+            for index, future in enumerate(futures):
+                try:
+                    results[index] = future.result()
+                except Exception as error:
+                    log.error("download_many : request failed {0} : {1}", urls[index], error)
+
+        log.debug("download_many : {0} requests on {1} threads", len(urls), worker_count)
+        return results
+
+    def download_url_stream(self, url, suppress=False, authenticate=True, chunk_size=STREAM_CHUNK_SIZE, auth_retry=True):
+        # generator version of download_url() for very large responses,
+        # yields the body in decompressed chunks as it arrives instead of holding
+        # the compressed and the decompressed copy of the whole body in memory
+        log.debug("DownloadUrlStream : {0}", url)
+
+        settings = get_settings()
+        user_details = load_user_details(settings)
+        username = user_details.get("username", "")
+        server = None
+
+        if authenticate and username == "":
+            return
+
+        if settings.suppress_errors:
+            suppress = True
+
+        conn = None
+        data = None
+        capture_body = None
+
+        try:
+
+            request = self.build_request(url, None, authenticate)
+            if request is None:
+                return
+            server, pool_key, url_path, post_body, head = request
+
+            if not circuit_breaker.allow_request(server):
+                log.debug("Server circuit open, failing fast : {0}", url_path)
+                return
+
+            if traffic_capture.is_enabled():
+                # written to disk as it streams, holding it until the end would hold the whole body
+                # item lists carry no login token so the body is not scrubbed like download_url() does
+                capture_body = traffic_capture.open_body_file()
+            request_started = time.time()
+            try:
+                conn, data = connection_pool.request(pool_key, settings.http_timeout, "GET", url_path, None, head)
+            except Exception:
+                circuit_breaker.record_failure(server)
+                raise
+            circuit_breaker.record_success(server)
+            response_started = time.time()
+            bytes_read = 0
+            bytes_decoded = 0
+
+            log.debug("HTTP response: {0} {1}", data.status, data.reason)
+
+            if int(data.status) == 200:
+                decompressor = None
+                if data.getheader('content-encoding') == "gzip":
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+                while True:
+                    chunk = data.read(chunk_size)
+                    if not chunk:
+                        break
+                    bytes_read += len(chunk)
+                    if decompressor is not None:
+                        chunk = decompressor.decompress(chunk)
+                    if chunk:
+                        bytes_decoded += len(chunk)
+                        if capture_body is not None:
+                            capture_body[1].write(chunk)
+                        yield chunk
+
+                if decompressor is not None:
+                    chunk = decompressor.flush()
+                    if chunk:
+                        bytes_decoded += len(chunk)
+                        if capture_body is not None:
+                            capture_body[1].write(chunk)
+                        yield chunk
+
+                log.debug("DownloadUrlStream : Data Len Before: {0} After: {1}", bytes_read, bytes_decoded)
+
+            elif int(data.status) == 401 and authenticate and auth_retry:
+                data.read()
+                connection_pool.release_connection(conn, data)
+                conn = None
+                self.renew_auth(head)
+                yield from self.download_url_stream(url, suppress, authenticate, chunk_size, auth_retry=False)
+                return
+
+            elif int(data.status) >= 400:
+                self.handle_error_response(data, username, suppress)
+
+            else:
+                data.read()
+
+            if network_stats.is_enabled():
+                # includes the time the caller spent on the items between reads
+                network_stats.record("GET", url_path, data.status, time.time() - request_started,
+                                     response_started - request_started, bytes_read, bytes_decoded, conn.retries)
+
+            if capture_body is not None:
+                body_name, body_file = capture_body
+                body_file.close()
+                capture_body = None
+                traffic_capture.record("GET", url, url_path, None, data.status, data.getheaders(), None,
+                                       bytes_read, request_started, response_started, time.time(), body_file=body_name)
+
+            connection_pool.release_connection(conn, data)
+            conn = None
+
+        except Exception as msg:
+            log.error("Unable to connect to {0} : {1}", server, msg)
+            if suppress is False:
+                xbmcgui.Dialog().notification(string_load(30316),
+                                              str(msg),
+                                              icon="special://home/addons/plugin.video.embycon/icon.png")
+
+        finally:
+            # also runs if the caller stops reading early, the half read connection can not be reused
+            if capture_body is not None:
+                capture_body[1].close()
+            if conn is not None:
+                log.debug("Closing HTTP connection: {0}", conn)
+                connection_pool.discard_connection(conn)
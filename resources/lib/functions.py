@@ -27,6 +27,7 @@ from .simple_logging import SimpleLogging
 from .menu_functions import display_main_menu, display_menu, show_movie_alpha_list, show_tvshow_alpha_list, show_genre_list, show_search, show_movie_pages, show_tvshow_pages, get_node_url
 from .translation import string_load
 from .server_sessions import show_server_sessions
+from .network_stats import show_network_stats
 from .action_menu import ActionMenu
 from .bitrate_dialog import BitrateDialog
 from .safe_delete_dialog import SafeDeleteDialog
@@ -147,6 +148,8 @@ def main_entry_point():
         search_results_person(params)
     elif mode == "SHOW_SERVER_SESSIONS":
         show_server_sessions()
+    elif mode == "SHOW_NETWORK_STATS":
+        show_network_stats()
     elif mode == "TRAKTTOKODI":
         trakttokodi.entry_point(params)
     elif mode == "SHOW_ADDON_MENU":
@@ -7,17 +7,18 @@ import urllib.error
 
 from datetime import datetime
 
-from collections import defaultdict
+from operator import attrgetter
 
 import xbmc
 import xbmcaddon
 import xbmcgui
 import xbmcvfs
 
-from .utils import get_art, datetime_from_string
+from .utils import get_art, datetime_from_string, ArtworkResolver
 from .simple_logging import SimpleLogging
 from .downloadutils import DownloadUtils
 from .kodi_utils import HomeWindow
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 kodi_version = int(xbmc.getInfoLabel('System.BuildVersion')[:2])
@@ -30,73 +31,130 @@ download_utils = DownloadUtils()
 home_window = HomeWindow()
 
 
+# field name and default value of ItemDetails, the order is the order of the saved state
+ITEM_DETAILS_FIELDS = (
+    ("name", None),
+    ("sort_name", None),
+    ("id", None),
+    ("etag", None),
+    ("path", None),
+    ("is_folder", False),
+    ("plot", None),
+    ("series_name", None),
+    ("episode_number", 0),
+    ("season_number", 0),
+    ("episode_sort_number", 0),
+    ("season_sort_number", 0),
+    ("track_number", 0),
+    ("series_id", None),
+    ("art", None),
+
+    ("mpaa", None),
+    ("rating", None),
+    ("critic_rating", 0.0),
+    ("community_rating", 0.0),
+    ("year", None),
+    ("premiere_date", ""),
+    ("date_added", ""),
+    ("location_type", None),
+    ("studio", None),
+    ("production_location", None),
+    ("genres", None),
+    ("play_count", 0),
+    ("director", ""),
+    ("writer", ""),
+    ("cast", None),
+    ("tagline", ""),
+    ("status", None),
+    ("media_streams", None),
+    ("tags", None),
+
+    ("resume_time", 0),
+    ("duration", 0),
+    ("recursive_item_count", 0),
+    ("recursive_unplayed_items_count", 0),
+    ("total_seasons", 0),
+    ("total_episodes", 0),
+    ("watched_episodes", 0),
+    ("unwatched_episodes", 0),
+    ("number_episodes", 0),
+    ("original_title", None),
+    ("item_type", None),
+    ("subtitle_available", False),
+    ("total_items", 0),
+
+    ("song_artist", ""),
+    ("album_artist", ""),
+    ("album_name", ""),
+
+    ("program_channel_name", None),
+    ("program_end_date", None),
+    ("program_start_date", None),
+
+    ("favorite", "false"),
+    ("overlay", "0"),
+
+    ("name_format", ""),
+    ("mode", ""),
+
+    ("baseline_itemname", None),
+)
+
+STATE_FIELDS = tuple([field_name for field_name, default in ITEM_DETAILS_FIELDS])
+# all the state values in one call
+get_state_values = attrgetter(*STATE_FIELDS)
+
+# bump when ITEM_DETAILS_FIELDS changes, cached lists saved with another version are reloaded
+ITEM_STATE_VERSION = 2
+
+
+class NoneDict(dict):
+    """
+        Server json objects, a missing key reads as None so the item["Key"] is None checks work.
+        Used as the json object_hook, unlike a defaultdict it needs no closure per object
+        and can be pickled.
+    """
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        return None
+
+
+def intern_string(value):
+    # repeated values share one string object in memory and are saved once per pickle
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
 class ItemDetails:
+    """
+        One list item, slots only so the big cached lists are small in memory,
+        pickled as a versioned tuple of the field values.
+    """
 
-    name = None
-    sort_name = None
-    id = None
-    etag = None
-    path = None
-    is_folder = False
-    plot = None
-    series_name = None
-    episode_number = 0
-    season_number = 0
-    episode_sort_number = 0
-    season_sort_number = 0
-    track_number = 0
-    series_id = None
-    art = None
-
-    mpaa = None
-    rating = None
-    critic_rating = 0.0
-    community_rating = 0.0
-    year = None
-    premiere_date = ""
-    date_added = ""
-    location_type = None
-    studio = None
-    production_location = None
-    genres = None
-    play_count = 0
-    director = ""
-    writer = ""
-    cast = None
-    tagline = ""
-    status = None
-    media_streams = None
-    tags = None
-
-    resume_time = 0
-    duration = 0
-    recursive_item_count = 0
-    recursive_unplayed_items_count = 0
-    total_seasons = 0
-    total_episodes = 0
-    watched_episodes = 0
-    unwatched_episodes = 0
-    number_episodes = 0
-    original_title = None
-    item_type = None
-    subtitle_available = False
-    total_items = 0
-
-    song_artist = ""
-    album_artist = ""
-    album_name = ""
-
-    program_channel_name = None
-    program_end_date = None
-    program_start_date = None
-
-    favorite = "false"
-    overlay = "0"
-
-    name_format = ""
-    mode = ""
-
-    baseline_itemname = None
+    __slots__ = STATE_FIELDS
+
+    def __init__(self):
+        for field_name, default in ITEM_DETAILS_FIELDS:
+            setattr(self, field_name, default)
+
+    def __getstate__(self):
+        return ITEM_STATE_VERSION, get_state_values(self)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # pickled by versions before the slots
+            for field_name, default in ITEM_DETAILS_FIELDS:
+                setattr(self, field_name, state.get(field_name, default))
+            return
+
+        version, values = state
+        if version != ITEM_STATE_VERSION:
+            raise ValueError("Unknown ItemDetails state version %s" % version)
+        for name, value in zip(STATE_FIELDS, values):
+            setattr(self, name, value)
 
 
 def extract_media_info(item):
@@ -172,6 +230,54 @@ def extract_media_info(item):
     return media_info
 
 
+def apply_user_data(item_details, user_data):
+    # the UserData of an item, also used to patch cached items with UserDataChanged messages
+    if user_data["Played"] is True:
+        item_details.overlay = "6"
+        item_details.play_count = 1
+    else:
+        item_details.overlay = "7"
+        item_details.play_count = 0
+
+    if user_data["IsFavorite"] is True:
+        item_details.overlay = "5"
+        item_details.favorite = "true"
+    else:
+        item_details.favorite = "false"
+
+    reasonable_ticks = user_data["PlaybackPositionTicks"]
+    if reasonable_ticks is not None:
+        reasonable_ticks = int(reasonable_ticks) / 1000
+        item_details.resume_time = int(reasonable_ticks / 10000)
+
+    unplayed_item_count = user_data["UnplayedItemCount"]
+    if unplayed_item_count is not None:
+        item_details.unwatched_episodes = unplayed_item_count
+        item_details.watched_episodes = item_details.total_episodes - unplayed_item_count
+    item_details.recursive_unplayed_items_count = unplayed_item_count
+
+
+def build_gui_options(server, name_format=None):
+    # name_format is the "<item type>|<setting id>" plugin param, the setting has the format string
+    name_format_type = None
+    if name_format is not None:
+        name_format = urllib.parse.unquote(name_format)
+        tokens = name_format.split("|")
+        if len(tokens) == 2:
+            name_format_type = tokens[0]
+            name_format = get_settings().getSetting(tokens[1])
+        else:
+            name_format_type = None
+            name_format = None
+
+    gui_options = {}
+    gui_options["server"] = server
+    gui_options["name_format"] = name_format
+    gui_options["name_format_type"] = name_format_type
+    gui_options["artwork"] = ArtworkResolver(server)
+    return gui_options
+
+
 def extract_item_info(item, gui_options):
 
     item_details = ItemDetails()
@@ -179,8 +285,8 @@ def extract_item_info(item, gui_options):
     item_details.id = item["Id"]
     item_details.etag = item["Etag"]
     item_details.is_folder = item["IsFolder"]
-    item_details.item_type = item["Type"]
-    item_details.location_type = item["LocationType"]
+    item_details.item_type = intern_string(item["Type"])
+    item_details.location_type = intern_string(item["LocationType"])
     item_details.name = item["Name"]
     item_details.sort_name = item["SortName"]
     item_details.original_title = item_details.name
@@ -188,7 +294,7 @@ def extract_item_info(item, gui_options):
     if item_details.item_type == "Episode":
         item_details.episode_number = item["IndexNumber"]
         item_details.season_number = item["ParentIndexNumber"]
-        item_details.series_id = item["SeriesId"]
+        item_details.series_id = intern_string(item["SeriesId"])
 
         if item_details.season_number != 0:
             item_details.season_sort_number = item_details.season_number
@@ -208,20 +314,20 @@ def extract_item_info(item, gui_options):
 
     elif item_details.item_type == "Season":
         item_details.season_number = item["IndexNumber"]
-        item_details.series_id = item["SeriesId"]
+        item_details.series_id = intern_string(item["SeriesId"])
 
     elif item_details.item_type == "Series":
-        item_details.status = item["Status"]
+        item_details.status = intern_string(item["Status"])
 
     elif item_details.item_type == "Audio":
         item_details.track_number = item["IndexNumber"]
-        item_details.album_name = item["Album"]
+        item_details.album_name = intern_string(item["Album"])
         artists = item["Artists"]
         if artists is not None and len(artists) > 0:
-            item_details.song_artist = artists[0]  # get first artist
+            item_details.song_artist = intern_string(artists[0])  # get first artist
 
     elif item_details.item_type == "MusicAlbum":
-        item_details.album_artist = item["AlbumArtist"]
+        item_details.album_artist = intern_string(item["AlbumArtist"])
         item_details.album_name = item_details.name
 
     if item_details.season_number is None:
@@ -235,7 +341,7 @@ def extract_item_info(item, gui_options):
     item_details.tags = []
     if item["TagItems"] is not None and len(item["TagItems"]) > 0:
         for tag_info in item["TagItems"]:
-            item_details.tags.append(tag_info["Name"])
+            item_details.tags.append(intern_string(tag_info["Name"]))
 
     # set the item name
     # override with name format string from request
@@ -290,11 +396,11 @@ def extract_item_info(item, gui_options):
             if stream_type == "Video":
                 media_info = {}
                 media_info["type"] = "video"
-                media_info["codec"] = mediaStream["Codec"]
+                media_info["codec"] = intern_string(mediaStream["Codec"])
                 media_info["height"] = mediaStream["Height"]
                 media_info["width"] = mediaStream["Width"]
                 aspect_ratio = mediaStream["AspectRatio"]
-                media_info["apect"] = aspect_ratio
+                media_info["apect"] = intern_string(aspect_ratio)
                 if aspect_ratio is not None and len(aspect_ratio) >= 3:
                     try:
                         aspect_width, aspect_height = aspect_ratio.split(':')
@@ -307,15 +413,15 @@ def extract_item_info(item, gui_options):
             if stream_type == "Audio":
                 media_info = {}
                 media_info["type"] = "audio"
-                media_info["codec"] = mediaStream["Codec"]
+                media_info["codec"] = intern_string(mediaStream["Codec"])
                 media_info["channels"] = mediaStream["Channels"]
-                media_info["language"] = mediaStream["Language"]
+                media_info["language"] = intern_string(mediaStream["Language"])
                 media_info_list.append(media_info)
             if stream_type == "Subtitle":
                 item_details.subtitle_available = True
                 media_info = {}
                 media_info["type"] = "sub"
-                media_info["language"] = mediaStream["Language"]
+                media_info["language"] = intern_string(mediaStream["Language"])
                 media_info_list.append(media_info)
 
         item_details.media_streams = media_info_list
@@ -329,7 +435,7 @@ def extract_item_info(item, gui_options):
             if person_type == "Director" and person["Name"] is not None:
                 item_details.director = item_details.director + person["Name"] + ' '
             elif person_type == "Writing" and person["Name"] is not None:
-                item_details.writer = person["Name"]
+                item_details.writer = intern_string(person["Name"])
             elif person_type == "Actor" and person["Name"] is not None:
                 # log.debug("Person: {0}", person)
                 person_name = person["Name"]
@@ -353,44 +459,26 @@ def extract_item_info(item, gui_options):
         for studio in studios:
             if item_details.studio is None:  # Just take the first one
                 studio_name = studio["Name"]
-                item_details.studio = studio_name
+                item_details.studio = intern_string(studio_name)
                 break
 
     # production location
     prod_location = item["ProductionLocations"]
     # log.debug("ProductionLocations : {0}", prod_location)
     if prod_location and len(prod_location) > 0:
-        item_details.production_location = prod_location[0]
+        item_details.production_location = intern_string(prod_location[0])
 
     # Process Genres
     genres = item["Genres"]
     if genres is not None and len(genres) > 0:
-        item_details.genres = genres
+        item_details.genres = [intern_string(genre) for genre in genres]
 
     # Process UserData
     user_data = item["UserData"]
     if user_data is None:
-        user_data = defaultdict(lambda: None, {})
+        user_data = NoneDict()
 
-    if user_data["Played"] is True:
-        item_details.overlay = "6"
-        item_details.play_count = 1
-    else:
-        item_details.overlay = "7"
-        item_details.play_count = 0
-
-    if user_data["IsFavorite"] is True:
-        item_details.overlay = "5"
-        item_details.favorite = "true"
-    else:
-        item_details.favorite = "false"
-
-    reasonable_ticks = user_data["PlaybackPositionTicks"]
-    if reasonable_ticks is not None:
-        reasonable_ticks = int(reasonable_ticks) / 1000
-        item_details.resume_time = int(reasonable_ticks / 10000)
-
-    item_details.series_name = item["SeriesName"]
+    item_details.series_name = intern_string(item["SeriesName"])
     item_details.plot = item["Overview"]
 
     runtime = item["RunTimeTicks"]
@@ -405,16 +493,18 @@ def extract_item_info(item, gui_options):
     if recursive_item_count is not None:
         item_details.total_episodes = recursive_item_count
 
-    unplayed_item_count = user_data["UnplayedItemCount"]
-    if unplayed_item_count is not None:
-        item_details.unwatched_episodes = unplayed_item_count
-        item_details.watched_episodes = item_details.total_episodes - unplayed_item_count
+    apply_user_data(item_details, user_data)
 
     item_details.number_episodes = item_details.total_episodes
 
-    item_details.art = get_art(item, gui_options["server"])
-    item_details.rating = item["OfficialRating"]
-    item_details.mpaa = item["OfficialRating"]
+    # the ArtworkResolver is shared by the items of the list
+    artwork = gui_options.get("artwork")
+    if artwork is not None:
+        item_details.art = artwork.get_art(item)
+    else:
+        item_details.art = get_art(item, gui_options["server"])
+    item_details.rating = intern_string(item["OfficialRating"])
+    item_details.mpaa = item_details.rating
 
     item_details.community_rating = item["CommunityRating"]
     if item_details.community_rating is None:
@@ -424,280 +514,307 @@ def extract_item_info(item, gui_options):
     if item_details.critic_rating is None:
         item_details.critic_rating = 0.0
 
-    item_details.location_type = item["LocationType"]
+    item_details.location_type = intern_string(item["LocationType"])
     item_details.recursive_item_count = item["RecursiveItemCount"]
-    item_details.recursive_unplayed_items_count = user_data["UnplayedItemCount"]
 
     item_details.mode = "GET_CONTENT"
 
     return item_details
 
 
-def add_gui_item(url, item_details, display_options, folder=True, default_sort=False):
-
-    # log.debug("item_details: {0}", item_details.__dict__)
-
-    if not item_details.name:
-        return None
-
-    if item_details.mode:
-        mode = "&mode=%s" % item_details.mode
-    else:
-        mode = "&mode=0"
-
-    # Create the URL to pass to the item
-    if folder:
-        u = sys.argv[0] + "?url=" + urllib.parse.quote(url) + mode + "&media_type=" + item_details.item_type
-        if item_details.name_format:
-            u += '&name_format=' + urllib.parse.quote(item_details.name_format)
-        if default_sort:
-            u += '&sort=none'
-    else:
-        u = sys.argv[0] + "?item_id=" + url + "&mode=PLAY"
-
-    # Create the ListItem that will be displayed
-    thumb_path = item_details.art["thumb"]
-
-    list_item_name = item_details.name
-    item_type = item_details.item_type.lower()
-    is_video = item_type not in ['musicalbum', 'audio', 'music']
-
-    # calculate percentage
-    capped_percentage = 0
-    if item_details.resume_time > 0:
-        duration = float(item_details.duration)
-        if duration > 0:
-            resume = float(item_details.resume_time)
-            percentage = int((resume / duration) * 100.0)
-            capped_percentage = percentage
-
-    total_items = item_details.total_episodes
-    if total_items != 0:
-        watched = float(item_details.watched_episodes)
-        percentage = int((watched / float(total_items)) * 100.0)
-        capped_percentage = percentage
-
-    counts_added = False
-    add_counts = display_options["addCounts"]
-    if add_counts and item_details.unwatched_episodes != 0:
-        counts_added = True
-        list_item_name = list_item_name + (" (%s)" % item_details.unwatched_episodes)
-
-    add_resume_percent = display_options["addResumePercent"]
-    if (not counts_added
-            and add_resume_percent
-            and capped_percentage not in [0, 100]):
-        list_item_name = list_item_name + (" (%s%%)" % capped_percentage)
-
-    subtitle_available = display_options["addSubtitleAvailable"]
-    if subtitle_available and item_details.subtitle_available:
-        list_item_name += " (cc)"
-
-    if item_details.item_type == "Program":
-        start_time = datetime_from_string(item_details.program_start_date)
-        end_time = datetime_from_string(item_details.program_end_date)
-
-        duration = (end_time - start_time).total_seconds()
-        time_done = (datetime.now() - start_time).total_seconds()
-        percentage_done = (float(time_done) / float(duration)) * 100.0
-        capped_percentage = int(percentage_done)
-
-        start_time_string = start_time.strftime("%H:%M")
-        end_time_string = end_time.strftime("%H:%M")
-
-        item_details.duration = int(duration)
-        item_details.resume_time = int(time_done)
-
-        list_item_name = (item_details.program_channel_name +
-                          " - " + list_item_name +
-                          " - " + start_time_string + " to " + end_time_string +
-                          " (" + str(int(percentage_done)) + "%)")
-
-        time_info = "Start : " + start_time_string + "\n"
-        time_info += "End : " + end_time_string + "\n"
-        time_info += "Complete : " + str(int(percentage_done)) + "%\n"
-        if item_details.plot:
-            item_details.plot = time_info + item_details.plot
+# Kodi mediatype info label for the lower case item type, anything else is 'video'
+MEDIA_TYPES = {
+    'movie': 'movie',
+    'boxset': 'set',
+    'series': 'tvshow',
+    'season': 'season',
+    'episode': 'episode',
+    'musicalbum': 'album',
+    'musicartist': 'artist',
+    'audio': 'song',
+    'music': 'song',
+}
+
+MUSIC_TYPES = ('musicalbum', 'audio', 'music')
+
+
+class ListItemBuilder:
+    """
+        Makes the (url, ListItem, folder) tuples of one directory listing. The plugin url,
+        display options and Kodi version branches are worked out once for the list
+        and the genre labels once for each genre combination in it.
+    """
+
+    def __init__(self, display_options):
+        self.options_key = self.get_options_key(display_options)
+        plugin_url = sys.argv[0]
+        self.folder_url = plugin_url + "?url="
+        self.play_url = plugin_url + "?item_id="
+        self.add_counts = display_options["addCounts"]
+        self.add_resume_percent = display_options["addResumePercent"]
+        self.add_subtitle_available = display_options["addSubtitleAvailable"]
+        self.add_user_ratings = display_options["addUserRatings"]
+        self.offscreen = kodi_version > 17
+        self.cast_info_labels = kodi_version < 17
+        self.genre_labels = {}
+        self.quoted_genres = {}
+
+    @staticmethod
+    def get_options_key(display_options):
+        # everything the builder works out up front, a builder is reused while these stay the same
+        return (sys.argv[0], display_options["addCounts"], display_options["addResumePercent"],
+                display_options["addSubtitleAvailable"], display_options["addUserRatings"])
+
+    def quote_genre(self, genre):
+        quoted = self.quoted_genres.get(genre)
+        if quoted is None:
+            quoted = urllib.parse.quote(genre.encode('utf8'))
+            self.quoted_genres[genre] = quoted
+        return quoted
+
+    def get_genre_labels(self, genres):
+        # the genres property is quoted twice, skins unquote it per genre
+        key = tuple(genres)
+        labels = self.genre_labels.get(key)
+        if labels is None:
+            genres_list = [self.quote_genre(genre) for genre in genres]
+            labels = (urllib.parse.quote("|".join(genres_list)), " / ".join(genres))
+            self.genre_labels[key] = labels
+        return labels
+
+    def build(self, url, item_details, folder=True, default_sort=False):
+
+        if not item_details.name:
+            return None
+
+        if item_details.mode:
+            mode = "&mode=%s" % item_details.mode
         else:
-            item_details.plot = time_info
-
-    if kodi_version > 17:
-        list_item = xbmcgui.ListItem(list_item_name, offscreen=True)
-    else:
-        list_item = xbmcgui.ListItem(list_item_name, iconImage=thumb_path, thumbnailImage=thumb_path)
-
-    # log.debug("Setting thumbnail as: {0}", thumbPath)
+            mode = "&mode=0"
+
+        # Create the URL to pass to the item
+        if folder:
+            u = self.folder_url + urllib.parse.quote(url) + mode + "&media_type=" + item_details.item_type
+            if item_details.name_format:
+                u += '&name_format=' + urllib.parse.quote(item_details.name_format)
+            if default_sort:
+                u += '&sort=none'
+        else:
+            u = self.play_url + url + "&mode=PLAY"
+
+        art = item_details.art
+        list_item_name = item_details.name
+        item_type = item_details.item_type.lower()
+        is_video = item_type not in MUSIC_TYPES
+
+        # calculate percentage
+        capped_percentage = 0
+        if item_details.resume_time > 0:
+            duration = float(item_details.duration)
+            if duration > 0:
+                capped_percentage = int((float(item_details.resume_time) / duration) * 100.0)
+
+        total_items = item_details.total_episodes
+        if total_items != 0:
+            capped_percentage = int((float(item_details.watched_episodes) / float(total_items)) * 100.0)
+
+        counts_added = False
+        if self.add_counts and item_details.unwatched_episodes != 0:
+            counts_added = True
+            list_item_name = list_item_name + (" (%s)" % item_details.unwatched_episodes)
+
+        if (not counts_added
+                and self.add_resume_percent
+                and capped_percentage not in [0, 100]):
+            list_item_name = list_item_name + (" (%s%%)" % capped_percentage)
+
+        if self.add_subtitle_available and item_details.subtitle_available:
+            list_item_name += " (cc)"
+
+        if item_details.item_type == "Program":
+            start_time = datetime_from_string(item_details.program_start_date)
+            end_time = datetime_from_string(item_details.program_end_date)
+
+            duration = (end_time - start_time).total_seconds()
+            time_done = (datetime.now() - start_time).total_seconds()
+            percentage_done = (float(time_done) / float(duration)) * 100.0
+            capped_percentage = int(percentage_done)
+
+            start_time_string = start_time.strftime("%H:%M")
+            end_time_string = end_time.strftime("%H:%M")
+
+            item_details.duration = int(duration)
+            item_details.resume_time = int(time_done)
+
+            list_item_name = (item_details.program_channel_name +
+                              " - " + list_item_name +
+                              " - " + start_time_string + " to " + end_time_string +
+                              " (" + str(int(percentage_done)) + "%)")
+
+            time_info = "Start : " + start_time_string + "\n"
+            time_info += "End : " + end_time_string + "\n"
+            time_info += "Complete : " + str(int(percentage_done)) + "%\n"
+            if item_details.plot:
+                item_details.plot = time_info + item_details.plot
+            else:
+                item_details.plot = time_info
+
+        if self.offscreen:
+            list_item = xbmcgui.ListItem(list_item_name, offscreen=True)
+        else:
+            thumb_path = art["thumb"]
+            list_item = xbmcgui.ListItem(list_item_name, iconImage=thumb_path, thumbnailImage=thumb_path)
+
+        list_item.setArt(art)
+
+        item_properties = {
+            "IsPlayable": 'false',
+            "fanart_image": art['fanart'],  # back compat
+            "discart": art['discart'],  # not avail to setArt
+            "tvshow.poster": art['tvshow.poster'],  # not avail to setArt
+            "ItemType": item_details.item_type,
+            "id": item_details.id
+        }
+
+        if capped_percentage != 0:
+            item_properties["complete_percentage"] = str(capped_percentage)
+
+        if not folder and is_video:
+            item_properties["ResumeTime"] = str(item_details.resume_time)
+
+        if item_details.series_id:
+            item_properties["series_id"] = item_details.series_id
+
+        info_labels = {
+            "title": list_item_name,
+            "sorttitle": item_details.sort_name or list_item_name,
+            "duration": item_details.duration,
+            "playcount": item_details.play_count,
+            "rating": item_details.rating,
+            "year": item_details.year,
+            "mediatype": MEDIA_TYPES.get(item_type, 'video')
+        }
+
+        # add cast, an empty cast needs no call
+        cast = item_details.cast
+        if cast:
+            if self.cast_info_labels:
+                info_labels['cast'] = info_labels['castandrole'] = [(cast_member['name'], cast_member['role']) for cast_member in cast]
+            else:
+                list_item.setCast(cast)
+
+        genres = item_details.genres
+        if genres:
+            item_properties["genres"], info_labels["genre"] = self.get_genre_labels(genres)
+
+        if item_type == 'episode':
+            info_labels["episode"] = item_details.episode_number
+            info_labels["season"] = item_details.season_number
+            info_labels["sortseason"] = item_details.season_sort_number
+            info_labels["sortepisode"] = item_details.episode_sort_number
+            info_labels["tvshowtitle"] = item_details.series_name
+            if item_details.season_number == 0:
+                item_properties["IsSpecial"] = "true"
+
+        elif item_type == 'season':
+            info_labels["season"] = item_details.season_number
+            info_labels["episode"] = item_details.total_episodes
+            info_labels["tvshowtitle"] = item_details.series_name
+            if item_details.season_number == 0:
+                item_properties["IsSpecial"] = "true"
+
+        elif item_type == "series":
+            info_labels["episode"] = item_details.total_episodes
+            info_labels["season"] = item_details.total_seasons
+            info_labels["status"] = item_details.status
+            info_labels["tvshowtitle"] = item_details.name
+
+        if is_video:
+
+            info_labels["Overlay"] = item_details.overlay
+            info_labels["tagline"] = item_details.tagline
+            info_labels["studio"] = item_details.studio
+            info_labels["premiered"] = item_details.premiere_date
+            info_labels["plot"] = item_details.plot
+            info_labels["director"] = item_details.director
+            info_labels["writer"] = item_details.writer
+            info_labels["dateadded"] = item_details.date_added
+            info_labels["country"] = item_details.production_location
+            info_labels["mpaa"] = item_details.mpaa
+            info_labels["tag"] = item_details.tags
+
+            if self.add_user_ratings:
+                info_labels["userrating"] = item_details.critic_rating
+
+            if item_type in ('movie', 'series'):
+                info_labels["trailer"] = "plugin://plugin.video.embycon?mode=playTrailer&id=" + item_details.id
+
+            list_item.setInfo('video', info_labels)
+
+            if item_details.media_streams is not None:
+                for stream in item_details.media_streams:
+                    if stream["type"] == "video":
+                        list_item.addStreamInfo('video',
+                                                {'duration': item_details.duration,
+                                                 'aspect': stream["apect_ratio"],
+                                                 'codec': stream["codec"],
+                                                 'width': stream["width"],
+                                                 'height': stream["height"]})
+                    elif stream["type"] == "audio":
+                        list_item.addStreamInfo('audio',
+                                                {'codec': stream["codec"],
+                                                 'channels': stream["channels"],
+                                                 'language': stream["language"]})
+                    elif stream["type"] == "sub":
+                        list_item.addStreamInfo('subtitle',
+                                                {'language': stream["language"]})
+
+            item_properties["TotalSeasons"] = str(item_details.total_seasons)
+            item_properties["TotalEpisodes"] = str(item_details.total_episodes)
+            item_properties["WatchedEpisodes"] = str(item_details.watched_episodes)
+            item_properties["UnWatchedEpisodes"] = str(item_details.unwatched_episodes)
+            item_properties["NumEpisodes"] = str(item_details.number_episodes)
+            item_properties["TotalTime"] = str(item_details.duration)
+
+            list_item.setRating("imdb", item_details.community_rating, 0, True)
 
-    item_properties = {}
+        else:
+            info_labels["tracknumber"] = item_details.track_number
+            if item_details.album_artist:
+                info_labels["artist"] = item_details.album_artist
+            elif item_details.song_artist:
+                info_labels["artist"] = item_details.song_artist
+            info_labels["album"] = item_details.album_name
 
-    # calculate percentage
-    if capped_percentage != 0:
-        item_properties["complete_percentage"] = str(capped_percentage)
+            list_item.setInfo('music', info_labels)
 
-    item_properties["IsPlayable"] = 'false'
+        list_item.setContentLookup(False)
 
-    if not folder and is_video:
-        item_properties["TotalTime"] = str(item_details.duration)
-        item_properties["ResumeTime"] = str(item_details.resume_time)
+        if item_details.baseline_itemname is not None:
+            item_properties["suggested_from_watching"] = item_details.baseline_itemname
 
-    list_item.setArt(item_details.art)
+        if self.offscreen:
+            list_item.setProperties(item_properties)
+        else:
+            for key, value in list(item_properties.items()):
+                list_item.setProperty(key, value)
 
-    item_properties["fanart_image"] = item_details.art['fanart']  # back compat
-    item_properties["discart"] = item_details.art['discart']  # not avail to setArt
-    item_properties["tvshow.poster"] = item_details.art['tvshow.poster']  # not avail to setArt
+        return u, list_item, folder
 
-    if item_details.series_id:
-        item_properties["series_id"] = item_details.series_id
 
-    # new way
-    info_labels = {}
+current_list_item_builder = None
 
-    # add cast
-    if item_details.cast is not None:
-        if kodi_version >= 17:
-            list_item.setCast(item_details.cast)
-        else:
-            info_labels['cast'] = info_labels['castandrole'] = [(cast_member['name'], cast_member['role']) for cast_member in item_details.cast]
 
-    info_labels["title"] = list_item_name
-    if item_details.sort_name:
-        info_labels["sorttitle"] = item_details.sort_name
-    else:
-        info_labels["sorttitle"] = list_item_name
-
-    info_labels["duration"] = item_details.duration
-    info_labels["playcount"] = item_details.play_count
-    # if item_details.favorite == 'true':
-    #    info_labels["top250"] = "1"
-
-    info_labels["rating"] = item_details.rating
-    info_labels["year"] = item_details.year
-
-    if item_details.genres is not None and len(item_details.genres) > 0:
-        genres_list = []
-        for genre in item_details.genres:
-            genres_list.append(urllib.parse.quote(genre.encode('utf8')))
-        item_properties["genres"] = urllib.parse.quote("|".join(genres_list))
-
-        info_labels["genre"] = " / ".join(item_details.genres)
-
-    mediatype = 'video'
-
-    if item_type == 'movie':
-        mediatype = 'movie'
-    elif item_type == 'boxset':
-        mediatype = 'set'
-    elif item_type == 'series':
-        mediatype = 'tvshow'
-    elif item_type == 'season':
-        mediatype = 'season'
-    elif item_type == 'episode':
-        mediatype = 'episode'
-    elif item_type == 'musicalbum':
-        mediatype = 'album'
-    elif item_type == 'musicartist':
-        mediatype = 'artist'
-    elif item_type == 'audio' or item_type == 'music':
-        mediatype = 'song'
-
-    info_labels["mediatype"] = mediatype
-
-    if item_type == 'episode':
-        info_labels["episode"] = item_details.episode_number
-        info_labels["season"] = item_details.season_number
-        info_labels["sortseason"] = item_details.season_sort_number
-        info_labels["sortepisode"] = item_details.episode_sort_number
-        info_labels["tvshowtitle"] = item_details.series_name
-        if item_details.season_number == 0:
-            item_properties["IsSpecial"] = "true"
-
-    elif item_type == 'season':
-        info_labels["season"] = item_details.season_number
-        info_labels["episode"] = item_details.total_episodes
-        info_labels["tvshowtitle"] = item_details.series_name
-        if item_details.season_number == 0:
-            item_properties["IsSpecial"] = "true"
-
-    elif item_type == "series":
-        info_labels["episode"] = item_details.total_episodes
-        info_labels["season"] = item_details.total_seasons
-        info_labels["status"] = item_details.status
-        info_labels["tvshowtitle"] = item_details.name
-
-    if is_video:
-
-        info_labels["Overlay"] = item_details.overlay
-        info_labels["tagline"] = item_details.tagline
-        info_labels["studio"] = item_details.studio
-        info_labels["premiered"] = item_details.premiere_date
-        info_labels["plot"] = item_details.plot
-        info_labels["director"] = item_details.director
-        info_labels["writer"] = item_details.writer
-        info_labels["dateadded"] = item_details.date_added
-        info_labels["country"] = item_details.production_location
-        info_labels["mpaa"] = item_details.mpaa
-        info_labels["tag"] = item_details.tags
-
-        if display_options["addUserRatings"]:
-            info_labels["userrating"] = item_details.critic_rating
-
-        if item_type in ('movie', 'series'):
-            info_labels["trailer"] = "plugin://plugin.video.embycon?mode=playTrailer&id=" + item_details.id
-
-        list_item.setInfo('video', info_labels)
-        # log.debug("info_labels: {0}", info_labels)
-
-        if item_details.media_streams is not None:
-            for stream in item_details.media_streams:
-                if stream["type"] == "video":
-                    list_item.addStreamInfo('video',
-                                            {'duration': item_details.duration,
-                                             'aspect': stream["apect_ratio"],
-                                             'codec': stream["codec"],
-                                             'width': stream["width"],
-                                             'height': stream["height"]})
-                elif stream["type"] == "audio":
-                    list_item.addStreamInfo('audio',
-                                            {'codec': stream["codec"],
-                                             'channels': stream["channels"],
-                                             'language': stream["language"]})
-                elif stream["type"] == "sub":
-                    list_item.addStreamInfo('subtitle',
-                                            {'language': stream["language"]})
-
-        item_properties["TotalSeasons"] = str(item_details.total_seasons)
-        item_properties["TotalEpisodes"] = str(item_details.total_episodes)
-        item_properties["WatchedEpisodes"] = str(item_details.watched_episodes)
-        item_properties["UnWatchedEpisodes"] = str(item_details.unwatched_episodes)
-        item_properties["NumEpisodes"] = str(item_details.number_episodes)
-
-        list_item.setRating("imdb", item_details.community_rating, 0, True)
-        # list_item.setRating("rt", item_details.critic_rating, 0, False)
-        item_properties["TotalTime"] = str(item_details.duration)
+def get_list_item_builder(display_options):
+    # the builder of the last call, made again when the display options or the plugin url change
+    global current_list_item_builder
+    builder = current_list_item_builder
+    if builder is None or builder.options_key != ListItemBuilder.get_options_key(display_options):
+        builder = ListItemBuilder(display_options)
+        current_list_item_builder = builder
+    return builder
 
-    else:
-        info_labels["tracknumber"] = item_details.track_number
-        if item_details.album_artist:
-            info_labels["artist"] = item_details.album_artist
-        elif item_details.song_artist:
-            info_labels["artist"] = item_details.song_artist
-        info_labels["album"] = item_details.album_name
-
-        # log.debug("info_labels: {0}", info_labels)
-        list_item.setInfo('music', info_labels)
-
-    list_item.setContentLookup(False)
-    item_properties["ItemType"] = item_details.item_type
-    item_properties["id"] = item_details.id
-
-    if item_details.baseline_itemname is not None:
-        item_properties["suggested_from_watching"] = item_details.baseline_itemname
-
-    # log.debug("item_properties: {0}", item_properties)
-    if kodi_version > 17:
-        list_item.setProperties(item_properties)
-    else:
-        for key, value in list(item_properties.items()):
-            list_item.setProperty(key, value)
 
-    return u, list_item, folder
+def add_gui_item(url, item_details, display_options, folder=True, default_sort=False):
+    # directory listings use one ListItemBuilder for all their items, single items share the last one
+    return get_list_item_builder(display_options).build(url, item_details, folder, default_sort)
@@ -3,6 +3,7 @@ import time
 
 import xbmc
 
+from .kodi_utils import HomeWindow
 from .simple_logging import SimpleLogging
 from .widgets import check_for_new_content
 from .tracking import timer
@@ -14,8 +15,15 @@ class LibraryChangeMonitor(threading.Thread):
 
     last_library_change_check = 0
     library_check_triggered = False
+    widget_reload_triggered = False
+    widget_reload_first_request = 0
+    widget_reload_last_request = 0
     exit_now = False
     time_between_checks = 3
+    # a library scan sends messages every few seconds, the widgets reload once they stop
+    widget_reload_quiet_time = 10
+    # or this long after the first message if they keep coming
+    widget_reload_max_wait = 60
 
     def __init__(self):
         threading.Thread.__init__(self)
@@ -28,6 +36,21 @@ class LibraryChangeMonitor(threading.Thread):
         log.debug("Trigger check for updates")
         self.library_check_triggered = True
 
+    def reload_widgets(self):
+        # the change is already known, the widgets are reloaded without asking the server for new content
+        log.debug("Trigger widget reload")
+        now = time.time()
+        if not self.widget_reload_triggered:
+            self.widget_reload_first_request = now
+        self.widget_reload_last_request = now
+        self.widget_reload_triggered = True
+
+    def is_widget_reload_due(self, now):
+        if not self.widget_reload_triggered:
+            return False
+        return (now - self.widget_reload_last_request >= self.widget_reload_quiet_time
+                or now - self.widget_reload_first_request >= self.widget_reload_max_wait)
+
     def run(self):
         log.debug("Library Monitor Started")
         monitor = xbmc.Monitor()
@@ -39,6 +62,11 @@ class LibraryChangeMonitor(threading.Thread):
                 self.library_check_triggered = False
                 self.last_library_change_check = time.time()
 
+            if self.is_widget_reload_due(time.time()) and not xbmc.Player().isPlaying():
+                log.debug("Reloading widgets")
+                HomeWindow().set_property("embycon_widget_reload", str(time.time()))
+                self.widget_reload_triggered = False
+
             if self.exit_now or monitor.waitForAbort(self.time_between_checks):
                 break
 
@@ -19,6 +19,7 @@ from .translation import string_load
 from .datamanager import DataManager
 from .utils import get_art, get_emby_url
 from .custom_nodes import CustomNode, load_custom_nodes
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 downloadUtils = DownloadUtils()
@@ -734,6 +735,8 @@ def display_addon_menu(params):
 
     add_menu_directory_item(string_load(30246), "plugin://plugin.video.embycon/?mode=SEARCH")
     add_menu_directory_item(string_load(30017), "plugin://plugin.video.embycon/?mode=SHOW_SERVER_SESSIONS")
+    if get_settings().record_network_stats:
+        add_menu_directory_item(string_load(30450), "plugin://plugin.video.embycon/?mode=SHOW_NETWORK_STATS")
     add_menu_directory_item(string_load(30012), "plugin://plugin.video.embycon/?mode=CHANGE_USER")
     add_menu_directory_item(string_load(30011), "plugin://plugin.video.embycon/?mode=DETECT_SERVER_USER")
     add_menu_directory_item(string_load(30435), "plugin://plugin.video.embycon/?mode=DETECT_CONNECTION_SPEED")
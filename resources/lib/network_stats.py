@@ -0,0 +1,215 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import xbmcaddon
+import xbmcgui
+import xbmcplugin
+import xbmcvfs
+
+from .filelock import FileLock
+from .simple_logging import SimpleLogging
+from .settings_snapshot import get_settings
+
+log = SimpleLogging(__name__)
+
+# upper bounds in ms of the latency histogram buckets, the last bucket takes everything above
+LATENCY_BUCKETS = [5, 10, 25, 50, 75, 100, 150, 250, 400, 600, 1000, 1500, 2500, 4000, 6000, 10000, 20000, 60000]
+
+# path parts that are ids, replaced so all calls to the same endpoint are counted together
+ID_PATTERN = re.compile(r"/([0-9a-fA-F]{32}|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)(?=/|$)")
+
+
+def normalize_endpoint(method, url_path):
+    path = url_path.split("?", 1)[0]
+    path = ID_PATTERN.sub("/{id}", path)
+    return method + " " + path
+
+
+def new_endpoint_stats():
+    return {
+        "count": 0,
+        "latency": [0] * (len(LATENCY_BUCKETS) + 1),
+        "ttfb": [0] * (len(LATENCY_BUCKETS) + 1),
+        "latency_total": 0.0,
+        "bytes_compressed": 0,
+        "bytes_uncompressed": 0,
+        "statuses": {},
+        "retries": 0
+    }
+
+
+def get_bucket(value_ms):
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if value_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS)
+
+
+def merge_endpoint_stats(target, source):
+    target["count"] += source["count"]
+    for index, value in enumerate(source["latency"]):
+        target["latency"][index] += value
+    for index, value in enumerate(source["ttfb"]):
+        target["ttfb"][index] += value
+    target["latency_total"] += source["latency_total"]
+    target["bytes_compressed"] += source["bytes_compressed"]
+    target["bytes_uncompressed"] += source["bytes_uncompressed"]
+    for status, count in source["statuses"].items():
+        target["statuses"][status] = target["statuses"].get(status, 0) + count
+    target["retries"] += source["retries"]
+
+
+def get_percentile(histogram, percentile):
+    # upper bound of the bucket the percentile falls in
+    total = sum(histogram)
+    if total == 0:
+        return 0
+    wanted = total * percentile / 100.0
+    running = 0
+    for index, count in enumerate(histogram):
+        running += count
+        if running >= wanted:
+            if index < len(LATENCY_BUCKETS):
+                return LATENCY_BUCKETS[index]
+            return LATENCY_BUCKETS[-1]
+    return LATENCY_BUCKETS[-1]
+
+
+class NetworkStats:
+    """
+        Per endpoint request stats collected in memory and merged into a rolling
+        on disk store shared by the plugin and service processes, one window per hour
+    """
+
+    stats_file = os.path.join(xbmcvfs.translatePath(xbmcaddon.Addon().getAddonInfo('profile')), "network_stats.json")
+    window_size = 3600
+    windows_kept = 24
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    @staticmethod
+    def is_enabled():
+        return get_settings().record_network_stats
+
+    def record(self, method, url_path, status, latency, ttfb, bytes_compressed, bytes_uncompressed, retries):
+        endpoint = normalize_endpoint(method, url_path)
+        with self.lock:
+            stats = self.pending.get(endpoint)
+            if stats is None:
+                stats = new_endpoint_stats()
+                self.pending[endpoint] = stats
+            stats["count"] += 1
+            stats["latency"][get_bucket(latency * 1000.0)] += 1
+            stats["ttfb"][get_bucket(ttfb * 1000.0)] += 1
+            stats["latency_total"] += latency
+            stats["bytes_compressed"] += bytes_compressed
+            stats["bytes_uncompressed"] += bytes_uncompressed
+            status = str(status)
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            stats["retries"] += retries
+
+    def load(self):
+        if not os.path.exists(self.stats_file):
+            return {}
+        try:
+            with open(self.stats_file, "r") as handle:
+                return json.load(handle)
+        except Exception as error:
+            log.error("NetworkStats : Could not load {0} : {1}", self.stats_file, error)
+            return {}
+
+    def flush(self):
+        # merge what this process collected into the current window on disk
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+        if not pending:
+            return
+
+        now = time.time()
+        window_key = str(int(now // self.window_size) * self.window_size)
+        oldest_window = now - (self.window_size * self.windows_kept)
+        try:
+            with FileLock(self.stats_file, timeout=5):
+                windows = self.load()
+                for key in list(windows.keys()):
+                    if float(key) < oldest_window:
+                        del windows[key]
+
+                window = windows.setdefault(window_key, {})
+                for endpoint, stats in pending.items():
+                    if endpoint not in window:
+                        window[endpoint] = new_endpoint_stats()
+                    merge_endpoint_stats(window[endpoint], stats)
+
+                with open(self.stats_file, "w") as handle:
+                    json.dump(windows, handle)
+        except Exception as error:
+            log.error("NetworkStats : Could not save {0} : {1}", self.stats_file, error)
+
+    def get_summary(self):
+        # all the windows on disk merged per endpoint
+        self.flush()
+        summary = {}
+        for window in self.load().values():
+            for endpoint, stats in window.items():
+                if endpoint not in summary:
+                    summary[endpoint] = new_endpoint_stats()
+                merge_endpoint_stats(summary[endpoint], stats)
+        return summary
+
+
+network_stats = NetworkStats()
+
+
+def show_network_stats():
+    log.debug("show_network_stats Called")
+
+    handle = int(sys.argv[1])
+    summary = network_stats.get_summary()
+
+    # slowest endpoints first
+    endpoints = sorted(summary.items(), key=lambda entry: get_percentile(entry[1]["latency"], 95), reverse=True)
+
+    list_items = []
+    for endpoint, stats in endpoints:
+        p50 = get_percentile(stats["latency"], 50)
+        p95 = get_percentile(stats["latency"], 95)
+        p99 = get_percentile(stats["latency"], 99)
+        ttfb_p50 = get_percentile(stats["ttfb"], 50)
+
+        gzip_ratio = 0.0
+        if stats["bytes_uncompressed"] > 0:
+            gzip_ratio = float(stats["bytes_compressed"]) / float(stats["bytes_uncompressed"])
+
+        statuses = ", ".join(["%s:%s" % (status, count) for status, count in sorted(stats["statuses"].items())])
+
+        label = "%s  p50:%sms p95:%sms p99:%sms (%s)" % (endpoint, p50, p95, p99, stats["count"])
+        details = ("Requests: %s\n" % stats["count"] +
+                   "Latency p50/p95/p99: %s/%s/%s ms\n" % (p50, p95, p99) +
+                   "TTFB p50: %s ms\n" % ttfb_p50 +
+                   "Bytes: %s compressed, %s uncompressed, ratio %.2f\n" % (stats["bytes_compressed"], stats["bytes_uncompressed"], gzip_ratio) +
+                   "Statuses: %s\n" % statuses +
+                   "Retries: %s" % stats["retries"])
+
+        list_item = xbmcgui.ListItem(label=label)
+
+        info_labels = {}
+        info_labels["title"] = label
+        info_labels["plot"] = details
+        list_item.setInfo('video', info_labels)
+
+        item_tuple = ("", list_item, False)
+        list_items.append(item_tuple)
+
+    xbmcplugin.setContent(handle, "files")
+    xbmcplugin.addDirectoryItems(handle, list_items)
+    xbmcplugin.endOfDirectory(handle, cacheToDisc=False)
@@ -11,7 +11,7 @@ import os
 import base64
 
 from .simple_logging import SimpleLogging
-from .downloadutils import DownloadUtils
+from .downloadutils import DownloadUtils, clear_auth_header_cache
 from .resume_dialog import ResumeDialog
 from .utils import PlayUtils, get_art, send_event_notification, convert_size
 from .kodi_utils import HomeWindow
@@ -25,6 +25,7 @@ from .picture_viewer import PictureViewer
 from .tracking import timer
 from .playnext import PlayNextDialog
 from .skip_intro_dialog import SkipIntroMonitor
+from .settings_snapshot import invalidate_settings
 
 log = SimpleLogging(__name__)
 download_utils = DownloadUtils()
@@ -185,10 +186,13 @@ def play_list_of_items(id_list, auto_resume, monitor):
     data_manager = DataManager()
     items = []
 
+    urls = []
     for item_id in id_list:
         url = "{server}/emby/Users/{userid}/Items/%s?format=json"
-        url = url % (item_id,)
-        result = data_manager.get_content(url)
+        urls.append(url % (item_id,))
+
+    # a failed item shows the error dialog like a single get_content() does
+    for result in data_manager.get_contents(urls, suppress=False):
         if result is None:
             log.debug("Playfile item was None, so can not play!")
             return
@@ -1316,6 +1320,11 @@ class PlaybackService(xbmc.Monitor):
     def __init__(self, monitor):
         self.monitor = monitor
 
+    def onSettingsChanged(self):
+        log.debug("PlaybackService:onSettingsChanged")
+        invalidate_settings()
+        clear_auth_header_cache()
+
     def onNotification(self, sender, method, data):
         log.debug("PlaybackService:onNotification:{0}:{1}:{2}", sender, method, data)
 
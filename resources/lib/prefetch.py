@@ -0,0 +1,145 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+import threading
+import time
+
+import xbmc
+
+from .kodi_utils import HomeWindow
+from .simple_logging import SimpleLogging
+from .settings_snapshot import get_settings
+from .circuit_breaker import circuit_breaker
+
+log = SimpleLogging(__name__)
+
+# lower is fetched first
+PRIORITY_NEXT_PAGE = 0
+PRIORITY_IN_PROGRESS = 1
+PRIORITY_UNWATCHED = 2
+PRIORITY_OTHER = 3
+
+
+def get_item_priority(item_details):
+    # shows and seasons the user is part way through are the most likely next click
+    if item_details.unwatched_episodes > 0 and item_details.watched_episodes > 0:
+        return PRIORITY_IN_PROGRESS
+    if item_details.unwatched_episodes > 0:
+        return PRIORITY_UNWATCHED
+    return PRIORITY_OTHER
+
+
+def add_prefetch_target(targets, priority, url, name_format=None):
+    targets.append((priority, len(targets), url, name_format))
+
+
+def request_prefetch(targets):
+    # hand the top targets of the directory just shown to the service, replaces any earlier request
+    prefetch_count = get_settings().prefetch_count
+    if prefetch_count <= 0 or not targets:
+        return
+    targets = sorted(targets)[:prefetch_count]
+    request = {
+        "id": repr(time.time()),
+        "targets": [[url, name_format] for priority, order, url, name_format in targets]
+    }
+    HomeWindow().set_property("prefetch_request", json.dumps(request))
+
+
+def get_prefetch_stats():
+    values = HomeWindow().get_property("prefetch_stats").split("|")
+    if len(values) != 2:
+        return 0, 0
+    return int(values[0]), int(values[1])
+
+
+def update_prefetch_stats(fetched=0, hits=0):
+    total_fetched, total_hits = get_prefetch_stats()
+    total_fetched += fetched
+    total_hits += hits
+    HomeWindow().set_property("prefetch_stats", "%s|%s" % (total_fetched, total_hits))
+    return total_fetched, total_hits
+
+
+def record_prefetch_hit():
+    total_fetched, total_hits = update_prefetch_stats(hits=1)
+    log.debug("Prefetch : hit, {0} of {1} prefetched lists used", total_hits, total_fetched)
+
+
+class PrefetchThread(threading.Thread):
+    """
+        Loads the directories the user is likely to open next into the directory cache.
+        process_directory leaves the top targets in the prefetch_request home window property,
+        they are fetched one at a time after a short delay so the list being shown goes first,
+        a newer request drops what is left of the old one.
+    """
+
+    exit_now = False
+    check_interval = 1
+    start_delay = 2
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.home_window = HomeWindow()
+        self.last_request_id = None
+
+    def stop(self):
+        self.exit_now = True
+
+    def get_request(self):
+        value = self.home_window.get_property("prefetch_request")
+        if not value:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
+    def is_superseded(self, request_id):
+        request = self.get_request()
+        return request is not None and request["id"] != request_id
+
+    def can_prefetch(self):
+        if circuit_breaker.is_open():
+            return False
+        # leave the bandwidth to the video
+        if xbmc.Player().isPlayingVideo():
+            return False
+        return get_settings().use_cache
+
+    def run(self):
+        from .datamanager import DataManager
+        from .downloadutils import DownloadUtils
+        from .item_functions import build_gui_options
+
+        log.debug("PrefetchThread : Started")
+        monitor = xbmc.Monitor()
+        while not self.exit_now and not monitor.abortRequested():
+
+            request = self.get_request()
+            if request is not None and request["id"] != self.last_request_id:
+                self.last_request_id = request["id"]
+                if monitor.waitForAbort(self.start_delay) or self.exit_now:
+                    break
+
+                fetched = 0
+                server = DownloadUtils().get_server()
+                for url, name_format in request["targets"]:
+                    if self.exit_now or self.is_superseded(request["id"]) or not self.can_prefetch():
+                        break
+                    try:
+                        if DataManager().prefetch_items(url, build_gui_options(server, name_format)):
+                            fetched += 1
+                    except Exception as error:
+                        log.error("PrefetchThread : Could not prefetch {0} : {1}", url, error)
+
+                if fetched > 0:
+                    total_fetched, total_hits = update_prefetch_stats(fetched=fetched)
+                    hit_rate = (100.0 * total_hits / total_fetched) if total_fetched else 0.0
+                    log.info("PrefetchThread : prefetched {0} lists, totals fetched={1} hits={2} hit_rate={3:.1f}%",
+                             fetched, total_fetched, total_hits, hit_rate)
+
+            if self.exit_now or monitor.waitForAbort(self.check_interval):
+                break
+
+        log.debug("PrefetchThread : Exited")
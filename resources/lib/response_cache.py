@@ -0,0 +1,238 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import xbmcaddon
+import xbmcvfs
+
+from .kodi_utils import HomeWindow
+from .simple_logging import SimpleLogging
+
+log = SimpleLogging(__name__)
+
+# small mostly static lists that are worth revalidating instead of downloading again
+CACHEABLE_URL_PATTERNS = [
+    re.compile(r"/emby/Users/[^/?]+/Views(\?|$)", re.IGNORECASE),
+    re.compile(r"/emby/Genres(\?|$)", re.IGNORECASE),
+    re.compile(r"/emby/Items/Prefixes(\?|$)", re.IGNORECASE),
+    re.compile(r"/emby/Tags(\?|$)", re.IGNORECASE),
+    re.compile(r"/emby/Users/Public(\?|$)", re.IGNORECASE),
+]
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+class ResponseCache:
+    """
+        On disk cache of small GET responses that the server sends validators for.
+        Fresh entries are served without a request, stale ones are revalidated with
+        If-None-Match / If-Modified-Since and a 304 reuses the stored body.
+    """
+
+    cache_dir = os.path.join(xbmcvfs.translatePath(xbmcaddon.Addon().getAddonInfo('profile')), "response_cache")
+    max_cache_bytes = 4 * 1024 * 1024
+    max_memory_entries = 32
+    default_max_age = 30
+    stats_log_interval = 50
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.memory_entries = OrderedDict()
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @staticmethod
+    def is_cacheable(url_path):
+        for pattern in CACHEABLE_URL_PATTERNS:
+            if pattern.search(url_path):
+                return True
+        return False
+
+    @staticmethod
+    def get_key(server, url_path):
+        user_id = HomeWindow().get_property("userid")
+        m = hashlib.md5()
+        m.update((user_id + "|" + server + "|" + url_path).encode("utf-8"))
+        return m.hexdigest()
+
+    def get_file_path(self, cache_key):
+        return os.path.join(self.cache_dir, cache_key + ".cache")
+
+    def remember(self, cache_key, entry):
+        with self.lock:
+            self.memory_entries[cache_key] = entry
+            self.memory_entries.move_to_end(cache_key)
+            while len(self.memory_entries) > self.max_memory_entries:
+                self.memory_entries.popitem(last=False)
+
+    def get(self, cache_key):
+        with self.lock:
+            entry = self.memory_entries.get(cache_key)
+            if entry is not None:
+                self.memory_entries.move_to_end(cache_key)
+                return entry
+
+        file_path = self.get_file_path(cache_key)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, "rb") as handle:
+                entry = pickle.load(handle)
+        except Exception as error:
+            log.error("ResponseCache : Could not load {0} : {1}", file_path, error)
+            return None
+
+        self.remember(cache_key, entry)
+        return entry
+
+    @staticmethod
+    def is_fresh(entry):
+        return entry["fresh_until"] > time.time()
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def get_max_age(self, response):
+        cache_control = response.getheader("cache-control") or ""
+        if "no-store" in cache_control:
+            return None
+        if "no-cache" in cache_control:
+            return 0
+        match = MAX_AGE_PATTERN.search(cache_control)
+        if match:
+            return int(match.group(1))
+        return self.default_max_age
+
+    def hit(self, cache_key):
+        # mark the entry as recently used for the eviction order
+        try:
+            os.utime(self.get_file_path(cache_key))
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        self.log_stats()
+
+    def miss(self):
+        with self.lock:
+            self.misses += 1
+        self.log_stats()
+
+    def revalidated(self, cache_key, entry, response):
+        # the server answered 304, the stored body is still good
+        max_age = self.get_max_age(response)
+        entry["fresh_until"] = time.time() + (max_age or 0)
+        etag = response.getheader("etag")
+        if etag:
+            entry["etag"] = etag
+        self.save(cache_key, entry)
+        with self.lock:
+            self.not_modified += 1
+        self.log_stats()
+        return entry["body"]
+
+    def store(self, cache_key, url_path, body, response):
+        # save a 200 response if it has validators, returns the body to hand back to the caller
+        self.miss()
+        etag = response.getheader("etag")
+        last_modified = response.getheader("last-modified")
+        max_age = self.get_max_age(response)
+        if max_age is None or (not etag and not last_modified) or len(body) > self.max_cache_bytes:
+            return body
+
+        entry = {
+            "url_path": url_path,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh_until": time.time() + max_age,
+            "body": body
+        }
+        self.save(cache_key, entry)
+        self.evict()
+        return body
+
+    def save(self, cache_key, entry):
+        self.remember(cache_key, entry)
+
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+
+        file_path = self.get_file_path(cache_key)
+        temp_path = file_path + ".%s.%s.tmp" % (os.getpid(), threading.get_ident())
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(temp_path, "wb") as handle:
+                handle.write(data)
+            # replace in one step so other processes never see a half written entry
+            os.replace(temp_path, file_path)
+        except Exception as error:
+            log.error("ResponseCache : Could not save {0} : {1}", file_path, error)
+
+    def evict(self):
+        # least recently used entries go first once the size budget is used up
+        try:
+            cache_files = []
+            total_size = 0
+            for dir_entry in os.scandir(self.cache_dir):
+                if dir_entry.name.endswith(".cache"):
+                    stat = dir_entry.stat()
+                    cache_files.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                    total_size += stat.st_size
+        except OSError as error:
+            log.error("ResponseCache : Could not list {0} : {1}", self.cache_dir, error)
+            return
+
+        if total_size <= self.max_cache_bytes:
+            return
+
+        cache_files.sort()
+        for mtime, size, file_path in cache_files:
+            if total_size <= self.max_cache_bytes:
+                break
+            try:
+                os.remove(file_path)
+                total_size -= size
+                cache_key = os.path.basename(file_path)[:-6]
+                with self.lock:
+                    self.evicted += 1
+                    self.memory_entries.pop(cache_key, None)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            self.memory_entries.clear()
+        del_count = 0
+        if not os.path.exists(self.cache_dir):
+            return del_count
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".cache") or filename.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                    del_count += 1
+                except OSError as error:
+                    log.error("ResponseCache : Could not delete {0} : {1}", filename, error)
+        return del_count
+
+    def log_stats(self, force=False):
+        total = self.hits + self.not_modified + self.misses
+        if force or (total > 0 and total % self.stats_log_interval == 0):
+            log.info("ResponseCache : hits={0} not_modified={1} misses={2} evicted={3}",
+                     self.hits, self.not_modified, self.misses, self.evicted)
+
+
+response_cache = ResponseCache()
@@ -14,11 +14,12 @@ import xbmcgui
 import xbmc
 
 from .kodi_utils import HomeWindow
-from .downloadutils import DownloadUtils, save_user_details, load_user_details
+from .downloadutils import DownloadUtils, save_user_details, load_user_details, clear_auth_header_cache
 from .simple_logging import SimpleLogging
 from .translation import string_load
 from .utils import datetime_from_string
 from .clientinfo import ClientInformation
+from .settings_snapshot import invalidate_settings
 
 log = SimpleLogging(__name__)
 
@@ -169,6 +170,7 @@ def check_server(force=False, change_user=False, notify=False):
     settings = xbmcaddon.Addon()
     server_url = ""
     something_changed = False
+    server_changed = False
     du = DownloadUtils()
 
     if force is False:
@@ -278,7 +280,9 @@ def check_server(force=False, change_user=False, notify=False):
         else:
             settings.setSetting("protocol", "0")
 
+        invalidate_settings()
         something_changed = True
+        server_changed = True
 
     # do we need to change the user
     user_details = load_user_details(settings)
@@ -461,6 +465,10 @@ def check_server(force=False, change_user=False, notify=False):
             home_window.clear_property("AccessToken")
             home_window.clear_property("userimage")
             home_window.clear_property("embycon_widget_reload")
+            clear_auth_header_cache()
+            if server_changed:
+                home_window.clear_property("server_address_id")
+                home_window.clear_property("server_address_selected")
             du = DownloadUtils()
             du.authenticate()
             du.get_user_id()
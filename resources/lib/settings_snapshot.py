@@ -0,0 +1,113 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import threading
+
+import xbmcaddon
+
+from .simple_logging import SimpleLogging
+
+log = SimpleLogging(__name__)
+
+
+def to_bool(value):
+    return value == "true"
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+def to_str(value):
+    return value
+
+
+# (attribute name, setting id, converter) for the settings read on the hot paths
+SNAPSHOT_SETTINGS = [
+    ("use_https", "protocol", lambda value: value == "1"),
+    ("verify_cert", "verify_cert", to_bool),
+    ("ipaddress", "ipaddress", to_str),
+    ("port", "port", to_str),
+    ("server_addresses", "server_addresses", to_str),
+    ("http_timeout", "http_timeout", to_int),
+    ("suppress_errors", "suppressErrors", to_bool),
+    ("device_name", "deviceName", to_str),
+    ("save_user_to_settings", "save_user_to_settings", to_bool),
+    ("username", "username", to_str),
+    ("password", "password", to_str),
+    ("show_x_filtered_items", "show_x_filtered_items", to_str),
+    ("include_media", "include_media", to_bool),
+    ("include_people", "include_people", to_bool),
+    ("include_overview", "include_overview", to_bool),
+    ("use_cache", "use_cache", to_bool),
+    ("cache_max_size", "cache_max_size", to_int),
+    ("cache_max_entries", "cache_max_entries", to_int),
+    ("prefetch_count", "prefetch_count", to_int),
+    ("show_load_progress", "showLoadProgress", to_bool),
+    ("items_per_page", "itemsPerPage", to_int),
+    ("flatten_single_season", "flatten_single_season", to_bool),
+    ("hide_unwatched_details", "hide_unwatched_details", to_bool),
+    ("add_counts", "addCounts", to_bool),
+    ("add_resume_percent", "addResumePercent", to_bool),
+    ("add_subtitle_available", "addSubtitleAvailable", to_bool),
+    ("add_user_ratings", "add_user_ratings", to_bool),
+    ("show_empty_folders", "show_empty_folders", to_bool),
+    ("show_all_episodes", "show_all_episodes", to_bool),
+    ("hide_watched", "hide_watched", to_bool),
+    ("record_network_stats", "record_network_stats", to_bool),
+    ("capture_traffic", "capture_traffic", to_bool),
+]
+
+
+class SettingsSnapshot:
+    """
+        Read only copy of the add-on settings, the hot path settings are read once when it is built
+        and then shared by everything in this plugin invocation or service tick.
+        Any other setting is read from Kodi the first time it is asked for and kept.
+        Also answers getSetting() so it can be passed where an Addon() was expected.
+    """
+
+    def __init__(self):
+        addon = xbmcaddon.Addon()
+        raw_values = {}
+        for attr_name, setting_id, converter in SNAPSHOT_SETTINGS:
+            value = addon.getSetting(setting_id)
+            raw_values[setting_id] = value
+            object.__setattr__(self, attr_name, converter(value))
+
+        object.__setattr__(self, "_addon", addon)
+        object.__setattr__(self, "_raw_values", raw_values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SettingsSnapshot is read only, use xbmcaddon.Addon().setSetting()")
+
+    def getSetting(self, setting_id):
+        raw_values = self._raw_values
+        value = raw_values.get(setting_id)
+        if value is None:
+            # settings outside the snapshot list are read once, on first use
+            value = self._addon.getSetting(setting_id)
+            raw_values[setting_id] = value
+        return value
+
+
+snapshot_lock = threading.Lock()
+current_snapshot = None
+
+
+def get_settings():
+    global current_snapshot
+    snapshot = current_snapshot
+    if snapshot is None:
+        with snapshot_lock:
+            if current_snapshot is None:
+                current_snapshot = SettingsSnapshot()
+            snapshot = current_snapshot
+    return snapshot
+
+
+def invalidate_settings():
+    global current_snapshot
+    current_snapshot = None
@@ -0,0 +1,74 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import threading
+
+from .simple_logging import SimpleLogging
+
+log = SimpleLogging(__name__)
+
+
+class InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+        Coalesce identical calls made from several threads at the same time,
+        the first caller does the work and the others wait for and share its result,
+        or get the exception it raised
+    """
+
+    max_wait = 60
+    stats_log_interval = 50
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.calls = 0
+        self.saved = 0
+
+    def do(self, key, function, *args):
+        with self.lock:
+            self.calls += 1
+            call = self.in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = InFlightCall()
+                self.in_flight[key] = call
+            else:
+                call.waiters += 1
+                self.saved += 1
+
+        if not leader:
+            log.debug("SingleFlight : waiting for in flight call : {0}", key)
+            if call.done.wait(self.max_wait):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            # the first call is taking too long, do our own
+            with self.lock:
+                self.saved -= 1
+            return function(*args)
+
+        try:
+            call.result = function(*args)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            call.done.set()
+
+        if call.waiters > 0:
+            log.debug("SingleFlight : {0} callers shared one call : {1}", call.waiters + 1, key)
+        self.log_stats()
+        return call.result
+
+    def log_stats(self, force=False):
+        if force or (self.calls > 0 and self.calls % self.stats_log_interval == 0):
+            log.info("SingleFlight : calls={0} saved={1}", self.calls, self.saved)
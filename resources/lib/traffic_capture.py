@@ -0,0 +1,145 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import xbmcaddon
+import xbmcvfs
+
+from .filelock import FileLock
+from .kodi_utils import HomeWindow
+from .simple_logging import SimpleLogging
+from .settings_snapshot import get_settings
+
+log = SimpleLogging(__name__)
+
+# response headers kept with each capture, the rest are connection details
+CAPTURED_HEADERS = ["content-type", "content-encoding", "etag", "last-modified", "cache-control"]
+
+ACCESS_TOKEN_PATTERN = re.compile(r'("AccessToken"\s*:\s*")[^"]*(")')
+
+
+def get_body_hash(post_body):
+    if post_body is None:
+        return None
+    if not isinstance(post_body, bytes):
+        post_body = post_body.encode("utf-8")
+    return hashlib.md5(post_body).hexdigest()
+
+
+def get_source():
+    # the plugin url this process was started for, the service has no plugin url
+    if len(sys.argv) > 2 and sys.argv[0].startswith("plugin://"):
+        return sys.argv[0] + sys.argv[2]
+    return "service"
+
+
+class TrafficCapture:
+    """
+        Records the server requests and their responses while capture is turned on, appended
+        as gzip json lines to an archive in the profile shared by the plugin and service processes.
+        Streamed bodies are written to their own gzip file in traffic_capture_bodies as they arrive.
+        A capture replays a browsing session offline with scripts/benchmarks/replay.py
+    """
+
+    addon_dir = xbmcvfs.translatePath(xbmcaddon.Addon().getAddonInfo('profile'))
+    archive_file = os.path.join(addon_dir, "traffic_capture.jsonl.gz")
+    bodies_dir_name = "traffic_capture_bodies"
+    max_archive_bytes = 100 * 1024 * 1024
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        self.process = "%s-%s" % (os.getpid(), int(time.time() * 1000))
+        self.body_count = 0
+
+    @staticmethod
+    def is_enabled():
+        return get_settings().capture_traffic
+
+    def open_body_file(self):
+        # (name relative to the archive, gzip file) for a streamed body, None when the archive is full
+        if os.path.exists(self.archive_file) and os.path.getsize(self.archive_file) > self.max_archive_bytes:
+            return None
+        with self.lock:
+            self.body_count += 1
+            body_count = self.body_count
+        body_name = "%s/%s-%s.gz" % (self.bodies_dir_name, self.process, body_count)
+        try:
+            bodies_dir = os.path.join(self.addon_dir, self.bodies_dir_name)
+            if not os.path.exists(bodies_dir):
+                os.makedirs(bodies_dir)
+            return body_name, gzip.open(os.path.join(self.addon_dir, body_name), "wb", compresslevel=5)
+        except Exception as error:
+            log.error("TrafficCapture : Could not create {0} : {1}", body_name, error)
+            return None
+
+    def record(self, method, url, url_path, post_body, status, headers, body, size, request_started,
+               response_started, finished, body_file=None):
+        # url is the template with the place holders, url_path what was sent with the user id put back
+        user_id = HomeWindow().get_property("userid")
+        if user_id:
+            url_path = url_path.replace(user_id, "{userid}")
+
+        captured_headers = {}
+        for name, value in headers:
+            if name.lower() in CAPTURED_HEADERS:
+                captured_headers[name.lower()] = value
+
+        entry = {
+            "process": self.process,
+            "source": get_source(),
+            "started": request_started,
+            "method": method,
+            "url": url,
+            "path": url_path,
+            "body_hash": get_body_hash(post_body),
+            "status": int(status),
+            "headers": captured_headers,
+            "size": size,
+            "ttfb": response_started - request_started,
+            "latency": finished - request_started
+        }
+
+        if body:
+            try:
+                # never write a login token to disk
+                entry["body"] = ACCESS_TOKEN_PATTERN.sub(r"\1\2", body.decode("utf-8"))
+            except UnicodeDecodeError:
+                entry["body"] = base64.b64encode(body).decode("ascii")
+                entry["body_encoding"] = "base64"
+        if body_file:
+            entry["body_file"] = body_file
+
+        with self.lock:
+            self.pending.append(entry)
+
+    def flush(self):
+        # each flush appends one gzip member, readers see the members as one stream
+        with self.lock:
+            pending = self.pending
+            self.pending = []
+        if not pending:
+            return
+
+        try:
+            with FileLock(self.archive_file, timeout=5):
+                if os.path.exists(self.archive_file) and os.path.getsize(self.archive_file) > self.max_archive_bytes:
+                    log.error("TrafficCapture : {0} is full, dropped {1} requests", self.archive_file, len(pending))
+                    return
+                lines = [json.dumps(entry) for entry in pending]
+                with open(self.archive_file, "ab") as handle:
+                    handle.write(gzip.compress(("\n".join(lines) + "\n").encode("utf-8")))
+            log.debug("TrafficCapture : saved {0} requests", len(pending))
+        except Exception as error:
+            log.error("TrafficCapture : Could not save {0} : {1}", self.archive_file, error)
+
+
+traffic_capture = TrafficCapture()
@@ -70,10 +70,19 @@ def get_item(item_id):
     return result
 
 
-def get_imdb_id(item_id):
-    item = get_item(item_id)
-    imdb = item.get('ProviderIds', {}).get('Imdb')
-    return imdb
+def get_imdb_ids(item_ids):
+    # look up all the items at once, None for any item that could not be loaded
+    urls = []
+    for item_id in item_ids:
+        urls.append('{server}/emby/Users/{userid}/Items/' + item_id + '?Fields=ProviderIds&format=json')
+
+    imdb_ids = []
+    for item in dataManager.get_contents(urls, suppress=False):
+        imdb = None
+        if item is not None:
+            imdb = (item.get('ProviderIds') or {}).get('Imdb')
+        imdb_ids.append(imdb)
+    return imdb_ids
 
 
 def get_season_id(parent_id, season):
@@ -125,8 +134,8 @@ def get_match(item_type, title, year, imdb_id):
 
     log.debug('Potential matches: {0}', potential_matches)
 
-    for item in potential_matches:
-        item_imdb_id = get_imdb_id(item.get('ItemId'))
+    item_imdb_ids = get_imdb_ids([item.get('ItemId') for item in potential_matches])
+    for item, item_imdb_id in zip(potential_matches, item_imdb_ids):
         if item_imdb_id == imdb_id:
             log.debug('Found match: {0}', item)
             return item
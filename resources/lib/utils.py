@@ -193,88 +193,171 @@ def get_checksum(item):
     return checksum
 
 
+# the art types every item gets, empty when the item has none
+EMPTY_ART = {
+    'thumb': '',
+    'fanart': '',
+    'poster': '',
+    'banner': '',
+    'clearlogo': '',
+    'clearart': '',
+    'discart': '',
+    'landscape': '',
+    'tvshow.fanart': '',
+    'tvshow.poster': '',
+    'tvshow.clearart': '',
+    'tvshow.clearlogo': '',
+    'tvshow.banner': '',
+    'tvshow.landscape': ''
+}
+
+
+class ArtworkResolver:
+    """
+        get_art() for the items of one list. The server prefix and url options are worked out once
+        and the series level art of episodes and seasons once per series, the siblings copy it.
+        The art dicts are still one per item, add_gui_item callers change them.
+    """
+
+    def __init__(self, server):
+        # no server yet, every art url is left empty
+        # the server is kept apart from the format, it can hold % escaped basic auth credentials
+        self.prefix = server
+        self.suffix = ""
+        if downloadUtils.use_https and not downloadUtils.verify_cert:
+            self.suffix = "|verifypeer=false"
+        self.series_art = {}
+
+    def get_artwork(self, data, art_type, parent=False, index=0):
+        # same rules as DownloadUtils.get_artwork()
+        if self.prefix is None:
+            return ""
+        item_id = data["Id"]
+        item_type = data["Type"]
+
+        if item_type in ["Episode", "Season"]:
+            if art_type != "Primary" or parent is True:
+                item_id = data["SeriesId"]
+
+        image_tag = ""
+
+        if art_type == "Backdrop" and (parent is True or item_type == "Episode"):
+            # for episodes always use the parent BG
+            item_id = data["ParentBackdropItemId"]
+            bg_item_tags = data["ParentBackdropImageTags"]
+            if bg_item_tags is not None and len(bg_item_tags) > 0:
+                image_tag = bg_item_tags[0]
+        elif art_type == "Backdrop":
+            bg_tags = data["BackdropImageTags"]
+            if bg_tags is not None and len(bg_tags) > index:
+                image_tag = bg_tags[index]
+        elif parent is False:
+            image_tags = data["ImageTags"]
+            if image_tags is not None:
+                image_tag_type = image_tags.get(art_type)
+                if image_tag_type is not None:
+                    image_tag = image_tag_type
+        else:
+            if (item_type == "Episode" or item_type == "Season") and art_type == 'Primary':
+                parent_image_id = data["SeriesId"]
+                parent_image_tag = data["SeriesPrimaryImageTag"]
+            else:
+                parent_image_id = data["Parent%sItemId" % art_type]
+                parent_image_tag = data["Parent%sImageTag" % art_type]
+            if parent_image_id is not None and parent_image_tag is not None:
+                item_id = parent_image_id
+                image_tag = parent_image_tag
+
+        # ParentTag not passed for Banner and Art
+        if not image_tag and not ((art_type == 'Banner' or art_type == 'Art') and parent is True):
+            return ""
+
+        artwork = "/emby/Items/%s/Images/%s/%s?Format=original&Tag=%s" % (item_id, art_type, index, image_tag)
+        return self.prefix + artwork + self.suffix
+
+    def get_series_art(self, item):
+        # the art of an episode or season that comes from its series, the same for all the siblings
+        bg_item_tags = item["ParentBackdropImageTags"]
+        key = (item["Type"], item["SeriesId"], item["SeriesPrimaryImageTag"],
+               item["ParentArtItemId"], item["ParentArtImageTag"],
+               item["ParentLogoItemId"], item["ParentLogoImageTag"],
+               item["ParentBannerItemId"], item["ParentBannerImageTag"],
+               item["ParentThumbItemId"], item["ParentThumbImageTag"],
+               item["ParentBackdropItemId"], bg_item_tags[0] if bg_item_tags else None)
+        series_art = self.series_art.get(key)
+        if series_art is not None:
+            return series_art
+
+        series_art = {}
+        series_art['tvshow.poster'] = self.get_artwork(item, "Primary", parent=True)
+        series_art['tvshow.clearart'] = self.get_artwork(item, "Art", parent=True)
+        series_art['clearart'] = series_art['tvshow.clearart']
+        series_art['tvshow.clearlogo'] = self.get_artwork(item, "Logo", parent=True)
+        series_art['clearlogo'] = series_art['tvshow.clearlogo']
+        series_art['tvshow.banner'] = self.get_artwork(item, "Banner", parent=True)
+        series_art['tvshow.landscape'] = self.get_artwork(item, "Thumb", parent=True)
+        series_art['tvshow.fanart'] = self.get_artwork(item, "Backdrop", parent=True)
+        if item["Type"] == "Episode":
+            series_art['banner'] = series_art['tvshow.banner']
+            series_art['landscape'] = series_art['tvshow.landscape']
+            series_art['fanart'] = series_art['tvshow.fanart']
+
+        self.series_art[key] = series_art
+        return series_art
+
+    def get_art(self, item):
+        art = dict(EMPTY_ART)
+
+        image_tags = item["ImageTags"]
+        if image_tags is not None and image_tags.get("Primary") is not None:
+            art['thumb'] = self.get_artwork(item, "Primary")
+
+        item_type = item["Type"]
+
+        if item_type == "Genre":
+            art['poster'] = self.get_artwork(item, "Primary")
+        elif item_type == "Episode":
+            art.update(self.get_series_art(item))
+            # the backdrop of an episode is always the series one, already set
+            return art
+        elif item_type == "Season":
+            art.update(self.get_series_art(item))
+            art['season.poster'] = self.get_artwork(item, "Primary", parent=False)
+            art['poster'] = art['season.poster']
+            art['season.banner'] = self.get_artwork(item, "Banner", parent=False)
+            art['banner'] = art['season.banner']
+            art['season.landscape'] = self.get_artwork(item, "Thumb", parent=False)
+            art['landscape'] = art['season.landscape']
+        elif item_type == "Series":
+            art['tvshow.poster'] = self.get_artwork(item, "Primary", parent=False)
+            art['poster'] = art['tvshow.poster']
+            art['tvshow.clearart'] = self.get_artwork(item, "Art", parent=False)
+            art['clearart'] = art['tvshow.clearart']
+            art['tvshow.clearlogo'] = self.get_artwork(item, "Logo", parent=False)
+            art['clearlogo'] = art['tvshow.clearlogo']
+            art['tvshow.banner'] = self.get_artwork(item, "Banner", parent=False)
+            art['banner'] = art['tvshow.banner']
+            art['tvshow.landscape'] = self.get_artwork(item, "Thumb", parent=False)
+            art['landscape'] = art['tvshow.landscape']
+            art['tvshow.fanart'] = self.get_artwork(item, "Backdrop", parent=False)
+        elif item_type == "Movie" or item_type == "BoxSet":
+            art['poster'] = self.get_artwork(item, "Primary")
+            art['landscape'] = self.get_artwork(item, "Thumb")
+            art['banner'] = self.get_artwork(item, "Banner")
+            art['clearlogo'] = self.get_artwork(item, "Logo")
+            art['clearart'] = self.get_artwork(item, "Art")
+            art['discart'] = self.get_artwork(item, "Disc")
+
+        art['fanart'] = self.get_artwork(item, "Backdrop")
+        if not art['fanart']:
+            art['fanart'] = self.get_artwork(item, "Backdrop", parent=True)
+
+        return art
+
+
 def get_art(item, server):
-    art = {
-        'thumb': '',
-        'fanart': '',
-        'poster': '',
-        'banner': '',
-        'clearlogo': '',
-        'clearart': '',
-        'discart': '',
-        'landscape': '',
-        'tvshow.fanart': '',
-        'tvshow.poster': '',
-        'tvshow.clearart': '',
-        'tvshow.clearlogo': '',
-        'tvshow.banner': '',
-        'tvshow.landscape': ''
-    }
-
-    image_tags = item["ImageTags"]
-    if image_tags is not None and image_tags["Primary"] is not None:
-        # image_tag = image_tags["Primary"]
-        art['thumb'] = downloadUtils.get_artwork(item, "Primary", server=server)
-
-    item_type = item["Type"]
-
-    if item_type == "Genre":
-        art['poster'] = downloadUtils.get_artwork(item, "Primary", server=server)
-    elif item_type == "Episode":
-        art['tvshow.poster'] = downloadUtils.get_artwork(item, "Primary", parent=True, server=server)
-        # art['poster'] = downloadUtils.getArtwork(item, "Primary", parent=True, server=server)
-        art['tvshow.clearart'] = downloadUtils.get_artwork(item, "Art", parent=True, server=server)
-        art['clearart'] = downloadUtils.get_artwork(item, "Art", parent=True, server=server)
-        art['tvshow.clearlogo'] = downloadUtils.get_artwork(item, "Logo", parent=True, server=server)
-        art['clearlogo'] = downloadUtils.get_artwork(item, "Logo", parent=True, server=server)
-        art['tvshow.banner'] = downloadUtils.get_artwork(item, "Banner", parent=True, server=server)
-        art['banner'] = downloadUtils.get_artwork(item, "Banner", parent=True, server=server)
-        art['tvshow.landscape'] = downloadUtils.get_artwork(item, "Thumb", parent=True, server=server)
-        art['landscape'] = downloadUtils.get_artwork(item, "Thumb", parent=True, server=server)
-        art['tvshow.fanart'] = downloadUtils.get_artwork(item, "Backdrop", parent=True, server=server)
-        art['fanart'] = downloadUtils.get_artwork(item, "Backdrop", parent=True, server=server)
-    elif item_type == "Season":
-        art['tvshow.poster'] = downloadUtils.get_artwork(item, "Primary", parent=True, server=server)
-        art['season.poster'] = downloadUtils.get_artwork(item, "Primary", parent=False, server=server)
-        art['poster'] = downloadUtils.get_artwork(item, "Primary", parent=False, server=server)
-        art['tvshow.clearart'] = downloadUtils.get_artwork(item, "Art", parent=True, server=server)
-        art['clearart'] = downloadUtils.get_artwork(item, "Art", parent=True, server=server)
-        art['tvshow.clearlogo'] = downloadUtils.get_artwork(item, "Logo", parent=True, server=server)
-        art['clearlogo'] = downloadUtils.get_artwork(item, "Logo", parent=True, server=server)
-        art['tvshow.banner'] = downloadUtils.get_artwork(item, "Banner", parent=True, server=server)
-        art['season.banner'] = downloadUtils.get_artwork(item, "Banner", parent=False, server=server)
-        art['banner'] = downloadUtils.get_artwork(item, "Banner", parent=False, server=server)
-        art['tvshow.landscape'] = downloadUtils.get_artwork(item, "Thumb", parent=True, server=server)
-        art['season.landscape'] = downloadUtils.get_artwork(item, "Thumb", parent=False, server=server)
-        art['landscape'] = downloadUtils.get_artwork(item, "Thumb", parent=False, server=server)
-        art['tvshow.fanart'] = downloadUtils.get_artwork(item, "Backdrop", parent=True, server=server)
-        art['fanart'] = downloadUtils.get_artwork(item, "Backdrop", parent=True, server=server)
-    elif item_type == "Series":
-        art['tvshow.poster'] = downloadUtils.get_artwork(item, "Primary", parent=False, server=server)
-        art['poster'] = downloadUtils.get_artwork(item, "Primary", parent=False, server=server)
-        art['tvshow.clearart'] = downloadUtils.get_artwork(item, "Art", parent=False, server=server)
-        art['clearart'] = downloadUtils.get_artwork(item, "Art", parent=False, server=server)
-        art['tvshow.clearlogo'] = downloadUtils.get_artwork(item, "Logo", parent=False, server=server)
-        art['clearlogo'] = downloadUtils.get_artwork(item, "Logo", parent=False, server=server)
-        art['tvshow.banner'] = downloadUtils.get_artwork(item, "Banner", parent=False, server=server)
-        art['banner'] = downloadUtils.get_artwork(item, "Banner", parent=False, server=server)
-        art['tvshow.landscape'] = downloadUtils.get_artwork(item, "Thumb", parent=False, server=server)
-        art['landscape'] = downloadUtils.get_artwork(item, "Thumb", parent=False, server=server)
-        art['tvshow.fanart'] = downloadUtils.get_artwork(item, "Backdrop", parent=False, server=server)
-        art['fanart'] = downloadUtils.get_artwork(item, "Backdrop", parent=False, server=server)
-    elif item_type == "Movie" or item_type == "BoxSet":
-        art['poster'] = downloadUtils.get_artwork(item, "Primary", server=server)
-        art['landscape'] = downloadUtils.get_artwork(item, "Thumb", server=server)
-        art['banner'] = downloadUtils.get_artwork(item, "Banner", server=server)
-        art['clearlogo'] = downloadUtils.get_artwork(item, "Logo", server=server)
-        art['clearart'] = downloadUtils.get_artwork(item, "Art", server=server)
-        art['discart'] = downloadUtils.get_artwork(item, "Disc", server=server)
-
-    art['fanart'] = downloadUtils.get_artwork(item, "Backdrop", server=server)
-    if not art['fanart']:
-        art['fanart'] = downloadUtils.get_artwork(item, "Backdrop", parent=True, server=server)
-
-    return art
+    # a single item, lists use one ArtworkResolver for all their items
+    return ArtworkResolver(server).get_art(item)
 
 
 def id_generator(size=6, chars=string.ascii_uppercase + string.digits):
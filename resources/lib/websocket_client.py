@@ -14,6 +14,7 @@ from . import clientinfo
 from . import downloadutils
 from .jsonrpc import JsonRpc
 from .kodi_utils import HomeWindow
+from .cache_invalidation import apply_user_data_changes, invalidate_library_changes, set_websocket_connected
 from .websocket import WebSocketApp, enableTrace
 
 
@@ -55,11 +56,11 @@ class WebSocketClient(threading.Thread):
 
         elif message_type == "UserDataChanged":
             data = result['Data']
-            ws._library_changed(data)
+            ws._user_data_changed(data)
 
         elif message_type == "LibraryChanged":
             data = result['Data']
-            ws._library_changed(data)
+            ws._invalidate_cache(data)
 
         elif message_type == "GeneralCommand":
             data = result['Data']
@@ -72,6 +73,30 @@ class WebSocketClient(threading.Thread):
         log.debug("Library_Changed: {0}", data)
         self._library_monitor.check_for_updates()
 
+    def _user_data_changed(self, data):
+        user_id = HomeWindow().get_property("userid")
+        if not user_id or data.get("UserId") != user_id:
+            return
+        try:
+            apply_user_data_changes(user_id, data.get("UserDataList") or [])
+            self._library_monitor.reload_widgets()
+        except Exception as error:
+            log.error("UserDataChanged cache update failed: {0}", error)
+            set_websocket_connected(True)
+            self._library_changed(data)
+
+    def _invalidate_cache(self, data):
+        user_id = HomeWindow().get_property("userid")
+        if not user_id:
+            return
+        try:
+            invalidate_library_changes(user_id, data)
+            self._library_monitor.reload_widgets()
+        except Exception as error:
+            log.error("LibraryChanged cache invalidation failed: {0}", error)
+            set_websocket_connected(True)
+            self._library_changed(data)
+
     def _play(self, data):
 
         item_ids = data['ItemIds']
@@ -228,13 +253,16 @@ class WebSocketClient(threading.Thread):
 
     def on_close(ws):
         log.debug("Closed")
+        set_websocket_connected(False)
 
     def on_open(ws):
         log.debug("Connected")
+        set_websocket_connected(True)
         ws.post_capabilities()
 
     def on_error(ws, error):
         log.debug("Error: {0}", error)
+        set_websocket_connected(False)
 
     def run(self):
 
@@ -288,6 +316,7 @@ class WebSocketClient(threading.Thread):
     def stop_client(self):
 
         self._stop_websocket = True
+        set_websocket_connected(False)
         if self._client is not None:
             self._client.close()
         log.debug("Stopping WebSocket (stop_client called)")
@@ -1,4 +1,3 @@
-import xbmcaddon
 import xbmcplugin
 import xbmcgui
 import xbmc
@@ -14,6 +13,7 @@ from .simple_logging import SimpleLogging
 from .kodi_utils import HomeWindow
 from .dir_functions import process_directory
 from .tracking import timer
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 downloadUtils = DownloadUtils()
@@ -28,8 +28,7 @@ background_current_item = 0
 def set_random_movies():
     log.debug("set_random_movies Called")
 
-    settings = xbmcaddon.Addon()
-    hide_watched = settings.getSetting("hide_watched") == "true"
+    hide_watched = get_settings().hide_watched
 
     url_params = {}
     url_params["Recursive"] = True
@@ -89,21 +88,19 @@ def set_background_image(force=False):
         url = get_emby_url('{server}/emby/Users/{userid}/Items', url_params)
 
         server = downloadUtils.get_server()
-        results = downloadUtils.download_url(url, suppress=True)
-        results = json.loads(results)
+        data_manager = DataManager()
+        items = data_manager.get_content_items(url, suppress=True)
 
-        if results is not None:
-            items = results.get("Items", [])
-            background_current_item = 0
-            background_items = []
-            for item in items:
-                bg_image = downloadUtils.get_artwork(item, "Backdrop", server=server)
-                if bg_image:
-                    label = item.get("Name")
-                    item_background = {}
-                    item_background["image"] = bg_image
-                    item_background["name"] = label
-                    background_items.append(item_background)
+        background_current_item = 0
+        background_items = []
+        for item in items:
+            bg_image = downloadUtils.get_artwork(item, "Backdrop", server=server)
+            if bg_image:
+                label = item.get("Name")
+                item_background = {}
+                item_background["image"] = bg_image
+                item_background["name"] = label
+                background_items.append(item_background)
 
         log.debug("set_background_image: Loaded {0} more backgrounds", len(background_items))
 
@@ -139,18 +136,6 @@ def check_for_new_content():
 
     added_url = get_emby_url('{server}/emby/Users/{userid}/Items', url_params)
 
-    added_result = downloadUtils.download_url(added_url, suppress=True)
-    result = json.loads(added_result)
-    log.debug("LATEST_ADDED_ITEM: {0}", result)
-
-    last_added_date = ""
-    if result is not None:
-        items = result.get("Items", [])
-        if len(items) > 0:
-            item = items[0]
-            last_added_date = item.get("Etag", "")
-    log.debug("last_added_date: {0}", last_added_date)
-
     url_params = {}
     url_params["Recursive"] = True
     url_params["limit"] = 1
@@ -163,7 +148,19 @@ def check_for_new_content():
 
     played_url = get_emby_url('{server}/emby/Users/{userid}/Items', url_params)
 
-    played_result = downloadUtils.download_url(played_url, suppress=True)
+    added_result, played_result = downloadUtils.download_many([added_url, played_url], suppress=True)
+
+    result = json.loads(added_result)
+    log.debug("LATEST_ADDED_ITEM: {0}", result)
+
+    last_added_date = ""
+    if result is not None:
+        items = result.get("Items", [])
+        if len(items) > 0:
+            item = items[0]
+            last_added_date = item.get("Etag", "")
+    log.debug("last_added_date: {0}", last_added_date)
+
     result = json.loads(played_result)
     log.debug("LATEST_PLAYED_ITEM: {0}", result)
 
@@ -266,8 +263,7 @@ def get_widget_content_cast(handle, params):
 def get_widget_content(handle, params):
     log.debug("getWigetContent Called: {0}", params)
 
-    settings = xbmcaddon.Addon()
-    hide_watched = settings.getSetting("hide_watched") == "true"
+    hide_watched = get_settings().hide_watched
 
     widget_type = params.get("type")
     if widget_type is None:
@@ -0,0 +1,107 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# get_art cost per item on a season of episodes: every art url built with
+# DownloadUtils.get_artwork as before, get_art with its own ArtworkResolver per item,
+# and one ArtworkResolver for the whole list as process_directory uses it.
+#
+#   python scripts/benchmarks/bench_artwork.py --count 1000
+
+import json
+
+import benchmark
+import fixtures
+
+from resources.lib.item_functions import NoneDict
+from resources.lib.utils import ArtworkResolver, get_art, downloadUtils
+
+SERVER = "http://127.0.0.1:8096"
+
+# (art key, art type, parent) the old get_art asked get_artwork for, per item type
+ART_CALLS = {
+    "Genre": [("poster", "Primary", False)],
+    "Episode": [("tvshow.poster", "Primary", True), ("tvshow.clearart", "Art", True), ("clearart", "Art", True),
+                ("tvshow.clearlogo", "Logo", True), ("clearlogo", "Logo", True),
+                ("tvshow.banner", "Banner", True), ("banner", "Banner", True),
+                ("tvshow.landscape", "Thumb", True), ("landscape", "Thumb", True),
+                ("tvshow.fanart", "Backdrop", True), ("fanart", "Backdrop", True)],
+    "Season": [("tvshow.poster", "Primary", True), ("season.poster", "Primary", False), ("poster", "Primary", False),
+               ("tvshow.clearart", "Art", True), ("clearart", "Art", True),
+               ("tvshow.clearlogo", "Logo", True), ("clearlogo", "Logo", True),
+               ("tvshow.banner", "Banner", True), ("season.banner", "Banner", False), ("banner", "Banner", False),
+               ("tvshow.landscape", "Thumb", True), ("season.landscape", "Thumb", False),
+               ("landscape", "Thumb", False), ("tvshow.fanart", "Backdrop", True), ("fanart", "Backdrop", True)],
+    "Series": [("tvshow.poster", "Primary", False), ("poster", "Primary", False),
+               ("tvshow.clearart", "Art", False), ("clearart", "Art", False),
+               ("tvshow.clearlogo", "Logo", False), ("clearlogo", "Logo", False),
+               ("tvshow.banner", "Banner", False), ("banner", "Banner", False),
+               ("tvshow.landscape", "Thumb", False), ("landscape", "Thumb", False),
+               ("tvshow.fanart", "Backdrop", False), ("fanart", "Backdrop", False)],
+    "Movie": [("poster", "Primary", False), ("landscape", "Thumb", False), ("banner", "Banner", False),
+              ("clearlogo", "Logo", False), ("clearart", "Art", False), ("discart", "Disc", False)],
+}
+ART_CALLS["BoxSet"] = ART_CALLS["Movie"]
+
+
+def get_art_per_url(item, server):
+    # get_art before ArtworkResolver, every url worked out on its own
+    art = {
+        'thumb': '', 'fanart': '', 'poster': '', 'banner': '', 'clearlogo': '', 'clearart': '', 'discart': '',
+        'landscape': '', 'tvshow.fanart': '', 'tvshow.poster': '', 'tvshow.clearart': '', 'tvshow.clearlogo': '',
+        'tvshow.banner': '', 'tvshow.landscape': ''
+    }
+    image_tags = item["ImageTags"]
+    if image_tags is not None and image_tags["Primary"] is not None:
+        art['thumb'] = downloadUtils.get_artwork(item, "Primary", server=server)
+    for art_key, art_type, parent in ART_CALLS.get(item["Type"], []):
+        art[art_key] = downloadUtils.get_artwork(item, art_type, parent=parent, server=server)
+    art['fanart'] = downloadUtils.get_artwork(item, "Backdrop", server=server)
+    if not art['fanart']:
+        art['fanart'] = downloadUtils.get_artwork(item, "Backdrop", parent=True, server=server)
+    return art
+
+
+def main():
+    parser = benchmark.get_parser("get_art cost per item, per url against one resolver per list",
+                                  count=1000, item_type="episodes")
+    args = benchmark.parse_args(parser)
+
+    # decoded as DataManager does, the art code relies on the NoneDict lookups
+    items = json.loads(json.dumps(fixtures.get_items(args)), object_hook=NoneDict)
+
+    def per_url():
+        for item in items:
+            get_art_per_url(item, SERVER)
+
+    def per_item():
+        for item in items:
+            get_art(item, SERVER)
+
+    def per_list():
+        artwork = ArtworkResolver(SERVER)
+        for item in items:
+            artwork.get_art(item)
+
+    artwork = ArtworkResolver(SERVER)
+    for item in items:
+        if artwork.get_art(item) != get_art_per_url(item, SERVER):
+            raise AssertionError("ArtworkResolver art differs for item %s" % item["Id"])
+
+    cases = [
+        ("get_artwork per url", per_url),
+        ("get_art per item", per_item),
+        ("ArtworkResolver per list", per_list),
+    ]
+
+    results = []
+    for name, func in cases:
+        result = benchmark.measure(name, func, args.repeat, items=len(items))
+        result["us_per_item"] = result["best"] * 1000000.0 / len(items)
+        results.append(result)
+
+    title = "get_art, %s %s" % (len(items), args.type)
+    benchmark.print_results(title, results, [("us/item", "us_per_item", lambda value: "%.1f" % value)])
+    benchmark.save_results(args.json, title, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# A browsing session through the add-on against the mock server: views, the movie list,
+# genres and letters, the tv shows, seasons and episodes of a few series and next up.
+# Run cold with empty caches, warm from the directory and response caches while the
+# cached lists are rechecked in the background, and warm with the websocket keeping them
+# in sync. Each case reports the time until the lists are shown and what the server sent.
+#
+#   python scripts/benchmarks/bench_browse.py --movies 20000 --profiles lan,remote
+
+import threading
+
+import benchmark
+from mock_server import MockEmbyServer, NetworkConditions, add_library_arguments, get_library
+
+from resources.lib.cache_invalidation import set_websocket_connected
+from resources.lib.datamanager import DataManager, CacheManagerThread, cache_store
+from resources.lib.dir_functions import process_directory
+from resources.lib.response_cache import response_cache
+
+# latency seconds, bandwidth bytes a second
+PROFILES = {
+    "lan": (0.001, 0),
+    "wifi": (0.015, 5 * 1024 * 1024),
+    "remote": (0.060, 1024 * 1024),
+}
+
+FIELDS = "&Fields={field_filters}&format=json"
+
+
+def get_session(library, series_count=3):
+    # (kind, url) in the order a user would open them, kind is "list" or "content"
+    views = dict([(view["CollectionType"], view["Id"]) for view in library.views])
+    session = [
+        ("content", "{server}/emby/Users/{userid}/Views?format=json"),
+        ("list", "{server}/emby/Users/{userid}/Items?ParentId=%s&Recursive=true&IncludeItemTypes=Movie"
+                 "&SortBy=SortName&SortOrder=Ascending%s" % (views["movies"], FIELDS)),
+        ("content", "{server}/emby/Genres?IncludeItemTypes=Movie&UserId={userid}&Recursive=true"
+                    "&ParentId=%s&SortBy=Name&format=json" % views["movies"]),
+        ("content", "{server}/emby/Items/Prefixes?IncludeItemTypes=Movie&UserId={userid}&Recursive=true"
+                    "&ParentId=%s&format=json" % views["movies"]),
+        ("list", "{server}/emby/Users/{userid}/Items?ParentId=%s&IncludeItemTypes=Series"
+                 "&SortBy=SortName%s" % (views["tvshows"], FIELDS)),
+    ]
+    for series in library.by_type["Series"][:series_count]:
+        session.append(("list", "{server}/emby/Users/{userid}/Items?ParentId=%s&IsVirtualUnAired=false"
+                                "&IsMissing=false%s" % (series["Id"], FIELDS)))
+        seasons = [season for season in library.children[series["Id"]] if season["IndexNumber"]]
+        session.append(("list", "{server}/emby/Shows/%s/Episodes?userId={userid}&seasonId=%s"
+                                "&IsVirtualUnAired=false&IsMissing=false%s" % (series["Id"], seasons[0]["Id"], FIELDS)))
+    session.append(("list", "{server}/emby/Shows/NextUp?userId={userid}&Limit=50%s" % FIELDS))
+    return session
+
+
+def wait_for_background():
+    # the cached lists are rechecked on CacheManagerThreads after they are shown
+    for thread in threading.enumerate():
+        if isinstance(thread, CacheManagerThread):
+            thread.join()
+
+
+def main():
+    parser = benchmark.get_parser("Browsing session against the mock server, cold and warm caches", count=0)
+    parser.add_argument("--profiles", default="lan,wifi,remote",
+                        help="network profiles to run, of %s (default all)" % ", ".join(sorted(PROFILES)))
+    add_library_arguments(parser)
+    args = benchmark.parse_args(parser)
+
+    library = get_library(args)
+    server = MockEmbyServer(library).start()
+    benchmark.set_settings({"use_cache": "true"})
+    session = get_session(library)
+
+    def browse():
+        benchmark.reset_kodi()
+        for kind, url in session:
+            if kind == "list":
+                process_directory(url, None, {}, use_cache_data=True)
+            else:
+                DataManager().get_content(url)
+
+    def clear_caches():
+        wait_for_background()
+        cache_store.clear()
+        response_cache.clear()
+
+    def start_cold(connected):
+        def setup():
+            clear_caches()
+            set_websocket_connected(connected)
+            server.reset_stats()
+        return setup
+
+    def start_warm(connected):
+        def setup():
+            start_cold(connected)()
+            browse()
+            wait_for_background()
+            server.reset_stats()
+        return setup
+
+    cases = [
+        ("cold", start_cold(False)),
+        ("warm, rechecked", start_warm(False)),
+        ("warm, websocket in sync", start_warm(True)),
+    ]
+
+    results = []
+    for profile in args.profiles.split(","):
+        latency, bandwidth = PROFILES[profile]
+        server.conditions = NetworkConditions(latency=latency, bandwidth=bandwidth)
+        for name, setup in cases:
+            result = benchmark.measure("%s %s" % (profile, name), browse, args.repeat, setup)
+            wait_for_background()
+            result["requests"] = server.get_request_count()
+            result["bytes_sent"] = sum(server.bytes_sent.values())
+            results.append(result)
+
+    server.stop()
+    title = "Browsing session of %s lists, library of %s items" % (len(session), len(library))
+    benchmark.print_results(title, results, [("requests", "requests", str),
+                                             ("sent", "bytes_sent", benchmark.format_bytes)])
+    benchmark.save_results(args.json, title, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# The SQLite directory cache store against the cache_<hash>.pickle files with a FileLock
+# each that it replaced, at 1k and 10k cached urls: saving, loading random entries and
+# the weekly old entry cleanup.
+#
+#   python scripts/benchmarks/bench_cache_store.py --sizes 1000,10000
+
+import os
+import pickle
+import random
+import shutil
+import time
+
+import benchmark
+import fixtures
+
+from resources.lib.cache_store import CacheStore
+from resources.lib.datamanager import CacheItem
+from resources.lib.filelock import FileLock
+from resources.lib.item_functions import extract_item_info, build_gui_options
+
+
+class PickleFileStore:
+    """
+        The old cache layout, one pickle file per url guarded by a FileLock
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def get_file_path(self, url_hash):
+        return os.path.join(self.cache_dir, "cache_" + url_hash + ".pickle")
+
+    def save(self, cache_item):
+        cache_file = self.get_file_path(cache_item.url_hash)
+        with FileLock(cache_file, timeout=5):
+            with open(cache_file, "wb") as handle:
+                pickle.dump(cache_item, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, url_hash, user_id):
+        cache_file = self.get_file_path(url_hash)
+        with FileLock(cache_file, timeout=5):
+            with open(cache_file, "rb") as handle:
+                return pickle.load(handle)
+
+    def delete_unused(self, max_age):
+        # clear_old_cache_data() unpickled every file to read date_last_used
+        del_count = 0
+        for filename in os.listdir(self.cache_dir):
+            if filename.startswith("cache_") and filename.endswith(".pickle"):
+                data_file = os.path.join(self.cache_dir, filename)
+                with FileLock(data_file, timeout=5):
+                    with open(data_file, "rb") as handle:
+                        cache_item = pickle.load(handle)
+                if cache_item.date_last_used is None or time.time() - cache_item.date_last_used > max_age:
+                    os.remove(data_file)
+                    del_count += 1
+        return del_count
+
+
+def make_cache_items(count, item_list):
+    cache_items = []
+    now = time.time()
+    for index in range(count):
+        cache_item = CacheItem()
+        cache_item.url_hash = "%032x" % index
+        cache_item.user_id = benchmark.USER_ID
+        cache_item.items_url = "{server}/emby/Users/{userid}/Items?ParentId=%032x&format=json" % index
+        cache_item.item_list = item_list
+        cache_item.total_records = len(item_list)
+        cache_item.date_saved = now
+        cache_item.date_last_used = now - index
+        cache_item.last_sync = now
+        cache_item.last_action = "cached_data"
+        cache_items.append(cache_item)
+    return cache_items
+
+
+def main():
+    parser = benchmark.get_parser("Directory cache store at 1k and 10k cached urls", count=10)
+    parser.add_argument("--sizes", default="1000,10000", help="numbers of cached urls (default 1000,10000)")
+    parser.add_argument("--loads", type=int, default=500, help="random entries loaded per run (default 500)")
+    args = benchmark.parse_args(parser)
+
+    # --count is the number of items in each cached list
+    gui_options = build_gui_options("http://127.0.0.1:8096")
+    item_list = [extract_item_info(item, gui_options) for item in benchmark.decode_items(fixtures.get_items(args))]
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(",")]:
+        base_dir = os.path.join(os.path.dirname(CacheStore.db_file), "bench_%s" % size)
+        pickle_dir = os.path.join(base_dir, "pickles")
+        os.makedirs(pickle_dir, exist_ok=True)
+
+        sqlite_store = CacheStore()
+        sqlite_store.db_file = os.path.join(base_dir, "cache.db")
+        pickle_store = PickleFileStore(pickle_dir)
+        cache_items = make_cache_items(size, item_list)
+        loads = [random.Random(index).randrange(size) for index in range(args.loads)]
+
+        for name, store in [("pickle files", pickle_store), ("sqlite", sqlite_store)]:
+            def save_all():
+                for cache_item in cache_items:
+                    store.save(cache_item)
+
+            def load_random():
+                for index in loads:
+                    store.load(cache_items[index].url_hash, cache_items[index].user_id)
+
+            def delete_unused():
+                # nothing is old enough so every run does the full check
+                return store.delete_unused(3600 * 24 * 365)
+
+            results.append(benchmark.measure("%s save %s" % (name, size), save_all, 1, items=size))
+            results.append(benchmark.measure("%s load %s of %s" % (name, args.loads, size), load_random,
+                                             args.repeat, items=args.loads))
+            results.append(benchmark.measure("%s cleanup %s" % (name, size), delete_unused, args.repeat, items=size))
+
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    title = "Directory cache store, %s items per cached list" % len(item_list)
+    benchmark.print_results(title, results)
+    benchmark.save_results(args.json, title, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# The directory pipeline, download + json decode + extract_item_info + add_gui_item,
+# through DataManager.get_items and process_directory against a local fixture server.
+#
+#   python scripts/benchmarks/bench_directory.py --count 20000
+
+import json
+
+import benchmark
+import fixtures
+
+from resources.lib.datamanager import DataManager
+from resources.lib.dir_functions import process_directory
+from resources.lib.item_functions import build_gui_options
+from resources.lib.downloadutils import DownloadUtils
+import xbmc
+
+ITEMS_URL = ("{server}/emby/Users/{userid}/Items?Recursive=true&IncludeItemTypes=Movie"
+             "&Fields={field_filters}&SortBy=SortName&format=json")
+
+
+def main():
+    parser = benchmark.get_parser("Directory pipeline items/sec", count=20000)
+    args = benchmark.parse_args(parser)
+
+    items = fixtures.get_items(args)
+    body = json.dumps(fixtures.make_response(items)).encode("utf-8")
+    server = benchmark.FixtureServer(benchmark.items_responder(body)).start()
+
+    gui_options = build_gui_options(DownloadUtils().get_server())
+
+    def get_items():
+        return DataManager().get_items(ITEMS_URL, gui_options, use_cache=False)
+
+    def load_directory():
+        benchmark.reset_kodi()
+        return process_directory(ITEMS_URL, None, {}, use_cache_data=False)
+
+    results = []
+    results.append(benchmark.measure("get_items", get_items, args.repeat, None, len(items)))
+    result = benchmark.measure("process_directory", load_directory, args.repeat, None, len(items))
+    result["api_calls_per_item"] = sum(xbmc.api_calls.values()) / float(len(items))
+    results.append(result)
+
+    server.stop()
+    title = "Directory pipeline, %s %s items, %.1f MB response" % (len(items), args.type, len(body) / 1024.0 / 1024.0)
+    benchmark.print_results(title, results, [("api calls/item", "api_calls_per_item", lambda value: "%.1f" % value)])
+    benchmark.save_results(args.json, title, results)
+
+
+if __name__ == "__main__":
+    main()
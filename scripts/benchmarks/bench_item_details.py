@@ -0,0 +1,93 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Cached list size and load time of the ItemDetails formats: the plain class pickled with
+# its __dict__ as older versions did, the versioned slots state as CacheStore saves it and
+# that state zlib compressed, smaller on disk but slower to save and load.
+#
+#   python scripts/benchmarks/bench_item_details.py --count 5000 --type episodes
+
+import io
+import pickle
+import zlib
+
+import benchmark
+import fixtures
+
+from resources.lib.cache_store import CacheStore
+from resources.lib.item_functions import ItemDetails, ITEM_DETAILS_FIELDS, extract_item_info, build_gui_options
+
+
+class LegacyItemDetails:
+    # stands in for the ItemDetails class before the slots, all values in the instance __dict__
+    pass
+
+
+def to_legacy(item_details):
+    legacy = LegacyItemDetails()
+    for field_name, default in ITEM_DETAILS_FIELDS:
+        setattr(legacy, field_name, getattr(item_details, field_name))
+    return legacy
+
+
+class LegacyPickler(pickle.Pickler):
+    # writes LegacyItemDetails the way the old class was saved, a new ItemDetails and its __dict__
+    def reducer_override(self, obj):
+        if isinstance(obj, LegacyItemDetails):
+            return object.__new__, (ItemDetails,), obj.__dict__
+        return NotImplemented
+
+
+def legacy_cache_dumps(items):
+    buffer = io.BytesIO()
+    LegacyPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(items)
+    return buffer.getvalue()
+
+
+def main():
+    parser = benchmark.get_parser("ItemDetails cache format size and load time", count=5000, item_type="episodes")
+    args = benchmark.parse_args(parser)
+
+    gui_options = build_gui_options("http://127.0.0.1:8096")
+    item_list = [extract_item_info(item, gui_options) for item in benchmark.decode_items(fixtures.get_items(args))]
+    legacy_list = [to_legacy(item_details) for item_details in item_list]
+    cache_store = CacheStore()
+
+    def plain_dumps(items):
+        return pickle.dumps(items, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def zlib_dumps(items):
+        return zlib.compress(cache_store.encode(items), 1)
+
+    def zlib_loads(data):
+        return cache_store.decode(zlib.decompress(data))
+
+    formats = [
+        ("legacy __dict__ pickle", legacy_list, plain_dumps, pickle.loads),
+        ("slots versioned pickle", item_list, cache_store.encode, cache_store.decode),
+        ("slots versioned + zlib", item_list, zlib_dumps, zlib_loads),
+    ]
+
+    results = []
+    for name, items, dumps, loads in formats:
+        data = dumps(items)
+        result = benchmark.measure("%s load" % name, lambda: loads(data), args.repeat, items=len(items))
+        result["size"] = len(data)
+        results.append(result)
+        result = benchmark.measure("%s save" % name, lambda: dumps(items), args.repeat, items=len(items))
+        result["size"] = len(data)
+        results.append(result)
+
+    # cache entries saved before the slots are still read by the current class
+    legacy_data = legacy_cache_dumps(legacy_list)
+    result = benchmark.measure("legacy pickle read as slots", lambda: pickle.loads(legacy_data), args.repeat,
+                               items=len(legacy_list))
+    result["size"] = len(legacy_data)
+    results.append(result)
+
+    title = "ItemDetails cache formats, %s %s" % (len(item_list), args.type)
+    benchmark.print_results(title, results, [("size", "size", benchmark.format_bytes)])
+    benchmark.save_results(args.json, title, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Decoding an Items response: the defaultdict object_hook used before, the NoneDict hook
+# DataManager uses now and json without a hook as the lower bound.
+#
+#   python scripts/benchmarks/bench_json_decode.py --count 5000
+
+import json
+from collections import defaultdict
+
+import benchmark
+import fixtures
+
+from resources.lib.item_functions import NoneDict
+
+
+def defaultdict_hook(values):
+    return defaultdict(lambda: None, values)
+
+
+def main():
+    parser = benchmark.get_parser("Json decode time and memory of an Items response", count=5000)
+    args = benchmark.parse_args(parser)
+
+    body = json.dumps(fixtures.make_response(fixtures.get_items(args))).encode("utf-8")
+    count = len(json.loads(body)["Items"])
+
+    hooks = [
+        ("defaultdict hook", {"object_hook": defaultdict_hook}),
+        ("NoneDict hook", {"object_hook": NoneDict}),
+        ("no hook", {}),
+    ]
+
+    results = []
+    for name, options in hooks:
+        result = benchmark.measure(name, lambda: json.loads(body, **options), args.repeat, items=count)
+        results.append(result)
+
+    title = "Json decode, %s items, %.1f MB response" % (count, len(body) / 1024.0 / 1024.0)
+    benchmark.print_results(title, results)
+    benchmark.save_results(args.json, title, results)
+
+
+if __name__ == "__main__":
+    main()
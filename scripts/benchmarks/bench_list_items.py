@@ -0,0 +1,350 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# ListItems for a directory listing: add_gui_item as it was before ListItemBuilder,
+# add_gui_item now sharing the builder of the last call and one ListItemBuilder for the list as
+# process_directory uses it. Reports items/sec and Kodi api calls per item, the
+# ListItems of every case are checked to be the same first.
+#
+#   python scripts/benchmarks/bench_list_items.py --count 5000 --type episodes
+
+import json
+import sys
+import urllib.parse
+from datetime import datetime
+
+import benchmark
+import fixtures
+
+import xbmc
+import xbmcgui
+
+from resources.lib.item_functions import (NoneDict, add_gui_item, build_gui_options, extract_item_info, kodi_version,
+                                          ListItemBuilder)
+from resources.lib.utils import datetime_from_string
+
+DISPLAY_OPTIONS = {
+    "addCounts": True,
+    "addResumePercent": True,
+    "addSubtitleAvailable": True,
+    "addUserRatings": True
+}
+
+
+def add_gui_item_before(url, item_details, display_options, folder=True, default_sort=False):
+    # add_gui_item before ListItemBuilder, kept as the reference for the timings and the output
+
+    if not item_details.name:
+        return None
+
+    if item_details.mode:
+        mode = "&mode=%s" % item_details.mode
+    else:
+        mode = "&mode=0"
+
+    # Create the URL to pass to the item
+    if folder:
+        u = sys.argv[0] + "?url=" + urllib.parse.quote(url) + mode + "&media_type=" + item_details.item_type
+        if item_details.name_format:
+            u += '&name_format=' + urllib.parse.quote(item_details.name_format)
+        if default_sort:
+            u += '&sort=none'
+    else:
+        u = sys.argv[0] + "?item_id=" + url + "&mode=PLAY"
+
+    # Create the ListItem that will be displayed
+    thumb_path = item_details.art["thumb"]
+
+    list_item_name = item_details.name
+    item_type = item_details.item_type.lower()
+    is_video = item_type not in ['musicalbum', 'audio', 'music']
+
+    # calculate percentage
+    capped_percentage = 0
+    if item_details.resume_time > 0:
+        duration = float(item_details.duration)
+        if duration > 0:
+            resume = float(item_details.resume_time)
+            percentage = int((resume / duration) * 100.0)
+            capped_percentage = percentage
+
+    total_items = item_details.total_episodes
+    if total_items != 0:
+        watched = float(item_details.watched_episodes)
+        percentage = int((watched / float(total_items)) * 100.0)
+        capped_percentage = percentage
+
+    counts_added = False
+    add_counts = display_options["addCounts"]
+    if add_counts and item_details.unwatched_episodes != 0:
+        counts_added = True
+        list_item_name = list_item_name + (" (%s)" % item_details.unwatched_episodes)
+
+    add_resume_percent = display_options["addResumePercent"]
+    if (not counts_added
+            and add_resume_percent
+            and capped_percentage not in [0, 100]):
+        list_item_name = list_item_name + (" (%s%%)" % capped_percentage)
+
+    subtitle_available = display_options["addSubtitleAvailable"]
+    if subtitle_available and item_details.subtitle_available:
+        list_item_name += " (cc)"
+
+    if item_details.item_type == "Program":
+        start_time = datetime_from_string(item_details.program_start_date)
+        end_time = datetime_from_string(item_details.program_end_date)
+
+        duration = (end_time - start_time).total_seconds()
+        time_done = (datetime.now() - start_time).total_seconds()
+        percentage_done = (float(time_done) / float(duration)) * 100.0
+        capped_percentage = int(percentage_done)
+
+        start_time_string = start_time.strftime("%H:%M")
+        end_time_string = end_time.strftime("%H:%M")
+
+        item_details.duration = int(duration)
+        item_details.resume_time = int(time_done)
+
+        list_item_name = (item_details.program_channel_name +
+                          " - " + list_item_name +
+                          " - " + start_time_string + " to " + end_time_string +
+                          " (" + str(int(percentage_done)) + "%)")
+
+        time_info = "Start : " + start_time_string + "\n"
+        time_info += "End : " + end_time_string + "\n"
+        time_info += "Complete : " + str(int(percentage_done)) + "%\n"
+        if item_details.plot:
+            item_details.plot = time_info + item_details.plot
+        else:
+            item_details.plot = time_info
+
+    if kodi_version > 17:
+        list_item = xbmcgui.ListItem(list_item_name, offscreen=True)
+    else:
+        list_item = xbmcgui.ListItem(list_item_name, iconImage=thumb_path, thumbnailImage=thumb_path)
+
+    item_properties = {}
+
+    # calculate percentage
+    if capped_percentage != 0:
+        item_properties["complete_percentage"] = str(capped_percentage)
+
+    item_properties["IsPlayable"] = 'false'
+
+    if not folder and is_video:
+        item_properties["TotalTime"] = str(item_details.duration)
+        item_properties["ResumeTime"] = str(item_details.resume_time)
+
+    list_item.setArt(item_details.art)
+
+    item_properties["fanart_image"] = item_details.art['fanart']  # back compat
+    item_properties["discart"] = item_details.art['discart']  # not avail to setArt
+    item_properties["tvshow.poster"] = item_details.art['tvshow.poster']  # not avail to setArt
+
+    if item_details.series_id:
+        item_properties["series_id"] = item_details.series_id
+
+    # new way
+    info_labels = {}
+
+    # add cast
+    if item_details.cast is not None:
+        if kodi_version >= 17:
+            list_item.setCast(item_details.cast)
+        else:
+            info_labels['cast'] = info_labels['castandrole'] = [(cast_member['name'], cast_member['role']) for cast_member in item_details.cast]
+
+    info_labels["title"] = list_item_name
+    if item_details.sort_name:
+        info_labels["sorttitle"] = item_details.sort_name
+    else:
+        info_labels["sorttitle"] = list_item_name
+
+    info_labels["duration"] = item_details.duration
+    info_labels["playcount"] = item_details.play_count
+
+    info_labels["rating"] = item_details.rating
+    info_labels["year"] = item_details.year
+
+    if item_details.genres is not None and len(item_details.genres) > 0:
+        genres_list = []
+        for genre in item_details.genres:
+            genres_list.append(urllib.parse.quote(genre.encode('utf8')))
+        item_properties["genres"] = urllib.parse.quote("|".join(genres_list))
+
+        info_labels["genre"] = " / ".join(item_details.genres)
+
+    mediatype = 'video'
+
+    if item_type == 'movie':
+        mediatype = 'movie'
+    elif item_type == 'boxset':
+        mediatype = 'set'
+    elif item_type == 'series':
+        mediatype = 'tvshow'
+    elif item_type == 'season':
+        mediatype = 'season'
+    elif item_type == 'episode':
+        mediatype = 'episode'
+    elif item_type == 'musicalbum':
+        mediatype = 'album'
+    elif item_type == 'musicartist':
+        mediatype = 'artist'
+    elif item_type == 'audio' or item_type == 'music':
+        mediatype = 'song'
+
+    info_labels["mediatype"] = mediatype
+
+    if item_type == 'episode':
+        info_labels["episode"] = item_details.episode_number
+        info_labels["season"] = item_details.season_number
+        info_labels["sortseason"] = item_details.season_sort_number
+        info_labels["sortepisode"] = item_details.episode_sort_number
+        info_labels["tvshowtitle"] = item_details.series_name
+        if item_details.season_number == 0:
+            item_properties["IsSpecial"] = "true"
+
+    elif item_type == 'season':
+        info_labels["season"] = item_details.season_number
+        info_labels["episode"] = item_details.total_episodes
+        info_labels["tvshowtitle"] = item_details.series_name
+        if item_details.season_number == 0:
+            item_properties["IsSpecial"] = "true"
+
+    elif item_type == "series":
+        info_labels["episode"] = item_details.total_episodes
+        info_labels["season"] = item_details.total_seasons
+        info_labels["status"] = item_details.status
+        info_labels["tvshowtitle"] = item_details.name
+
+    if is_video:
+
+        info_labels["Overlay"] = item_details.overlay
+        info_labels["tagline"] = item_details.tagline
+        info_labels["studio"] = item_details.studio
+        info_labels["premiered"] = item_details.premiere_date
+        info_labels["plot"] = item_details.plot
+        info_labels["director"] = item_details.director
+        info_labels["writer"] = item_details.writer
+        info_labels["dateadded"] = item_details.date_added
+        info_labels["country"] = item_details.production_location
+        info_labels["mpaa"] = item_details.mpaa
+        info_labels["tag"] = item_details.tags
+
+        if display_options["addUserRatings"]:
+            info_labels["userrating"] = item_details.critic_rating
+
+        if item_type in ('movie', 'series'):
+            info_labels["trailer"] = "plugin://plugin.video.embycon?mode=playTrailer&id=" + item_details.id
+
+        list_item.setInfo('video', info_labels)
+
+        if item_details.media_streams is not None:
+            for stream in item_details.media_streams:
+                if stream["type"] == "video":
+                    list_item.addStreamInfo('video',
+                                            {'duration': item_details.duration,
+                                             'aspect': stream["apect_ratio"],
+                                             'codec': stream["codec"],
+                                             'width': stream["width"],
+                                             'height': stream["height"]})
+                elif stream["type"] == "audio":
+                    list_item.addStreamInfo('audio',
+                                            {'codec': stream["codec"],
+                                             'channels': stream["channels"],
+                                             'language': stream["language"]})
+                elif stream["type"] == "sub":
+                    list_item.addStreamInfo('subtitle',
+                                            {'language': stream["language"]})
+
+        item_properties["TotalSeasons"] = str(item_details.total_seasons)
+        item_properties["TotalEpisodes"] = str(item_details.total_episodes)
+        item_properties["WatchedEpisodes"] = str(item_details.watched_episodes)
+        item_properties["UnWatchedEpisodes"] = str(item_details.unwatched_episodes)
+        item_properties["NumEpisodes"] = str(item_details.number_episodes)
+
+        list_item.setRating("imdb", item_details.community_rating, 0, True)
+        item_properties["TotalTime"] = str(item_details.duration)
+
+    else:
+        info_labels["tracknumber"] = item_details.track_number
+        if item_details.album_artist:
+            info_labels["artist"] = item_details.album_artist
+        elif item_details.song_artist:
+            info_labels["artist"] = item_details.song_artist
+        info_labels["album"] = item_details.album_name
+
+        list_item.setInfo('music', info_labels)
+
+    list_item.setContentLookup(False)
+    item_properties["ItemType"] = item_details.item_type
+    item_properties["id"] = item_details.id
+
+    if item_details.baseline_itemname is not None:
+        item_properties["suggested_from_watching"] = item_details.baseline_itemname
+
+    if kodi_version > 17:
+        list_item.setProperties(item_properties)
+    else:
+        for key, value in list(item_properties.items()):
+            list_item.setProperty(key, value)
+
+    return u, list_item, folder
+
+
+def get_list_item_state(gui_item):
+    url, list_item, folder = gui_item
+    return (url, folder, list_item.label, list_item.info, list_item.art, list_item.properties,
+            list_item.stream_info, list_item.cast, list_item.ratings, list_item.content_lookup)
+
+
+def main():
+    parser = benchmark.get_parser("ListItems per second, add_gui_item against one ListItemBuilder per list",
+                                  count=5000)
+    args = benchmark.parse_args(parser)
+
+    gui_options = build_gui_options("http://127.0.0.1:8096")
+    # decoded as DataManager does, extract_item_info relies on the NoneDict lookups
+    items = json.loads(json.dumps(fixtures.get_items(args)), object_hook=NoneDict)
+    item_list = [extract_item_info(item, gui_options) for item in items]
+    entries = []
+    for item_details in item_list:
+        if item_details.is_folder:
+            entries.append(("{server}/emby/Users/{userid}/items?ParentId=" + item_details.id, item_details, True))
+        else:
+            entries.append((item_details.id, item_details, False))
+
+    def before():
+        return [add_gui_item_before(url, item_details, DISPLAY_OPTIONS, folder)
+                for url, item_details, folder in entries]
+
+    def per_item():
+        return [add_gui_item(url, item_details, DISPLAY_OPTIONS, folder) for url, item_details, folder in entries]
+
+    def per_list():
+        list_item_builder = ListItemBuilder(DISPLAY_OPTIONS)
+        return [list_item_builder.build(url, item_details, folder) for url, item_details, folder in entries]
+
+    expected = [get_list_item_state(gui_item) for gui_item in before()]
+    for name, func in [("add_gui_item", per_item), ("ListItemBuilder", per_list)]:
+        if [get_list_item_state(gui_item) for gui_item in func()] != expected:
+            raise AssertionError("%s ListItems differ from add_gui_item before" % name)
+
+    cases = [
+        ("add_gui_item before", before),
+        ("add_gui_item", per_item),
+        ("ListItemBuilder per list", per_list),
+    ]
+
+    results = []
+    for name, func in cases:
+        result = benchmark.measure(name, func, args.repeat, benchmark.reset_kodi, len(entries))
+        result["api_calls_per_item"] = sum(xbmc.api_calls.values()) / float(len(entries))
+        results.append(result)
+
+    title = "ListItems, %s %s, Kodi %s" % (len(entries), args.type, kodi_version)
+    benchmark.print_results(title, results, [("api calls/item", "api_calls_per_item", lambda value: "%.1f" % value)])
+    benchmark.save_results(args.json, title, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Settings reads per directory load. With the settings snapshot the hot path settings are read
+# from Kodi once per plugin call. The "per call" case is the old code path, every function made
+# a new xbmcaddon.Addon() and read only the settings it needed from it.
+#
+#   python scripts/benchmarks/bench_settings.py --count 500
+
+import json
+import sys
+
+import benchmark
+import fixtures
+
+import xbmcaddon
+
+from resources.lib import settings_snapshot
+from resources.lib.dir_functions import process_directory
+
+ITEMS_URL = "{server}/emby/Users/{userid}/Items?Recursive=true&IncludeItemTypes=Movie&Fields={field_filters}&format=json"
+
+
+class PerCallSettings:
+    # one xbmcaddon.Addon() per function, each setting read from Kodi when the function first uses it
+    converters = dict((attr_name, (setting_id, converter))
+                      for attr_name, setting_id, converter in settings_snapshot.SNAPSHOT_SETTINGS)
+
+    def __init__(self):
+        self.addon = xbmcaddon.Addon()
+        self.values = {}
+
+    def __getattr__(self, name):
+        if name not in self.converters:
+            raise AttributeError(name)
+        setting_id, converter = self.converters[name]
+        value = converter(self.getSetting(setting_id))
+        setattr(self, name, value)
+        return value
+
+    def getSetting(self, setting_id):
+        if setting_id not in self.values:
+            self.values[setting_id] = self.addon.getSetting(setting_id)
+        return self.values[setting_id]
+
+
+def patch_get_settings(get_settings):
+    # the modules imported get_settings by name, swap it everywhere
+    original = settings_snapshot.get_settings
+    for module in list(sys.modules.values()):
+        if module is not None and getattr(module, "get_settings", None) is original:
+            module.get_settings = get_settings
+
+
+def main():
+    parser = benchmark.get_parser("Kodi settings reads per directory load", count=500)
+    args = benchmark.parse_args(parser)
+
+    items = fixtures.get_items(args)
+    body = json.dumps(fixtures.make_response(items)).encode("utf-8")
+    server = benchmark.FixtureServer(benchmark.items_responder(body)).start()
+
+    snapshot_get_settings = settings_snapshot.get_settings
+    get_settings_calls = [0]
+
+    def counting_get_settings():
+        get_settings_calls[0] += 1
+        return snapshot_get_settings()
+
+    def per_call_get_settings():
+        get_settings_calls[0] += 1
+        return PerCallSettings()
+
+    def load_directory():
+        benchmark.reset_kodi()
+        return process_directory(ITEMS_URL, None, {}, use_cache_data=False)
+
+    results = []
+    for name, get_settings in [("snapshot", counting_get_settings), ("per call", per_call_get_settings)]:
+        patch_get_settings(get_settings)
+        settings_snapshot.get_settings = get_settings
+
+        # a new plugin invocation starts without a snapshot
+        settings_snapshot.current_snapshot = None
+        xbmcaddon.setting_reads.clear()
+        get_settings_calls[0] = 0
+        load_directory()
+        kodi_reads = sum(xbmcaddon.setting_reads.values())
+        calls = get_settings_calls[0]
+
+        result = benchmark.measure(name, load_directory, args.repeat, items=len(items))
+        result["kodi_reads"] = kodi_reads
+        result["get_settings_calls"] = calls
+        results.append(result)
+
+        patch_get_settings(snapshot_get_settings)
+        settings_snapshot.get_settings = snapshot_get_settings
+
+    server.stop()
+    title = "Settings reads per directory load of %s items" % len(items)
+    benchmark.print_results(title, results, [("get_settings calls", "get_settings_calls", str),
+                                             ("Kodi getSetting calls", "kodi_reads", str)])
+    print("Kodi settings reads saved per directory load: %s" % (results[1]["kodi_reads"] - results[0]["kodi_reads"]))
+    benchmark.save_results(args.json, title, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Shared setup for the benchmarks: puts the Kodi stubs and the add-on on sys.path,
+# serves fixture json on a local port the add-on is pointed at, and measures
+# time, allocations and peak RSS of a benchmark case.
+
+import argparse
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:
+    # not on Windows
+    resource = None
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.abspath(os.path.join(BENCHMARK_DIR, "..", ".."))
+STUBS_DIR = os.path.join(BENCHMARK_DIR, "kodi_stubs")
+
+for path in [ADDON_DIR, STUBS_DIR]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# the plugin url and handle Kodi passes to default.py, the benchmark options are kept for parse_args()
+script_args = sys.argv[1:]
+sys.argv = ["plugin://plugin.video.embycon/", "1", ""]
+
+import xbmc
+import xbmcaddon
+import xbmcgui
+import xbmcplugin
+
+USER_ID = "d2b8b5a2c04c4d8e9d5d6f0a8b7c6e51"
+ACCESS_TOKEN = "0f4b4d6a7c3e4f0b9a2d1c8e7f6a5b43"
+
+
+def set_settings(values):
+    from resources.lib.settings_snapshot import invalidate_settings
+    xbmcaddon.settings.update(values)
+    invalidate_settings()
+
+
+def set_property(key, value):
+    xbmcgui.Window(10000).setProperty("plugin.video.embycon-" + key, value)
+
+
+def get_property(key):
+    return xbmcgui.Window(10000).getProperty("plugin.video.embycon-" + key)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes, with Nagle on every reply waits for the delayed ack
+    disable_nagle_algorithm = True
+    responder = None
+
+    def log_message(self, format, *args):
+        return
+
+    def send_body(self, status, body, headers=None):
+        self.send_response(status)
+        headers = headers or {}
+        headers.setdefault("Content-Type", "application/json")
+        headers["Content-Length"] = str(len(body))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.write_body(body)
+
+    def write_body(self, body):
+        self.wfile.write(body)
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request_body = self.rfile.read(length) if length else b""
+        status, body = self.responder(self.command, self.path, request_body)
+        self.send_body(status, body)
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def do_DELETE(self):
+        self.handle_request()
+
+
+class FixtureServer:
+    """
+        Local http server answering the add-on requests with responder(method, path, body),
+        which returns (status, body bytes). connect() points the add-on at it as a logged in user.
+    """
+
+    handler_class = FixtureHandler
+
+    def __init__(self, responder, host="127.0.0.1", port=0):
+        handler = type("Bound" + self.handler_class.__name__, (self.handler_class,),
+                       {"responder": staticmethod(responder), "fixture_server": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.1})
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        self.connect()
+        return self
+
+    def connect(self):
+        set_settings({"protocol": "0", "ipaddress": "127.0.0.1", "port": str(self.port), "server_addresses": "",
+                      "username": "benchmark", "save_user_to_settings": "true"})
+        set_property("userid", USER_ID)
+        set_property("userimage", "DefaultUser.png")
+        set_property("AccessToken", ACCESS_TOKEN)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def decode_items(items):
+    # the items as the add-on sees them after DataManager decoded the response
+    from resources.lib.item_functions import NoneDict
+    return json.loads(json.dumps(items), object_hook=NoneDict)
+
+
+def items_responder(body):
+    # every request gets the same items response
+    def respond(method, path, request_body):
+        return 200, body
+    return respond
+
+
+def get_peak_rss():
+    # bytes, the high water mark of the whole process
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak
+    return peak * 1024
+
+
+def measure(name, func, repeat=3, setup=None, items=None):
+    """
+        Runs func repeat times and once more with tracemalloc on, setup runs untimed before each call.
+        Returns a result dict: best and mean seconds, items/sec when items is given,
+        traced peak bytes, blocks still allocated after the call and the process peak RSS.
+    """
+    timings = []
+    for run in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    if setup is not None:
+        setup()
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    keep = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+    del keep
+
+    result = {
+        "name": name,
+        "best": min(timings),
+        "mean": sum(timings) / len(timings),
+        "peak_traced": peak,
+        "retained_blocks": blocks_after - blocks_before,
+        "peak_rss": get_peak_rss(),
+    }
+    if items:
+        result["items"] = items
+        result["items_per_sec"] = items / result["best"]
+    return result
+
+
+def format_bytes(value):
+    if abs(value) >= 1024 * 1024:
+        return "%.1f MB" % (value / 1024.0 / 1024.0)
+    if abs(value) >= 1024:
+        return "%.1f KB" % (value / 1024.0)
+    return "%d B" % value
+
+
+def print_results(title, results, extra_columns=None):
+    # extra_columns: [(heading, key, format function)] for values a benchmark adds to its results
+    extra_columns = extra_columns or []
+    columns = [("case", "name", str),
+               ("best ms", "best", lambda value: "%.1f" % (value * 1000)),
+               ("mean ms", "mean", lambda value: "%.1f" % (value * 1000)),
+               ("items/sec", "items_per_sec", lambda value: "%.0f" % value),
+               ("peak traced", "peak_traced", format_bytes),
+               ("blocks kept", "retained_blocks", str),
+               ("peak rss", "peak_rss", format_bytes)] + extra_columns
+
+    rows = [[heading for heading, key, formatter in columns]]
+    for result in results:
+        row = []
+        for heading, key, formatter in columns:
+            value = result.get(key)
+            row.append("-" if value is None else formatter(value))
+        rows.append(row)
+
+    widths = [max([len(row[index]) for row in rows]) for index in range(len(columns))]
+    print("")
+    print(title)
+    for row_index, row in enumerate(rows):
+        print("  ".join([value.ljust(widths[index]) for index, value in enumerate(row)]))
+        if row_index == 0:
+            print("  ".join(["-" * width for width in widths]))
+
+
+def save_results(file_path, title, results):
+    # appends so one file can hold the runs to compare before and after a change
+    if not file_path:
+        return
+    with open(file_path, "a") as handle:
+        handle.write(json.dumps({"benchmark": title, "time": time.time(), "results": results}) + "\n")
+
+
+def get_parser(description, count=5000, item_type="movies"):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--count", type=int, default=count, help="number of items (default %s)" % count)
+    parser.add_argument("--type", choices=["movies", "episodes"], default=item_type,
+                        help="synthetic items to generate (default %s)" % item_type)
+    parser.add_argument("--fixture", help="recorded Items response json to use instead of synthetic items")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (default 3)")
+    parser.add_argument("--json", help="append the results as a json line to this file")
+    return parser
+
+
+def parse_args(parser):
+    return parser.parse_args(script_args)
+
+
+def reset_kodi():
+    xbmc.reset()
+    xbmcplugin.reset()
@@ -0,0 +1,213 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Emby shaped item lists for the benchmarks. A recorded response (the json body of a
+# Users/{id}/Items call saved from a real server) can be used instead with --fixture.
+
+import json
+import random
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family",
+          "Fantasy", "History", "Horror", "Music", "Mystery", "Romance", "Science Fiction", "Thriller"]
+STUDIOS = ["Warner Bros.", "Universal Pictures", "Paramount", "20th Century Fox", "HBO", "BBC", "A24"]
+RATINGS = ["G", "PG", "PG-13", "R", "TV-14", "TV-MA"]
+LANGUAGES = ["eng", "fre", "ger", "spa", "jpn"]
+WORDS = ["night", "river", "last", "city", "dark", "summer", "king", "house", "blue", "road", "winter",
+         "secret", "garden", "storm", "silent", "golden", "lost", "island", "fire", "glass"]
+
+
+def make_id(rng):
+    return "%032x" % rng.getrandbits(128)
+
+
+def make_tag(rng):
+    return "%032x" % rng.getrandbits(128)
+
+
+def make_title(rng, words=3):
+    return " ".join([rng.choice(WORDS) for index in range(words)]).title()
+
+
+def make_overview(rng):
+    return " ".join([rng.choice(WORDS) for index in range(rng.randint(20, 60))]).capitalize() + "."
+
+
+def make_user_data(rng, played_ratio=0.3):
+    played = rng.random() < played_ratio
+    position = 0
+    if not played and rng.random() < 0.1:
+        position = rng.randint(1, 5000) * 10000000
+    return {
+        "PlaybackPositionTicks": position,
+        "PlayCount": 1 if played else 0,
+        "IsFavorite": rng.random() < 0.05,
+        "Played": played,
+        "Key": make_id(rng)
+    }
+
+
+def make_media_streams(rng):
+    height = rng.choice([480, 720, 1080, 2160])
+    streams = [{
+        "Codec": rng.choice(["h264", "hevc"]),
+        "Type": "Video",
+        "Height": height,
+        "Width": int(height * 16 / 9),
+        "AspectRatio": "16:9",
+        "Index": 0
+    }]
+    for index in range(rng.randint(1, 3)):
+        streams.append({
+            "Codec": rng.choice(["aac", "ac3", "eac3", "dts"]),
+            "Type": "Audio",
+            "Channels": rng.choice([2, 6, 8]),
+            "Language": rng.choice(LANGUAGES),
+            "Index": len(streams)
+        })
+    for index in range(rng.randint(0, 4)):
+        streams.append({
+            "Codec": "srt",
+            "Type": "Subtitle",
+            "Language": rng.choice(LANGUAGES),
+            "Index": len(streams)
+        })
+    return streams
+
+
+def make_people(rng, people_pool):
+    people = []
+    for person in rng.sample(people_pool, rng.randint(3, 12)):
+        people.append(dict(person))
+    return people
+
+
+def make_people_pool(rng, count=500):
+    pool = []
+    for index in range(count):
+        person_type = rng.choice(["Actor", "Actor", "Actor", "Director", "Writer"])
+        person = {"Name": make_title(rng, 2), "Id": str(rng.randint(1, 10000000)), "Type": person_type}
+        if person_type == "Actor":
+            person["Role"] = make_title(rng, 1)
+        if rng.random() < 0.7:
+            person["PrimaryImageTag"] = make_tag(rng)
+        pool.append(person)
+    return pool
+
+
+def make_image_tags(rng, types):
+    image_tags = {}
+    for image_type in types:
+        if image_type == "Primary" or rng.random() < 0.6:
+            image_tags[image_type] = make_tag(rng)
+    return image_tags
+
+
+def make_base_item(rng, item_type, people_pool):
+    premiere_year = rng.randint(1950, 2023)
+    return {
+        "Name": make_title(rng),
+        "ServerId": "0123456789abcdef0123456789abcdef",
+        "Id": make_id(rng),
+        "Etag": make_tag(rng),
+        "DateCreated": "%s-%02d-%02dT10:00:00.0000000Z" % (rng.randint(2015, 2023), rng.randint(1, 12), rng.randint(1, 28)),
+        "PremiereDate": "%s-%02d-%02dT00:00:00.0000000Z" % (premiere_year, rng.randint(1, 12), rng.randint(1, 28)),
+        "ProductionYear": premiere_year,
+        "OfficialRating": rng.choice(RATINGS),
+        "CommunityRating": round(rng.uniform(4.0, 9.5), 1),
+        "RunTimeTicks": rng.randint(20, 180) * 60 * 10000000,
+        "Overview": make_overview(rng),
+        "Taglines": [make_title(rng, 5)],
+        "Genres": rng.sample(GENRES, rng.randint(1, 3)),
+        "Studios": [{"Name": rng.choice(STUDIOS), "Id": rng.randint(1, 1000)}],
+        "ProductionLocations": ["United States of America"],
+        "People": make_people(rng, people_pool),
+        "TagItems": [],
+        "ProviderIds": {"Imdb": "tt%07d" % rng.randint(1, 9999999), "Tmdb": str(rng.randint(1, 999999))},
+        "IsFolder": False,
+        "Type": item_type,
+        "UserData": make_user_data(rng),
+        "MediaStreams": make_media_streams(rng),
+        "LocationType": "FileSystem",
+        "MediaType": "Video"
+    }
+
+
+def make_movies(count, seed=1):
+    rng = random.Random(seed)
+    people_pool = make_people_pool(rng)
+    items = []
+    for index in range(count):
+        item = make_base_item(rng, "Movie", people_pool)
+        item["SortName"] = item["Name"].lower()
+        item["ImageTags"] = make_image_tags(rng, ["Primary", "Art", "Banner", "Disc", "Logo", "Thumb"])
+        item["BackdropImageTags"] = [make_tag(rng) for tag_index in range(rng.randint(0, 3))]
+        items.append(item)
+    return items
+
+
+def make_episodes(count, seed=1, episodes_per_season=1000):
+    # one series, seasons of episodes_per_season episodes, the series level art is the same for all of them
+    rng = random.Random(seed)
+    people_pool = make_people_pool(rng)
+    series_id = make_id(rng)
+    series_name = make_title(rng)
+    series_primary_tag = make_tag(rng)
+    series_backdrop_tags = [make_tag(rng)]
+    parent_tags = {}
+    for art_type in ["Logo", "Art", "Thumb", "Banner"]:
+        parent_tags[art_type] = make_tag(rng)
+
+    items = []
+    season_id = None
+    for index in range(count):
+        season_number, episode_number = divmod(index, episodes_per_season)
+        season_number += 1
+        if episode_number == 0:
+            season_id = make_id(rng)
+        item = make_base_item(rng, "Episode", people_pool)
+        item.update({
+            "SeriesName": series_name,
+            "SeriesId": series_id,
+            "SeasonId": season_id,
+            "SeasonName": "Season %s" % season_number,
+            "IndexNumber": episode_number + 1,
+            "ParentIndexNumber": season_number,
+            "SeriesPrimaryImageTag": series_primary_tag,
+            "ParentBackdropItemId": series_id,
+            "ParentBackdropImageTags": series_backdrop_tags,
+            "ImageTags": make_image_tags(rng, ["Primary"]),
+            "BackdropImageTags": []
+        })
+        for art_type, tag in parent_tags.items():
+            item["Parent%sItemId" % art_type] = series_id
+            item["Parent%sImageTag" % art_type] = tag
+        items.append(item)
+    return items
+
+
+def make_items(item_type, count, seed=1):
+    if item_type == "episodes":
+        return make_episodes(count, seed)
+    return make_movies(count, seed)
+
+
+def make_response(items):
+    return {"Items": items, "TotalRecordCount": len(items), "StartIndex": 0}
+
+
+def load_fixture(file_path):
+    # a recorded {"Items": [...]} response, or a plain list of items
+    with open(file_path, "rb") as handle:
+        data = json.loads(handle.read())
+    if isinstance(data, dict):
+        return data.get("Items") or []
+    return data
+
+
+def get_items(args):
+    # the --fixture file if given, otherwise --count synthetic --type items
+    if args.fixture:
+        items = load_fixture(args.fixture)
+        if args.count:
+            items = items[:args.count]
+        return items
+    return make_items(args.type, args.count)
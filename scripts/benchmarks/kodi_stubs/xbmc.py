@@ -0,0 +1,191 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Headless stand in for the Kodi xbmc module, only what the add-on uses.
+# Put the kodi_stubs directory on sys.path before importing resources.lib.
+
+import json
+import os
+import sys
+import threading
+from collections import Counter
+
+import xbmcvfs
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+LOGFATAL = 4
+LOGNONE = 5
+
+PLAYLIST_MUSIC = 0
+PLAYLIST_VIDEO = 1
+
+# every call into the Kodi api, by name, so benchmarks can report api crossings
+api_calls = Counter()
+
+# System.BuildVersion decides the Kodi version branches in item_functions
+info_labels = {
+    "System.BuildVersion": os.environ.get("KODI_STUB_VERSION", "19.4 (19.4.0) Git:20220307-5f3e7a7b2a"),
+    "Network.IPAddress": "127.0.0.1",
+}
+builtins = []
+print_log = os.environ.get("KODI_STUB_LOG", "") == "1"
+abort_event = threading.Event()
+
+
+def log(msg, level=LOGDEBUG):
+    api_calls["xbmc.log"] += 1
+    if print_log:
+        sys.stderr.write(msg + "\n")
+
+
+def getInfoLabel(label):
+    api_calls["xbmc.getInfoLabel"] += 1
+    return info_labels.get(label, "")
+
+
+def getCondVisibility(condition):
+    api_calls["xbmc.getCondVisibility"] += 1
+    return False
+
+
+def getSkinDir():
+    return "skin.estuary"
+
+
+def executebuiltin(function, wait=False):
+    api_calls["xbmc.executebuiltin"] += 1
+    builtins.append(function)
+
+
+def executeJSONRPC(request):
+    api_calls["xbmc.executeJSONRPC"] += 1
+    request = json.loads(request)
+    method = request.get("method", "").lower()
+    result = {}
+    if method == "application.getproperties":
+        major, minor = info_labels["System.BuildVersion"].split(" ", 1)[0].split(".")[:2]
+        result = {"version": {"major": int(major), "minor": int(minor)}, "name": "Kodi"}
+    elif method == "settings.getsettingvalue":
+        result = {"value": False}
+    return json.dumps({"id": request.get("id", 1), "jsonrpc": "2.0", "result": result})
+
+
+def sleep(time_ms):
+    abort_event.wait(time_ms / 1000.0)
+
+
+def translatePath(path):
+    return xbmcvfs.translatePath(path)
+
+
+class Monitor:
+
+    def abortRequested(self):
+        return abort_event.is_set()
+
+    def waitForAbort(self, timeout=None):
+        return abort_event.wait(timeout)
+
+    def onSettingsChanged(self):
+        pass
+
+    def onNotification(self, sender, method, data):
+        pass
+
+
+class Player:
+
+    def __init__(self):
+        pass
+
+    def isPlaying(self):
+        return False
+
+    def isPlayingVideo(self):
+        return False
+
+    def isPlayingAudio(self):
+        return False
+
+    def getTime(self):
+        return 0.0
+
+    def getTotalTime(self):
+        return 0.0
+
+    def getPlayingFile(self):
+        return ""
+
+    def play(self, item=None, listitem=None, windowed=False, startpos=-1):
+        api_calls["xbmc.Player.play"] += 1
+
+    def stop(self):
+        pass
+
+    def pause(self):
+        pass
+
+    def playnext(self):
+        pass
+
+    def playprevious(self):
+        pass
+
+    def seekTime(self, seek_time):
+        pass
+
+    def setAudioStream(self, index):
+        pass
+
+    def setSubtitleStream(self, index):
+        pass
+
+    def showSubtitles(self, visible):
+        pass
+
+
+class PlayList:
+
+    def __init__(self, playlist):
+        self.items = []
+
+    def clear(self):
+        self.items = []
+
+    def add(self, url, listitem=None, index=-1):
+        self.items.append((url, listitem))
+
+    def size(self):
+        return len(self.items)
+
+    def getposition(self):
+        return 0
+
+
+class Keyboard:
+
+    def __init__(self, line="", heading="", hidden=False):
+        self.text = line
+
+    def setHeading(self, heading):
+        pass
+
+    def setHiddenInput(self, hidden):
+        pass
+
+    def doModal(self, autoclose=0):
+        pass
+
+    def isConfirmed(self):
+        return False
+
+    def getText(self):
+        return self.text
+
+
+def reset():
+    # between benchmark runs
+    api_calls.clear()
+    del builtins[:]
@@ -0,0 +1,89 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Headless stand in for the Kodi xbmcaddon module. Settings start from the defaults in
+# resources/settings.xml and strings come from the en_gb strings.po, like a fresh install.
+
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from collections import Counter
+
+import xbmcvfs
+
+addon_dir = xbmcvfs.addon_dir
+
+# getSetting calls by setting id, to count the settings round trips
+setting_reads = Counter()
+
+
+def load_addon_info():
+    root = ElementTree.parse(os.path.join(addon_dir, "addon.xml")).getroot()
+    return {
+        "id": root.attrib["id"],
+        "name": root.attrib["name"],
+        "version": root.attrib["version"],
+        "author": root.attrib.get("provider-name", ""),
+        "path": addon_dir,
+        "icon": os.path.join(addon_dir, "icon.png"),
+        "fanart": os.path.join(addon_dir, "fanart.jpg"),
+        "profile": "special://profile/addon_data/%s/" % root.attrib["id"],
+    }
+
+
+def load_default_settings():
+    defaults = {}
+    root = ElementTree.parse(os.path.join(addon_dir, "resources", "settings.xml")).getroot()
+    for setting in root.iter("setting"):
+        setting_id = setting.attrib.get("id")
+        if setting_id:
+            defaults[setting_id] = setting.attrib.get("default", "")
+    return defaults
+
+
+def load_strings():
+    strings = {}
+    strings_file = os.path.join(addon_dir, "resources", "language", "resource.language.en_gb", "strings.po")
+    with open(strings_file, encoding="utf-8") as handle:
+        text = handle.read()
+    for string_id, value in re.findall(r'msgctxt "#(\d+)"\s*msgid "(.*)"', text):
+        strings[int(string_id)] = value.replace('\\"', '"')
+    return strings
+
+
+addon_info = load_addon_info()
+settings = load_default_settings()
+strings = load_strings()
+
+
+class Addon:
+
+    def __init__(self, id=None):
+        pass
+
+    def getAddonInfo(self, info_id):
+        return addon_info.get(info_id, "")
+
+    def getSetting(self, setting_id):
+        setting_reads[setting_id] += 1
+        return settings.get(setting_id, "")
+
+    def getSettingBool(self, setting_id):
+        return self.getSetting(setting_id) == "true"
+
+    def getSettingInt(self, setting_id):
+        try:
+            return int(self.getSetting(setting_id))
+        except ValueError:
+            return 0
+
+    def getSettingString(self, setting_id):
+        return self.getSetting(setting_id)
+
+    def setSetting(self, setting_id, value):
+        settings[setting_id] = value
+
+    def getLocalizedString(self, string_id):
+        return strings.get(string_id, "")
+
+    def openSettings(self):
+        pass
@@ -0,0 +1,202 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Headless stand in for the Kodi xbmcgui module. ListItem keeps what was set on it
+# and every ListItem call is counted in xbmc.api_calls, dialogs answer with the cancel value.
+
+from xbmc import api_calls
+
+NOTIFICATION_INFO = "info"
+NOTIFICATION_WARNING = "warning"
+NOTIFICATION_ERROR = "error"
+
+INPUT_ALPHANUM = 0
+INPUT_NUMERIC = 1
+
+ACTION_PREVIOUS_MENU = 10
+ACTION_NAV_BACK = 92
+
+# window id -> properties, windows with the same id share them like in Kodi
+window_properties = {}
+current_window_id = 10000
+
+
+def getCurrentWindowId():
+    return current_window_id
+
+
+def getCurrentWindowDialogId():
+    return 9999
+
+
+class Window:
+
+    def __init__(self, existingWindowId=-1):
+        api_calls["xbmcgui.Window"] += 1
+        self.properties = window_properties.setdefault(existingWindowId, {})
+
+    def getProperty(self, key):
+        api_calls["xbmcgui.Window.getProperty"] += 1
+        return self.properties.get(key.lower(), "")
+
+    def setProperty(self, key, value):
+        api_calls["xbmcgui.Window.setProperty"] += 1
+        self.properties[key.lower()] = value
+
+    def clearProperty(self, key):
+        api_calls["xbmcgui.Window.clearProperty"] += 1
+        self.properties.pop(key.lower(), None)
+
+    def clearProperties(self):
+        self.properties.clear()
+
+
+class ListItem:
+
+    def __init__(self, label="", label2="", path="", offscreen=False):
+        api_calls["xbmcgui.ListItem"] += 1
+        self.label = label
+        self.label2 = label2
+        self.path = path
+        self.info = {}
+        self.art = {}
+        self.properties = {}
+        self.stream_info = []
+        self.cast = []
+        self.ratings = {}
+        self.content_lookup = True
+
+    def getLabel(self):
+        return self.label
+
+    def setLabel(self, label):
+        api_calls["xbmcgui.ListItem.setLabel"] += 1
+        self.label = label
+
+    def setLabel2(self, label):
+        api_calls["xbmcgui.ListItem.setLabel2"] += 1
+        self.label2 = label
+
+    def getPath(self):
+        return self.path
+
+    def setPath(self, path):
+        api_calls["xbmcgui.ListItem.setPath"] += 1
+        self.path = path
+
+    def setInfo(self, type, infoLabels):
+        api_calls["xbmcgui.ListItem.setInfo"] += 1
+        self.info.setdefault(type, {}).update(infoLabels)
+
+    def setArt(self, values):
+        api_calls["xbmcgui.ListItem.setArt"] += 1
+        self.art.update(values)
+
+    def getArt(self, key):
+        return self.art.get(key, "")
+
+    def setProperty(self, key, value):
+        api_calls["xbmcgui.ListItem.setProperty"] += 1
+        self.properties[key.lower()] = value
+
+    def setProperties(self, dictionary):
+        api_calls["xbmcgui.ListItem.setProperties"] += 1
+        for key, value in dictionary.items():
+            self.properties[key.lower()] = value
+
+    def getProperty(self, key):
+        return self.properties.get(key.lower(), "")
+
+    def addStreamInfo(self, type, values):
+        api_calls["xbmcgui.ListItem.addStreamInfo"] += 1
+        self.stream_info.append((type, values))
+
+    def setCast(self, actors):
+        api_calls["xbmcgui.ListItem.setCast"] += 1
+        self.cast = actors
+
+    def setRating(self, type, rating, votes=0, defaultt=False):
+        api_calls["xbmcgui.ListItem.setRating"] += 1
+        self.ratings[type] = (rating, votes, defaultt)
+
+    def setContentLookup(self, enable):
+        api_calls["xbmcgui.ListItem.setContentLookup"] += 1
+        self.content_lookup = enable
+
+    def setMimeType(self, mimetype):
+        api_calls["xbmcgui.ListItem.setMimeType"] += 1
+
+    def setSubtitles(self, subtitleFiles):
+        api_calls["xbmcgui.ListItem.setSubtitles"] += 1
+
+    def addContextMenuItems(self, items, replaceItems=False):
+        api_calls["xbmcgui.ListItem.addContextMenuItems"] += 1
+
+
+class Dialog:
+
+    def ok(self, heading, message):
+        return True
+
+    def yesno(self, heading, message, nolabel="", yeslabel="", autoclose=0):
+        return False
+
+    def select(self, heading, options, autoclose=0, preselect=-1, useDetails=False):
+        return -1
+
+    def contextmenu(self, options):
+        return -1
+
+    def input(self, heading, defaultt="", type=INPUT_ALPHANUM, option=0, autoclose=0):
+        return ""
+
+    def notification(self, heading, message, icon=NOTIFICATION_INFO, time=5000, sound=True):
+        pass
+
+    def textviewer(self, heading, text, usemono=False):
+        pass
+
+
+class DialogProgress:
+
+    def create(self, heading, message=""):
+        pass
+
+    def update(self, percent, message=""):
+        api_calls["xbmcgui.DialogProgress.update"] += 1
+
+    def iscanceled(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class DialogProgressBG(DialogProgress):
+
+    def update(self, percent=0, heading="", message=""):
+        api_calls["xbmcgui.DialogProgressBG.update"] += 1
+
+    def isFinished(self):
+        return False
+
+
+class WindowXML(Window):
+
+    def __init__(self, xmlFilename, scriptPath, defaultSkin="Default", defaultRes="720p", isMedia=False):
+        Window.__init__(self, -1)
+
+    def doModal(self):
+        pass
+
+    def show(self):
+        pass
+
+    def close(self):
+        pass
+
+    def getControl(self, control_id):
+        raise RuntimeError("No controls in the headless stubs")
+
+
+class WindowXMLDialog(WindowXML):
+    pass
@@ -0,0 +1,76 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Headless stand in for the Kodi xbmcplugin module, the directory items handed
+# to Kodi are kept in directory_items so a benchmark can check what was built.
+
+import time
+
+from xbmc import api_calls
+
+SORT_METHOD_NONE = 0
+SORT_METHOD_LABEL = 1
+SORT_METHOD_LABEL_IGNORE_THE = 2
+SORT_METHOD_DATE = 3
+SORT_METHOD_TRACKNUM = 7
+SORT_METHOD_GENRE = 16
+SORT_METHOD_VIDEO_YEAR = 18
+SORT_METHOD_VIDEO_RATING = 19
+SORT_METHOD_DATEADDED = 21
+SORT_METHOD_EPISODE = 24
+SORT_METHOD_VIDEO_SORT_TITLE_IGNORE_THE = 27
+SORT_METHOD_UNSORTED = 40
+
+directory_items = []
+# first_item is the time.perf_counter() of the first item added, for time to first item
+directory_state = {"content": None, "sort_methods": [], "succeeded": None, "first_item": None}
+
+
+def note_first_item():
+    if directory_state["first_item"] is None:
+        directory_state["first_item"] = time.perf_counter()
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    api_calls["xbmcplugin.addDirectoryItem"] += 1
+    note_first_item()
+    directory_items.append((url, listitem, isFolder))
+    return True
+
+
+def addDirectoryItems(handle, items, totalItems=0):
+    api_calls["xbmcplugin.addDirectoryItems"] += 1
+    if items:
+        note_first_item()
+    directory_items.extend(items)
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    api_calls["xbmcplugin.endOfDirectory"] += 1
+    directory_state["succeeded"] = succeeded
+
+
+def setContent(handle, content):
+    api_calls["xbmcplugin.setContent"] += 1
+    directory_state["content"] = content
+
+
+def addSortMethod(handle, sortMethod, label2Mask=""):
+    api_calls["xbmcplugin.addSortMethod"] += 1
+    directory_state["sort_methods"].append(sortMethod)
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    api_calls["xbmcplugin.setResolvedUrl"] += 1
+
+
+def setPluginCategory(handle, category):
+    pass
+
+
+def reset():
+    del directory_items[:]
+    directory_state["content"] = None
+    directory_state["sort_methods"] = []
+    directory_state["succeeded"] = None
+    directory_state["first_item"] = None
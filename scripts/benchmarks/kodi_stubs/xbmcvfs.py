@@ -0,0 +1,151 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Headless stand in for the Kodi xbmcvfs module, special:// paths map into a
+# temp directory (KODI_STUB_HOME to keep it) so every run starts with an empty profile.
+
+import atexit
+import os
+import shutil
+import tempfile
+
+home_dir = os.environ.get("KODI_STUB_HOME")
+if not home_dir:
+    home_dir = tempfile.mkdtemp(prefix="kodi_stub_")
+    atexit.register(shutil.rmtree, home_dir, True)
+addon_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+special_paths = {
+    "special://profile/": os.path.join(home_dir, "userdata") + os.sep,
+    "special://masterprofile/": os.path.join(home_dir, "userdata") + os.sep,
+    "special://temp/": os.path.join(home_dir, "temp") + os.sep,
+    "special://home/addons/plugin.video.embycon/": addon_dir + os.sep,
+    "special://home/": home_dir + os.sep,
+    "special://xbmc/": os.path.join(home_dir, "xbmc") + os.sep,
+}
+
+
+def translatePath(path):
+    if not path.startswith("special://"):
+        return path
+    if not path.endswith("/") and path.count("/") == 2:
+        path += "/"
+    for special, real in special_paths.items():
+        if path.startswith(special):
+            real_path = real + path[len(special):].replace("/", os.sep)
+            # the add-on expects its profile folder to be there, as it is once the settings are saved
+            os.makedirs(os.path.dirname(real_path), exist_ok=True)
+            return real_path
+    return path
+
+
+def exists(path):
+    return os.path.exists(translatePath(path))
+
+
+def listdir(path):
+    path = translatePath(path)
+    dirs = []
+    files = []
+    for name in os.listdir(path):
+        if os.path.isdir(os.path.join(path, name)):
+            dirs.append(name)
+        else:
+            files.append(name)
+    return dirs, files
+
+
+def delete(path):
+    try:
+        os.remove(translatePath(path))
+        return True
+    except OSError:
+        return False
+
+
+def copy(source, destination):
+    try:
+        shutil.copyfile(translatePath(source), translatePath(destination))
+        return True
+    except OSError:
+        return False
+
+
+def mkdir(path):
+    try:
+        os.mkdir(translatePath(path))
+        return True
+    except OSError:
+        return False
+
+
+def mkdirs(path):
+    os.makedirs(translatePath(path), exist_ok=True)
+    return True
+
+
+def rmdir(path, force=False):
+    if force:
+        shutil.rmtree(translatePath(path), ignore_errors=True)
+        return True
+    try:
+        os.rmdir(translatePath(path))
+        return True
+    except OSError:
+        return False
+
+
+class File:
+
+    def __init__(self, path, mode="r"):
+        path = translatePath(path)
+        if mode == "w":
+            self.handle = open(path, "wb")
+        else:
+            self.handle = open(path, "rb") if os.path.exists(path) else None
+
+    def read(self, num_bytes=-1):
+        if self.handle is None:
+            return ""
+        return self.handle.read(num_bytes).decode("utf-8", "replace")
+
+    def readBytes(self, num_bytes=-1):
+        if self.handle is None:
+            return bytearray()
+        return bytearray(self.handle.read(num_bytes))
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.handle.write(data)
+        return True
+
+    def size(self):
+        if self.handle is None:
+            return 0
+        return os.fstat(self.handle.fileno()).st_size
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Stat:
+
+    def __init__(self, path):
+        self.stat = os.stat(translatePath(path))
+
+    def st_size(self):
+        return self.stat.st_size
+
+    def st_mtime(self):
+        return int(self.stat.st_mtime)
+
+    def st_ctime(self):
+        return int(self.stat.st_ctime)
@@ -0,0 +1,609 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# A whole synthetic Emby library: Movies, Series with Seasons, Episodes and specials,
+# MusicAlbums with Audio tracks, Live TV channels with Programs and the People in them.
+# Only a small entry per item is kept in memory, the full item json is built from the
+# item seed when a query returns it so libraries of 100k+ items stay cheap to hold.
+
+import random
+import time
+import zlib
+from collections import defaultdict
+
+import fixtures
+
+SERVER_ID = "0123456789abcdef0123456789abcdef"
+
+# query SortBy names to the entry values they sort on
+SORT_KEYS = {
+    "sortname": lambda entry: entry["SortName"],
+    "name": lambda entry: entry["SortName"],
+    "datecreated": lambda entry: entry["DateCreated"],
+    "premieredate": lambda entry: entry["PremiereDate"],
+    "productionyear": lambda entry: entry["ProductionYear"],
+    "communityrating": lambda entry: entry["CommunityRating"],
+    "dateplayed": lambda entry: entry["LastPlayedDate"] or "",
+    "indexnumber": lambda entry: entry["IndexNumber"] or 0,
+    "parentindexnumber": lambda entry: entry["ParentIndexNumber"] or 0,
+    "airedepisodeorder": lambda entry: (entry["SeasonSortNumber"], entry["EpisodeSortNumber"]),
+    "seriessortname": lambda entry: entry["SeriesSortName"] or entry["SortName"],
+    "album": lambda entry: entry["Album"] or "",
+    "albumartist": lambda entry: entry["AlbumArtist"] or "",
+    "startdate": lambda entry: entry["StartDate"] or "",
+    "runtime": lambda entry: entry["RunTimeTicks"] or 0,
+}
+
+FOLDER_TYPES = ["CollectionFolder", "Series", "Season", "MusicAlbum"]
+
+# not part of the library views, only returned when asked for by type
+LIVE_TV_TYPES = ["TvChannel", "Program"]
+
+
+def format_date(timestamp):
+    return time.strftime("%Y-%m-%dT%H:%M:%S.0000000Z", time.gmtime(timestamp))
+
+
+def get_param(query, name, default=None):
+    # Emby query parameter names are not case sensitive
+    return query.get(name.lower(), default)
+
+
+def get_list_param(query, name):
+    value = get_param(query, name)
+    if not value:
+        return []
+    return [part for part in value.split(",") if part]
+
+
+def get_bool_param(query, name):
+    value = get_param(query, name)
+    if value is None:
+        return None
+    return value.lower() == "true"
+
+
+class SyntheticLibrary:
+    """
+        Deterministic Emby library generated from a seed, answers the item queries
+        the add-on sends with the same shapes a server would.
+    """
+
+    def __init__(self, movies=1000, series=50, seasons=5, episodes=12, specials=2, albums=100, tracks=10,
+                 channels=20, programs=6, people=2000, seed=1):
+        self.rng = random.Random(seed)
+        self.entries = {}
+        self.children = defaultdict(list)
+        self.by_type = defaultdict(list)
+        self.views = []
+        self.people_pool = fixtures.make_people_pool(self.rng, people)
+        self.people_by_id = dict([(person["Id"], person) for person in self.people_pool])
+        self.now = time.time()
+
+        movies_view = self.add_view("Movies", "movies")
+        for index in range(movies):
+            self.add_movie(movies_view)
+
+        shows_view = self.add_view("TV Shows", "tvshows")
+        for index in range(series):
+            self.add_series(shows_view, seasons, episodes, specials)
+
+        music_view = self.add_view("Music", "music")
+        for index in range(albums):
+            self.add_album(music_view, tracks)
+
+        for index in range(channels):
+            self.add_channel(index, programs)
+
+    def __len__(self):
+        return len(self.entries)
+
+    # generation, each entry keeps only what queries filter and sort on plus the item seed
+
+    def add_entry(self, item_type, parent_id, name=None, **values):
+        item_seed = self.rng.getrandbits(64)
+        name = name or fixtures.make_title(self.rng)
+        premiere_year = self.rng.randint(1950, 2023)
+        entry = {
+            "Id": fixtures.make_id(self.rng),
+            "Seed": item_seed,
+            "Type": item_type,
+            "ParentId": parent_id,
+            "Name": name,
+            "SortName": name.lower(),
+            "IsFolder": item_type in FOLDER_TYPES,
+            "DateCreated": format_date(self.now - self.rng.randint(0, 3 * 365 * 24 * 3600)),
+            "PremiereDate": "%s-%02d-%02dT00:00:00.0000000Z" % (premiere_year, self.rng.randint(1, 12),
+                                                               self.rng.randint(1, 28)),
+            "ProductionYear": premiere_year,
+            "CommunityRating": round(self.rng.uniform(4.0, 9.5), 1),
+            "RunTimeTicks": None,
+            "Genres": self.rng.sample(fixtures.GENRES, self.rng.randint(1, 3)),
+            "People": [person["Id"] for person in self.rng.sample(self.people_pool, self.rng.randint(3, 12))],
+            "Played": False,
+            "PlayCount": 0,
+            "IsFavorite": self.rng.random() < 0.05,
+            "PlaybackPositionTicks": 0,
+            "LastPlayedDate": None,
+            "IndexNumber": None,
+            "ParentIndexNumber": None,
+            "SeasonSortNumber": 0,
+            "EpisodeSortNumber": 0,
+            "SeriesSortName": None,
+            "Album": None,
+            "AlbumArtist": None,
+            "StartDate": None,
+        }
+        entry.update(values)
+        if not entry["IsFolder"]:
+            entry["RunTimeTicks"] = entry["RunTimeTicks"] or self.rng.randint(20, 180) * 60 * 10000000
+            if self.rng.random() < 0.3:
+                self.set_played(entry, True)
+            elif self.rng.random() < 0.1:
+                entry["PlaybackPositionTicks"] = self.rng.randint(1, entry["RunTimeTicks"] // 10000000) * 10000000
+        self.entries[entry["Id"]] = entry
+        self.by_type[item_type].append(entry)
+        if parent_id is not None:
+            self.children[parent_id].append(entry)
+        return entry
+
+    def add_view(self, name, collection_type):
+        view = self.add_entry("CollectionFolder", None, name, CollectionType=collection_type)
+        self.views.append(view)
+        return view
+
+    def add_movie(self, view):
+        return self.add_entry("Movie", view["Id"])
+
+    def add_series(self, view, seasons, episodes, specials):
+        series = self.add_entry("Series", view["Id"], Status=self.rng.choice(["Continuing", "Ended"]),
+                                ArtTags=self.make_art_tags())
+        season_ids = {}
+        for season_number in range(0 if specials else 1, seasons + 1):
+            name = "Season %s" % season_number if season_number else "Specials"
+            season = self.add_entry("Season", series["Id"], name, IndexNumber=season_number,
+                                    SeriesId=series["Id"], SeriesName=series["Name"],
+                                    SeriesSortName=series["SortName"])
+            season_ids[season_number] = season["Id"]
+            if season_number:
+                for episode_number in range(1, episodes + 1):
+                    self.add_episode(series, season, season_number, episode_number)
+
+        # specials live in season 0 and say which regular season they air in
+        for episode_number in range(1, specials + 1):
+            airs_before_season = self.rng.randint(1, seasons)
+            airs_before_episode = self.rng.randint(1, episodes)
+            self.add_episode(series, self.entries[season_ids[0]], 0, episode_number,
+                             AirsBeforeSeasonNumber=airs_before_season,
+                             AirsBeforeEpisodeNumber=airs_before_episode,
+                             SeasonSortNumber=airs_before_season,
+                             EpisodeSortNumber=airs_before_episode - 0.5)
+        return series
+
+    def add_episode(self, series, season, season_number, episode_number, **values):
+        sort_values = {"SeasonSortNumber": season_number, "EpisodeSortNumber": episode_number}
+        sort_values.update(values)
+        return self.add_entry("Episode", season["Id"], IndexNumber=episode_number, ParentIndexNumber=season_number,
+                              SeriesId=series["Id"], SeriesName=series["Name"], SeriesSortName=series["SortName"],
+                              SeasonId=season["Id"], SeasonName=season["Name"], **sort_values)
+
+    def add_album(self, view, tracks):
+        artist = fixtures.make_title(self.rng, 2)
+        album = self.add_entry("MusicAlbum", view["Id"], AlbumArtist=artist)
+        album["Album"] = album["Name"]
+        for track_number in range(1, tracks + 1):
+            self.add_entry("Audio", album["Id"], IndexNumber=track_number, ParentIndexNumber=1,
+                           Album=album["Name"], AlbumId=album["Id"], AlbumArtist=artist,
+                           RunTimeTicks=self.rng.randint(120, 420) * 10000000)
+        return album
+
+    def add_channel(self, number, programs):
+        channel = self.add_entry("TvChannel", None, "Channel %s" % (number + 1), Number=str(number + 1))
+        start = self.now - self.rng.randint(0, 3600)
+        for index in range(programs):
+            duration = self.rng.choice([30, 60, 90, 120]) * 60
+            self.add_entry("Program", None, ChannelId=channel["Id"], ChannelName=channel["Name"],
+                           StartDate=format_date(start), EndDate=format_date(start + duration),
+                           RunTimeTicks=duration * 10000000)
+            start += duration
+        return channel
+
+    def make_art_tags(self):
+        return fixtures.make_image_tags(self.rng, ["Primary", "Art", "Banner", "Logo", "Thumb"])
+
+    # user data
+
+    def set_played(self, entry, played):
+        entry["Played"] = played
+        entry["PlayCount"] = max(entry["PlayCount"], 1) if played else 0
+        entry["PlaybackPositionTicks"] = 0
+        entry["LastPlayedDate"] = format_date(self.now) if played else None
+
+    def set_favorite(self, entry, favorite):
+        entry["IsFavorite"] = favorite
+
+    def set_position(self, entry, position_ticks):
+        entry["PlaybackPositionTicks"] = position_ticks
+        entry["LastPlayedDate"] = format_date(time.time())
+
+    def get_descendants(self, entry_id):
+        found = []
+        pending = [entry_id]
+        while pending:
+            for child in self.children.get(pending.pop(), []):
+                found.append(child)
+                if child["IsFolder"]:
+                    pending.append(child["Id"])
+        return found
+
+    def get_user_data(self, entry):
+        user_data = {
+            "PlaybackPositionTicks": entry["PlaybackPositionTicks"],
+            "PlayCount": entry["PlayCount"],
+            "IsFavorite": entry["IsFavorite"],
+            "Played": entry["Played"],
+            "Key": entry["Id"]
+        }
+        if entry["LastPlayedDate"]:
+            user_data["LastPlayedDate"] = entry["LastPlayedDate"]
+        if entry["Type"] in ["Series", "Season"]:
+            playable = [child for child in self.get_descendants(entry["Id"]) if not child["IsFolder"]]
+            unplayed = len([child for child in playable if not child["Played"]])
+            user_data["UnplayedItemCount"] = unplayed
+            user_data["Played"] = len(playable) > 0 and unplayed == 0
+            if playable:
+                user_data["PlayedPercentage"] = 100.0 * (len(playable) - unplayed) / len(playable)
+        return user_data
+
+    # the item json, rebuilt from the seed so repeated queries give the same values
+
+    def build_item(self, entry):
+        rng = random.Random(entry["Seed"])
+        item = fixtures.make_base_item(rng, entry["Type"], self.people_pool)
+        item.update({
+            "Name": entry["Name"],
+            "SortName": entry["SortName"],
+            "ServerId": SERVER_ID,
+            "Id": entry["Id"],
+            "DateCreated": entry["DateCreated"],
+            "PremiereDate": entry["PremiereDate"],
+            "ProductionYear": entry["ProductionYear"],
+            "CommunityRating": entry["CommunityRating"],
+            "RunTimeTicks": entry["RunTimeTicks"],
+            "Genres": entry["Genres"],
+            "GenreItems": [{"Name": genre, "Id": self.get_genre_id(genre)} for genre in entry["Genres"]],
+            "People": [dict(self.people_by_id[person_id]) for person_id in entry["People"]],
+            "IsFolder": entry["IsFolder"],
+            "ParentId": entry["ParentId"],
+            "UserData": self.get_user_data(entry),
+            "ImageTags": fixtures.make_image_tags(rng, ["Primary", "Thumb"]),
+            "BackdropImageTags": [fixtures.make_tag(rng) for index in range(rng.randint(0, 2))],
+        })
+        build_type = getattr(self, "build_" + entry["Type"].lower(), None)
+        if build_type is not None:
+            build_type(entry, item, rng)
+        return item
+
+    def build_collectionfolder(self, entry, item, rng):
+        item["CollectionType"] = entry["CollectionType"]
+        item["ChildCount"] = len(self.children[entry["Id"]])
+        self.remove_media(item)
+
+    def build_movie(self, entry, item, rng):
+        item["ImageTags"] = entry.get("ArtTags") or fixtures.make_image_tags(
+            rng, ["Primary", "Art", "Banner", "Disc", "Logo", "Thumb"])
+
+    def build_series(self, entry, item, rng):
+        item["Status"] = entry["Status"]
+        item["ImageTags"] = entry["ArtTags"]
+        item["ChildCount"] = len(self.children[entry["Id"]])
+        item["RecursiveItemCount"] = len([child for child in self.get_descendants(entry["Id"])
+                                          if child["Type"] == "Episode"])
+        self.remove_media(item)
+
+    def build_season(self, entry, item, rng):
+        series = self.entries[entry["SeriesId"]]
+        item.update({
+            "IndexNumber": entry["IndexNumber"],
+            "SeriesId": series["Id"],
+            "SeriesName": series["Name"],
+            "SeriesPrimaryImageTag": series["ArtTags"]["Primary"],
+            "ChildCount": len(self.children[entry["Id"]]),
+            "RecursiveItemCount": len(self.children[entry["Id"]]),
+        })
+        self.add_parent_art(item, series)
+        self.remove_media(item)
+
+    def build_episode(self, entry, item, rng):
+        series = self.entries[entry["SeriesId"]]
+        item.update({
+            "IndexNumber": entry["IndexNumber"],
+            "ParentIndexNumber": entry["ParentIndexNumber"],
+            "SeriesId": series["Id"],
+            "SeriesName": series["Name"],
+            "SeasonId": entry["SeasonId"],
+            "SeasonName": entry["SeasonName"],
+            "SeriesPrimaryImageTag": series["ArtTags"]["Primary"],
+            "ImageTags": fixtures.make_image_tags(rng, ["Primary"]),
+            "BackdropImageTags": [],
+        })
+        for name in ["AirsBeforeSeasonNumber", "AirsBeforeEpisodeNumber"]:
+            if name in entry:
+                item[name] = entry[name]
+        self.add_parent_art(item, series)
+
+    def build_musicalbum(self, entry, item, rng):
+        item.update({
+            "AlbumArtist": entry["AlbumArtist"],
+            "AlbumArtists": [{"Name": entry["AlbumArtist"], "Id": self.get_genre_id(entry["AlbumArtist"])}],
+            "Artists": [entry["AlbumArtist"]],
+            "ChildCount": len(self.children[entry["Id"]]),
+            "MediaType": None,
+        })
+        self.remove_media(item)
+
+    def build_audio(self, entry, item, rng):
+        album = self.entries[entry["AlbumId"]]
+        item.update({
+            "IndexNumber": entry["IndexNumber"],
+            "ParentIndexNumber": entry["ParentIndexNumber"],
+            "Album": album["Name"],
+            "AlbumId": album["Id"],
+            "AlbumArtist": entry["AlbumArtist"],
+            "Artists": [entry["AlbumArtist"]],
+            "AlbumPrimaryImageTag": fixtures.make_tag(random.Random(album["Seed"])),
+            "MediaType": "Audio",
+            "People": [],
+            "MediaStreams": [{"Codec": rng.choice(["flac", "mp3", "aac"]), "Type": "Audio", "Channels": 2,
+                              "Index": 0}],
+        })
+
+    def build_tvchannel(self, entry, item, rng):
+        item["Number"] = entry["Number"]
+        item["ChannelNumber"] = entry["Number"]
+        item["People"] = []
+
+    def build_program(self, entry, item, rng):
+        item.update({
+            "ChannelId": entry["ChannelId"],
+            "ChannelName": entry["ChannelName"],
+            "StartDate": entry["StartDate"],
+            "EndDate": entry["EndDate"],
+            "LocationType": "Remote",
+            "MediaStreams": [],
+        })
+
+    @staticmethod
+    def remove_media(item):
+        item["MediaStreams"] = []
+        item["RunTimeTicks"] = None
+        item["MediaType"] = None
+
+    @staticmethod
+    def add_parent_art(item, series):
+        item["ParentBackdropItemId"] = series["Id"]
+        item["ParentBackdropImageTags"] = [series["ArtTags"]["Primary"]]
+        for art_type in ["Logo", "Art", "Thumb", "Banner"]:
+            if art_type in series["ArtTags"]:
+                item["Parent%sItemId" % art_type] = series["Id"]
+                item["Parent%sImageTag" % art_type] = series["ArtTags"][art_type]
+
+    @staticmethod
+    def get_genre_id(name):
+        # stable between runs, unlike hash()
+        return str(zlib.crc32(name.encode("utf-8")))
+
+    # queries
+
+    def get_item(self, item_id):
+        entry = self.entries.get(item_id)
+        if entry is None:
+            return None
+        return self.build_item(entry)
+
+    def find_entries(self, query):
+        parent_id = get_param(query, "ParentId")
+        recursive = get_bool_param(query, "Recursive")
+        ids = get_list_param(query, "Ids")
+        include_types = [value.lower() for value in get_list_param(query, "IncludeItemTypes")]
+        exclude_types = [value.lower() for value in get_list_param(query, "ExcludeItemTypes")]
+
+        if ids:
+            entries = [self.entries[item_id] for item_id in ids if item_id in self.entries]
+        elif parent_id and recursive:
+            entries = self.get_descendants(parent_id)
+        elif parent_id:
+            entries = list(self.children.get(parent_id, []))
+        elif include_types:
+            entries = [entry for entry in self.entries.values() if entry["Type"] != "CollectionFolder"]
+        elif recursive:
+            entries = [entry for entry in self.entries.values()
+                       if entry["Type"] != "CollectionFolder" and entry["Type"] not in LIVE_TV_TYPES]
+        else:
+            entries = list(self.views)
+
+        if include_types:
+            entries = [entry for entry in entries if entry["Type"].lower() in include_types]
+        if exclude_types:
+            entries = [entry for entry in entries if entry["Type"].lower() not in exclude_types]
+        return self.filter_entries(entries, query)
+
+    def filter_entries(self, entries, query):
+        filters = [value.lower() for value in get_list_param(query, "Filters")]
+        if get_bool_param(query, "IsPlayed") is not None:
+            filters.append("isplayed" if get_bool_param(query, "IsPlayed") else "isunplayed")
+        if get_bool_param(query, "IsFavorite"):
+            filters.append("isfavorite")
+
+        checks = {
+            "isplayed": lambda entry: entry["Played"],
+            "isunplayed": lambda entry: not entry["Played"],
+            "isfavorite": lambda entry: entry["IsFavorite"],
+            "isresumable": lambda entry: entry["PlaybackPositionTicks"] > 0,
+            "isfolder": lambda entry: entry["IsFolder"],
+            "isnotfolder": lambda entry: not entry["IsFolder"],
+        }
+        for name in filters:
+            if name in checks:
+                entries = [entry for entry in entries if checks[name](entry)]
+
+        genres = get_list_param(query, "Genres") or get_list_param(query, "GenreIds")
+        if genres:
+            genres = set(genres)
+            entries = [entry for entry in entries
+                       if genres.intersection(entry["Genres"]) or
+                       genres.intersection([self.get_genre_id(genre) for genre in entry["Genres"]])]
+
+        person_ids = set(get_list_param(query, "PersonIds"))
+        if person_ids:
+            entries = [entry for entry in entries if person_ids.intersection(entry["People"])]
+
+        years = get_list_param(query, "Years")
+        if years:
+            entries = [entry for entry in entries if str(entry["ProductionYear"]) in years]
+
+        name_starts_with = get_param(query, "NameStartsWith")
+        if name_starts_with:
+            name_starts_with = name_starts_with.lower()
+            entries = [entry for entry in entries if entry["SortName"].startswith(name_starts_with)]
+
+        search_term = get_param(query, "SearchTerm")
+        if search_term:
+            search_term = search_term.lower()
+            entries = [entry for entry in entries if search_term in entry["SortName"]]
+
+        return entries
+
+    def sort_entries(self, entries, query):
+        sort_by = [value.lower() for value in get_list_param(query, "SortBy")]
+        descending = (get_param(query, "SortOrder") or "").lower() == "descending"
+        if "random" in sort_by:
+            random.Random(len(entries)).shuffle(entries)
+            return entries
+        # stable sorts applied last key first give the multi key order
+        for name in reversed(sort_by):
+            if name in SORT_KEYS:
+                entries.sort(key=SORT_KEYS[name], reverse=descending)
+        return entries
+
+    def get_page(self, entries, query):
+        start_index = int(get_param(query, "StartIndex") or 0)
+        limit = get_param(query, "Limit")
+        if limit:
+            return entries[start_index:start_index + int(limit)]
+        return entries[start_index:]
+
+    def query_items(self, query):
+        entries = self.sort_entries(self.find_entries(query), query)
+        page = self.get_page(entries, query)
+        return {
+            "Items": [self.build_item(entry) for entry in page],
+            "TotalRecordCount": len(entries),
+            "StartIndex": int(get_param(query, "StartIndex") or 0)
+        }
+
+    def query_latest(self, query):
+        # Items/Latest answers a plain list, newest first
+        query = dict(query)
+        query["sortby"] = "DateCreated"
+        query["sortorder"] = "Descending"
+        query["recursive"] = "true"
+        query.setdefault("limit", "20")
+        query.setdefault("filters", "IsNotFolder")
+        return self.query_items(query)["Items"]
+
+    def query_episodes(self, series_id, query):
+        # Shows/{id}/Episodes, with a seasonId the specials airing in that season are listed in it
+        season_id = get_param(query, "SeasonId")
+        episodes = [entry for entry in self.get_descendants(series_id) if entry["Type"] == "Episode"]
+        if season_id and season_id in self.entries:
+            season_number = self.entries[season_id]["IndexNumber"]
+            episodes = [entry for entry in episodes
+                        if entry["SeasonId"] == season_id or
+                        (season_number and entry.get("AirsBeforeSeasonNumber") == season_number)]
+        episodes = self.filter_entries(episodes, query)
+        episodes.sort(key=SORT_KEYS["airedepisodeorder"])
+        page = self.get_page(episodes, query)
+        return {"Items": [self.build_item(entry) for entry in page], "TotalRecordCount": len(episodes),
+                "StartIndex": int(get_param(query, "StartIndex") or 0)}
+
+    def query_seasons(self, series_id, query):
+        seasons = [entry for entry in self.children.get(series_id, []) if entry["Type"] == "Season"]
+        seasons = self.filter_entries(seasons, query)
+        return {"Items": [self.build_item(entry) for entry in seasons], "TotalRecordCount": len(seasons),
+                "StartIndex": 0}
+
+    def query_next_up(self, query):
+        # the first unplayed regular episode of every series that has a played one
+        series_id = get_param(query, "SeriesId")
+        next_up = []
+        for series in self.by_type["Series"]:
+            if series_id and series["Id"] != series_id:
+                continue
+            episodes = [entry for entry in self.get_descendants(series["Id"])
+                        if entry["Type"] == "Episode" and entry["ParentIndexNumber"]]
+            episodes.sort(key=SORT_KEYS["airedepisodeorder"])
+            last_played = None
+            for index, entry in enumerate(episodes):
+                if entry["Played"]:
+                    last_played = index
+            if last_played is not None and last_played + 1 < len(episodes):
+                next_up.append(episodes[last_played + 1])
+        page = self.get_page(next_up, query)
+        return {"Items": [self.build_item(entry) for entry in page], "TotalRecordCount": len(next_up),
+                "StartIndex": 0}
+
+    def query_views(self):
+        return {"Items": [self.build_item(view) for view in self.views], "TotalRecordCount": len(self.views)}
+
+    def query_genres(self, query):
+        counts = defaultdict(int)
+        for entry in self.find_entries(query):
+            for genre in entry["Genres"]:
+                counts[genre] += 1
+        genres = []
+        for name in sorted(counts):
+            genres.append({"Name": name, "Id": self.get_genre_id(name), "Type": "Genre", "ServerId": SERVER_ID,
+                           "ChildCount": counts[name], "ImageTags": {}})
+        return {"Items": genres, "TotalRecordCount": len(genres)}
+
+    def query_prefixes(self, query):
+        prefixes = sorted(set([entry["SortName"][:1].upper() for entry in self.find_entries(query) if entry["SortName"]]))
+        return [{"Name": prefix} for prefix in prefixes]
+
+    def query_persons(self, query):
+        search_term = (get_param(query, "SearchTerm") or "").lower()
+        people = []
+        for person in self.people_pool:
+            if search_term in person["Name"].lower():
+                item = {"Name": person["Name"], "Id": person["Id"], "Type": "Person", "ServerId": SERVER_ID,
+                        "ImageTags": {}}
+                if person.get("PrimaryImageTag"):
+                    item["ImageTags"]["Primary"] = person["PrimaryImageTag"]
+                people.append(item)
+        page = self.get_page(people, query)
+        return {"Items": page, "TotalRecordCount": len(people), "StartIndex": 0}
+
+    def get_playback_info(self, item_id):
+        entry = self.entries.get(item_id)
+        if entry is None:
+            return None
+        item = self.build_item(entry)
+        container = "mp3" if entry["Type"] == "Audio" else "mkv"
+        return {
+            "MediaSources": [{
+                "Protocol": "File",
+                "Id": entry["Id"],
+                "Path": "/media/%s/%s.%s" % (entry["Type"].lower(), entry["Id"], container),
+                "Type": "Default",
+                "Container": container,
+                "Name": entry["Name"],
+                "IsRemote": False,
+                "RunTimeTicks": entry["RunTimeTicks"],
+                "SupportsDirectPlay": True,
+                "SupportsDirectStream": True,
+                "SupportsTranscoding": True,
+                "MediaStreams": item["MediaStreams"],
+                "Bitrate": 8000000,
+            }],
+            "PlaySessionId": fixtures.make_id(random.Random(time.time()))
+        }
@@ -0,0 +1,392 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# A local Emby server answering from a SyntheticLibrary, for load testing the add-on
+# without a real server. Latency, bandwidth and failed or dropped requests can be
+# injected to benchmark the caching, connection pooling and prefetch code offline.
+#
+#   python scripts/benchmarks/mock_server.py --movies 100000 --port 8096 --latency 50 --bandwidth 2000
+#
+# Run on its own it serves until interrupted, point the add-on at the printed address
+# and log in as any user with any password.
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit, parse_qsl
+
+import benchmark
+from library import SyntheticLibrary, SERVER_ID
+
+# a 1x1 png for every image request
+IMAGE_BODY = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                           "1f15c4890000000d4944415478da63f8ffff3f0005fe02fea7d6a4e8"
+                           "0000000049454e44ae426082")
+
+# method, path pattern after /emby, route name, the EmbyApi method answering it
+ROUTES = [
+    ("GET", r"/System/Info/Public$", "system_info", "get_system_info"),
+    ("GET", r"/Users/Public$", "public_users", "get_public_users"),
+    ("POST", r"/Users/AuthenticateByName$", "authenticate", "authenticate"),
+    ("GET", r"/Users/(?P<user_id>[^/]+)/Views$", "views", "get_views"),
+    ("GET", r"/Users/(?P<user_id>[^/]+)/Items/Latest$", "latest", "get_latest"),
+    ("GET", r"/Users/(?P<user_id>[^/]+)/Items/(?P<item_id>[^/]+)$", "item", "get_item"),
+    ("GET", r"/Users/(?P<user_id>[^/]+)/Items$", "items", "get_items"),
+    ("POST", r"/Users/(?P<user_id>[^/]+)/PlayedItems/(?P<item_id>[^/]+)$", "played", "set_played"),
+    ("DELETE", r"/Users/(?P<user_id>[^/]+)/PlayedItems/(?P<item_id>[^/]+)$", "unplayed", "set_unplayed"),
+    ("POST", r"/Users/(?P<user_id>[^/]+)/FavoriteItems/(?P<item_id>[^/]+)$", "favorite", "set_favorite"),
+    ("DELETE", r"/Users/(?P<user_id>[^/]+)/FavoriteItems/(?P<item_id>[^/]+)$", "unfavorite", "set_unfavorite"),
+    ("GET", r"/Users/(?P<user_id>[^/]+)$", "user", "get_user"),
+    ("GET", r"/Shows/NextUp$", "next_up", "get_next_up"),
+    ("GET", r"/Shows/(?P<item_id>[^/]+)/Episodes$", "episodes", "get_episodes"),
+    ("GET", r"/Shows/(?P<item_id>[^/]+)/Seasons$", "seasons", "get_seasons"),
+    ("GET", r"/Items/Prefixes$", "prefixes", "get_prefixes"),
+    ("GET", r"/Items/(?P<item_id>[^/]+)/Images/.*$", "image", "get_image"),
+    ("GET", r"/Items/(?P<item_id>[^/]+)/PlaybackInfo$", "playback_info", "get_playback_info"),
+    ("POST", r"/Items/(?P<item_id>[^/]+)/PlaybackInfo$", "playback_info", "get_playback_info"),
+    ("GET", r"/Genres$", "genres", "get_genres"),
+    ("GET", r"/Persons$", "persons", "get_persons"),
+    ("GET", r"/LiveTv/Channels$", "channels", "get_channels"),
+    ("GET", r"/LiveTv/Programs/Recommended$", "programs", "get_programs"),
+    ("POST", r"/Sessions/Playing/Progress$", "progress", "playing_progress"),
+    ("POST", r"/Sessions/Playing/Stopped$", "stopped", "playing_progress"),
+    ("POST", r"/Sessions/Playing$", "playing", "playing_progress"),
+    ("POST", r"/Sessions/Capabilities/Full$", "capabilities", "no_content"),
+    ("GET", r"/Sessions$", "sessions", "get_sessions"),
+]
+
+# small mostly static lists the server sends validators for, like the response cache expects
+CACHEABLE_ROUTES = ["views", "genres", "prefixes", "public_users"]
+
+
+class NetworkConditions:
+    """
+        The network between the add-on and the server: per request latency with jitter in
+        seconds, bandwidth in bytes a second (0 is unlimited) and the share of requests
+        that fail with error_status or have the connection dropped without a reply.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=0, error_rate=0.0, error_status=500, drop_rate=0.0,
+                 seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def get_delay(self):
+        with self.lock:
+            return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def get_failure(self):
+        # None, "error" or "drop"
+        with self.lock:
+            value = self.rng.random()
+        if value < self.drop_rate:
+            return "drop"
+        if value < self.drop_rate + self.error_rate:
+            return "error"
+        return None
+
+
+class EmbyApi:
+    """
+        The Emby endpoints the add-on calls, answered from the library.
+        Each method returns (status, json value or bytes).
+    """
+
+    def __init__(self, library, user_id=benchmark.USER_ID, access_token=benchmark.ACCESS_TOKEN):
+        self.library = library
+        self.user_id = user_id
+        self.access_token = access_token
+        self.lock = threading.Lock()
+
+    def get_user_info(self, name="benchmark"):
+        return {"Name": name, "ServerId": SERVER_ID, "Id": self.user_id, "HasPassword": False,
+                "Configuration": {"DisplayMissingEpisodes": False},
+                "Policy": {"IsAdministrator": True, "EnableRemoteAccess": True}}
+
+    def get_system_info(self, query, body):
+        return 200, {"LocalAddress": "http://127.0.0.1", "ServerName": "EmbyCon Mock", "Version": "4.7.0.0",
+                     "ProductName": "Emby Server", "OperatingSystem": "Linux", "Id": SERVER_ID}
+
+    def get_public_users(self, query, body):
+        return 200, [self.get_user_info()]
+
+    def authenticate(self, query, body):
+        try:
+            name = json.loads(body or b"{}").get("Username") or "benchmark"
+        except ValueError:
+            name = "benchmark"
+        return 200, {"User": self.get_user_info(name), "AccessToken": self.access_token, "ServerId": SERVER_ID,
+                     "SessionInfo": {"Id": "mock", "UserId": self.user_id}}
+
+    def get_user(self, query, body, user_id):
+        return 200, self.get_user_info()
+
+    def get_views(self, query, body, user_id):
+        return 200, self.library.query_views()
+
+    def get_latest(self, query, body, user_id):
+        return 200, self.library.query_latest(query)
+
+    def get_item(self, query, body, user_id, item_id):
+        item = self.library.get_item(item_id)
+        if item is None:
+            return 404, {"Message": "Item not found"}
+        return 200, item
+
+    def get_items(self, query, body, user_id):
+        return 200, self.library.query_items(query)
+
+    def change_user_data(self, item_id, change):
+        entry = self.library.entries.get(item_id)
+        if entry is None:
+            return 404, {"Message": "Item not found"}
+        with self.lock:
+            change(entry)
+        return 200, self.library.get_user_data(entry)
+
+    def set_played(self, query, body, user_id, item_id):
+        return self.change_user_data(item_id, lambda entry: self.library.set_played(entry, True))
+
+    def set_unplayed(self, query, body, user_id, item_id):
+        return self.change_user_data(item_id, lambda entry: self.library.set_played(entry, False))
+
+    def set_favorite(self, query, body, user_id, item_id):
+        return self.change_user_data(item_id, lambda entry: self.library.set_favorite(entry, True))
+
+    def set_unfavorite(self, query, body, user_id, item_id):
+        return self.change_user_data(item_id, lambda entry: self.library.set_favorite(entry, False))
+
+    def get_next_up(self, query, body):
+        return 200, self.library.query_next_up(query)
+
+    def get_episodes(self, query, body, item_id):
+        return 200, self.library.query_episodes(item_id, query)
+
+    def get_seasons(self, query, body, item_id):
+        return 200, self.library.query_seasons(item_id, query)
+
+    def get_prefixes(self, query, body):
+        return 200, self.library.query_prefixes(query)
+
+    def get_image(self, query, body, item_id):
+        return 200, IMAGE_BODY
+
+    def get_playback_info(self, query, body, item_id):
+        playback_info = self.library.get_playback_info(item_id)
+        if playback_info is None:
+            return 404, {"Message": "Item not found"}
+        return 200, playback_info
+
+    def get_genres(self, query, body):
+        return 200, self.library.query_genres(query)
+
+    def get_persons(self, query, body):
+        return 200, self.library.query_persons(query)
+
+    def get_channels(self, query, body):
+        query = dict(query)
+        query["includeitemtypes"] = "TvChannel"
+        return 200, self.library.query_items(query)
+
+    def get_programs(self, query, body):
+        query = dict(query)
+        query["includeitemtypes"] = "Program"
+        query.setdefault("sortby", "StartDate")
+        return 200, self.library.query_items(query)
+
+    def playing_progress(self, query, body):
+        try:
+            info = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"Message": "Bad progress body"}
+        entry = self.library.entries.get(info.get("ItemId"))
+        if entry is not None and info.get("PositionTicks") is not None:
+            with self.lock:
+                self.library.set_position(entry, int(info["PositionTicks"]))
+        return 204, b""
+
+    def no_content(self, query, body):
+        return 204, b""
+
+    def get_sessions(self, query, body):
+        return 200, []
+
+
+class MockEmbyHandler(benchmark.FixtureHandler):
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request_body = self.rfile.read(length) if length else b""
+        mock_server = self.fixture_server
+        conditions = mock_server.conditions
+
+        delay = conditions.get_delay()
+        if delay:
+            time.sleep(delay)
+
+        failure = conditions.get_failure()
+        if failure == "drop":
+            mock_server.count("dropped", 0)
+            self.close_connection = True
+            return
+        if failure == "error":
+            mock_server.count("error", 0)
+            self.send_body(conditions.error_status, b'{"Message": "Injected error"}')
+            return
+
+        route_name, status, body, headers = self.responder(self.command, self.path, request_body)
+
+        etag = headers.get("ETag")
+        if etag and etag == self.headers.get("If-None-Match"):
+            mock_server.count(route_name, 0)
+            self.send_body(304, b"", {"ETag": etag, "Cache-Control": headers["Cache-Control"]})
+            return
+
+        if mock_server.use_gzip and len(body) > 1024 and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body, 5)
+            headers["Content-Encoding"] = "gzip"
+
+        mock_server.count(route_name, len(body))
+        self.send_body(status, body, headers)
+
+    def write_body(self, body):
+        bandwidth = self.fixture_server.conditions.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        chunk_size = 16 * 1024
+        for start in range(0, len(body), chunk_size):
+            chunk = body[start:start + chunk_size]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / float(bandwidth))
+
+
+class MockEmbyServer(benchmark.FixtureServer):
+    """
+        FixtureServer answering the Emby api from a SyntheticLibrary under the given NetworkConditions.
+        requests and bytes_sent count the replies per route, reset_stats() clears them between cases.
+    """
+
+    handler_class = MockEmbyHandler
+
+    def __init__(self, library, conditions=None, host="127.0.0.1", port=0, use_gzip=True, max_age=30):
+        self.api = EmbyApi(library)
+        self.conditions = conditions or NetworkConditions()
+        self.use_gzip = use_gzip
+        self.max_age = max_age
+        self.routes = [(method, re.compile(r"^/emby" + pattern, re.IGNORECASE), name, getattr(self.api, func_name))
+                       for method, pattern, name, func_name in ROUTES]
+        self.stats_lock = threading.Lock()
+        self.requests = Counter()
+        self.bytes_sent = Counter()
+        benchmark.FixtureServer.__init__(self, self.respond, host, port)
+
+    def count(self, route_name, byte_count):
+        with self.stats_lock:
+            self.requests[route_name] += 1
+            self.bytes_sent[route_name] += byte_count
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.requests.clear()
+            self.bytes_sent.clear()
+
+    def get_request_count(self):
+        return sum(self.requests.values())
+
+    def respond(self, method, path, request_body):
+        # returns the route name, status, body bytes and headers
+        parts = urlsplit(path)
+        query = dict([(name.lower(), value) for name, value in parse_qsl(parts.query)])
+        for route_method, pattern, name, func in self.routes:
+            if route_method != method:
+                continue
+            match = pattern.match(parts.path)
+            if match is None:
+                continue
+            status, value = func(query, request_body, **match.groupdict())
+            headers = {}
+            if isinstance(value, bytes):
+                body = value
+                if name == "image":
+                    headers["Content-Type"] = "image/png"
+            else:
+                body = json.dumps(value).encode("utf-8")
+            if status == 200 and name in CACHEABLE_ROUTES:
+                headers["ETag"] = '"%s"' % hashlib.md5(body).hexdigest()
+                headers["Cache-Control"] = "private, max-age=%s" % self.max_age
+            return name, status, body, headers
+        return "not_found", 404, b'{"Message": "Not found"}', {}
+
+
+def add_library_arguments(parser):
+    parser.add_argument("--movies", type=int, default=1000, help="movies in the library (default 1000)")
+    parser.add_argument("--series", type=int, default=50, help="tv series (default 50)")
+    parser.add_argument("--seasons", type=int, default=5, help="seasons per series (default 5)")
+    parser.add_argument("--episodes", type=int, default=12, help="episodes per season (default 12)")
+    parser.add_argument("--specials", type=int, default=2, help="specials per series (default 2)")
+    parser.add_argument("--albums", type=int, default=100, help="music albums (default 100)")
+    parser.add_argument("--tracks", type=int, default=10, help="tracks per album (default 10)")
+    parser.add_argument("--channels", type=int, default=20, help="live tv channels (default 20)")
+    parser.add_argument("--people", type=int, default=2000, help="people to cast from (default 2000)")
+    parser.add_argument("--seed", type=int, default=1, help="library seed (default 1)")
+
+
+def add_network_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0, help="milliseconds the latency varies by")
+    parser.add_argument("--bandwidth", type=float, default=0, help="KB/s the replies are sent at (default unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500, help="status of the injected errors (default 500)")
+    parser.add_argument("--drop-rate", type=float, default=0, help="share of requests closed without a reply")
+
+
+def get_library(args):
+    return SyntheticLibrary(movies=args.movies, series=args.series, seasons=args.seasons, episodes=args.episodes,
+                            specials=args.specials, albums=args.albums, tracks=args.tracks, channels=args.channels,
+                            people=args.people, seed=args.seed)
+
+
+def get_conditions(args):
+    return NetworkConditions(latency=args.latency / 1000.0, jitter=args.jitter / 1000.0,
+                             bandwidth=args.bandwidth * 1024, error_rate=args.error_rate,
+                             error_status=args.error_status, drop_rate=args.drop_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Emby server answering from a synthetic library")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8096, help="port to listen on (default 8096)")
+    add_library_arguments(parser)
+    add_network_arguments(parser)
+    args = benchmark.parse_args(parser)
+
+    started = time.time()
+    library = get_library(args)
+    print("Generated %s items in %.1fs" % (len(library), time.time() - started))
+
+    server = MockEmbyServer(library, get_conditions(args), args.host, args.port)
+    print("Serving on http://%s:%s, Ctrl+C to stop" % (args.host, server.port))
+    try:
+        server.server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        pass
+    server.server.server_close()
+    for name, count in server.requests.most_common():
+        print("%-16s %8s requests %12s" % (name, count, benchmark.format_bytes(server.bytes_sent[name])))
+
+
+
+if __name__ == "__main__":
+    main()
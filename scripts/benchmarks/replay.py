@@ -0,0 +1,416 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Replays a browsing session recorded with the "Capture server traffic for replay" setting.
+# The recorded responses are served by a local stand in server with the recorded latencies,
+# scaled if asked, and every plugin call of the session is run through the add-on again,
+# reporting the time to the first directory item, the total time and the requests made.
+# Run it before and after a change with --json to compare the two.
+#
+#   python scripts/benchmarks/replay.py run traffic_capture.jsonl.gz --latency-scale 1.0
+#   python scripts/benchmarks/replay.py summary traffic_capture.jsonl.gz
+#   python scripts/benchmarks/replay.py anonymize traffic_capture.jsonl.gz shared.jsonl.gz
+#
+# The capture is in the add-on profile folder, userdata/addon_data/plugin.video.embycon.
+# The service traffic in a capture is counted but not replayed.
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import benchmark
+import fixtures
+
+import xbmcplugin
+
+# values in the responses that can tell who made the capture
+TEXT_KEYS = ["Name", "SortName", "OriginalTitle", "Overview", "Path", "SeriesName", "SeasonName", "Album",
+             "AlbumArtist", "Artists", "Taglines", "Role", "ChannelName", "EpisodeTitle", "ServerName",
+             "LocalAddress", "WanAddress", "RemoteEndPoint", "DeviceName", "Client", "Username"]
+
+# query parameters with typed in text, in the server requests and the plugin urls
+TEXT_PARAMS = ["searchterm", "query", "name", "title"]
+
+
+def load_archive(file_path):
+    # the gzip members appended by each flush read back as one stream, oldest request first
+    # streamed bodies are in their own files, named relative to the archive
+    archive_dir = os.path.dirname(os.path.abspath(file_path))
+    entries = []
+    with gzip.open(file_path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("body_file"):
+                    entry["body_file"] = os.path.join(archive_dir, entry["body_file"])
+                entries.append(entry)
+    entries.sort(key=lambda entry: entry["started"])
+    return entries
+
+
+def save_archive(file_path, entries):
+    with gzip.open(file_path, "wt", encoding="utf-8") as handle:
+        for entry in entries:
+            handle.write(json.dumps(entry) + "\n")
+
+
+def get_body(entry):
+    body_file = entry.get("body_file")
+    if body_file:
+        try:
+            with gzip.open(body_file, "rb") as handle:
+                return handle.read()
+        except (OSError, EOFError) as error:
+            print("Could not read %s : %s" % (body_file, error))
+            return b""
+    body = entry.get("body")
+    if body is None:
+        return b""
+    if entry.get("body_encoding") == "base64":
+        return base64.b64decode(body)
+    return body.encode("utf-8")
+
+
+def split_path(path):
+    parts = urlsplit(path)
+    return parts.path.lower(), dict([(name.lower(), value) for name, value in parse_qsl(parts.query)])
+
+
+def get_invocations(entries):
+    # the plugin calls of the session in the order they started, with their requests
+    invocations = OrderedDict()
+    for entry in entries:
+        if entry["source"] == "service":
+            continue
+        invocations.setdefault(entry["process"], {"source": entry["source"], "entries": []})
+        invocations[entry["process"]]["entries"].append(entry)
+    return list(invocations.values())
+
+
+class ReplayHandler(benchmark.FixtureHandler):
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request_body = self.rfile.read(length) if length else b""
+        replay_server = self.fixture_server
+
+        entry = replay_server.find(self.command, self.path, request_body)
+        if entry is None:
+            self.send_body(404, b'{"Message": "Not in the capture"}')
+            return
+
+        delay = entry["ttfb"] * replay_server.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+
+        status = entry["status"]
+        body = get_body(entry)
+        headers = dict(entry["headers"])
+        encoding = headers.pop("content-encoding", None)
+        etag = headers.get("etag")
+        if status == 304:
+            # recorded as a revalidation, a client without the cached copy needs the body
+            if etag and etag == self.headers.get("If-None-Match"):
+                body = b""
+            else:
+                status = 200
+        if status >= 400:
+            body = b'{"Message": "Recorded error"}'
+
+        if encoding == "gzip" and body and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body, 5)
+            headers["content-encoding"] = "gzip"
+
+        self.transfer_time = 0
+        if replay_server.keep_transfer and body:
+            self.transfer_time = max(0.0, entry["latency"] - entry["ttfb"]) * replay_server.latency_scale
+        self.send_body(status, body, headers)
+
+    def write_body(self, body):
+        # spread the recorded transfer time over the body
+        if not self.transfer_time:
+            self.wfile.write(body)
+            return
+        chunk_size = 16 * 1024
+        chunk_count = (len(body) + chunk_size - 1) // chunk_size
+        for start in range(0, len(body), chunk_size):
+            self.wfile.write(body[start:start + chunk_size])
+            time.sleep(self.transfer_time / chunk_count)
+
+
+class ReplayServer(benchmark.FixtureServer):
+    """
+        Answers the requests of a capture with the recorded responses. A request is matched on
+        method, path, query and body hash, the nth identical request gets the nth recorded answer.
+        When the query or body changed the recorded request on the same path with the most
+        query values in common answers and the request is counted as inexact.
+    """
+
+    handler_class = ReplayHandler
+
+    def __init__(self, entries, latency_scale=1.0, keep_transfer=True):
+        self.latency_scale = latency_scale
+        self.keep_transfer = keep_transfer
+        self.lock = threading.Lock()
+        self.exact = {}
+        self.by_path = {}
+        for entry in entries:
+            if entry["source"] == "service" or not entry["status"]:
+                continue
+            path, query = split_path(entry["path"])
+            key = (entry["method"], path, tuple(sorted(query.items())), entry["body_hash"])
+            self.exact.setdefault(key, []).append(entry)
+            self.by_path.setdefault((entry["method"], path), []).append((query, entry))
+        self.served = Counter()
+        self.requests = Counter()
+        benchmark.FixtureServer.__init__(self, None)
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests.clear()
+
+    def rewind(self):
+        # back to the first recorded answer of every request for the next replay of the session
+        with self.lock:
+            self.served.clear()
+
+    def find(self, method, request_path, request_body):
+        path, query = split_path(request_path.replace(benchmark.USER_ID, "{userid}"))
+        body_hash = hashlib.md5(request_body).hexdigest() if request_body else None
+        key = (method, path, tuple(sorted(query.items())), body_hash)
+        with self.lock:
+            recorded = self.exact.get(key)
+            if recorded:
+                index = min(self.served[key], len(recorded) - 1)
+                self.served[key] += 1
+                self.requests["exact"] += 1
+                return recorded[index]
+
+            candidates = self.by_path.get((method, path))
+            if not candidates:
+                self.requests["missing"] += 1
+                return None
+            self.requests["inexact"] += 1
+            best_query, best_entry = max(candidates, key=lambda candidate: len(
+                set(candidate[0].items()).intersection(query.items())))
+            return best_entry
+
+
+def scrub_text(value):
+    # the same text always gives the same words so grouping and sorting still line up
+    digest = hashlib.md5(value.encode("utf-8")).digest()
+    word_count = max(1, min(len(value.split()), 8))
+    return " ".join([fixtures.WORDS[digest[index] % len(fixtures.WORDS)] for index in range(word_count)]).title()
+
+
+def scrub_value(value):
+    if isinstance(value, str):
+        return scrub_text(value)
+    if isinstance(value, list):
+        return [scrub_value(part) for part in value]
+    return value
+
+
+def scrub(value):
+    if isinstance(value, dict):
+        scrubbed = {}
+        for key, part in value.items():
+            if key in TEXT_KEYS:
+                scrubbed[key] = scrub_value(part)
+            else:
+                scrubbed[key] = scrub(part)
+        return scrubbed
+    if isinstance(value, list):
+        return [scrub(part) for part in value]
+    return value
+
+
+def scrub_url(url):
+    # the query values that are typed in text, the rest of the url is ids and options
+    if "?" not in url:
+        return url
+    base, query = url.split("?", 1)
+    params = []
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name.lower() in TEXT_PARAMS:
+            value = scrub_text(value)
+        elif name.lower() == "url":
+            # plugin urls carry the server url they list
+            value = scrub_url(value)
+        params.append((name, value))
+    return base + "?" + urlencode(params, safe="{}/:")
+
+
+def anonymize(entries):
+    anonymized = []
+    for entry in entries:
+        entry = dict(entry)
+        entry["source"] = scrub_url(entry["source"])
+        entry["url"] = scrub_url(entry["url"])
+        entry["path"] = scrub_url(entry["path"])
+        if entry.get("body_file"):
+            # the shared capture is one file, the streamed bodies go into it
+            entry["body"] = get_body(entry).decode("utf-8", "replace")
+            del entry["body_file"]
+        if entry.get("body") is not None and entry.get("body_encoding") is None:
+            try:
+                entry["body"] = json.dumps(scrub(json.loads(entry["body"])))
+            except ValueError:
+                entry["body"] = None
+        elif entry.get("body") is not None:
+            entry["body"] = None
+            del entry["body_encoding"]
+        anonymized.append(entry)
+    return anonymized
+
+
+def get_label(source):
+    # the mode of a plugin url, or the url itself if there is none
+    query = dict(parse_qsl(source.split("?", 1)[1] if "?" in source else ""))
+    label = query.get("mode") or source
+    media_type = query.get("media_type")
+    if media_type:
+        label += " " + media_type
+    return label
+
+
+def run_invocation(source):
+    from resources.lib import functions
+    from resources.lib.settings_snapshot import invalidate_settings
+    from resources.lib.datamanager import CacheManagerThread
+
+    # a new plugin call, Kodi passes the plugin url and a handle
+    base, query = source.split("?", 1) if "?" in source else (source, "")
+    sys.argv = [base, "1", "?" + query]
+    invalidate_settings()
+    benchmark.reset_kodi()
+
+    started = time.perf_counter()
+    functions.main_entry_point()
+    finished = time.perf_counter()
+
+    for thread in threading.enumerate():
+        if isinstance(thread, CacheManagerThread):
+            thread.join()
+
+    first_item = xbmcplugin.directory_state["first_item"]
+    return finished - started, None if first_item is None else first_item - started
+
+
+def run(args):
+    from resources.lib.cache_store import cache_store
+    from resources.lib.response_cache import response_cache
+
+    entries = load_archive(args.archive)
+    invocations = get_invocations(entries)
+    server = ReplayServer(entries, args.latency_scale, not args.no_transfer).start()
+
+    timings = [[] for invocation in invocations]
+    first_items = [[] for invocation in invocations]
+    requests = [Counter() for invocation in invocations]
+    for repeat in range(args.repeat):
+        # every run starts like the capture did, with nothing cached
+        cache_store.clear()
+        response_cache.clear()
+        server.rewind()
+        for index, invocation in enumerate(invocations):
+            server.reset_stats()
+            total, first_item = run_invocation(invocation["source"])
+            timings[index].append(total)
+            if first_item is not None:
+                first_items[index].append(first_item)
+            requests[index] = Counter(server.requests)
+    server.stop()
+
+    results = []
+    for index, invocation in enumerate(invocations):
+        result = {
+            "name": "%s %s" % (index + 1, get_label(invocation["source"])),
+            "source": invocation["source"],
+            "best": min(timings[index]),
+            "mean": sum(timings[index]) / len(timings[index]),
+            "first_item": min(first_items[index]) if first_items[index] else None,
+            "requests": sum(requests[index].values()),
+            "recorded": len(invocation["entries"]),
+            "recorded_time": sum([entry["latency"] for entry in invocation["entries"]]),
+            "inexact": requests[index]["inexact"] + requests[index]["missing"],
+        }
+        results.append(result)
+
+    totals = {
+        "name": "session",
+        "best": sum([result["best"] for result in results]),
+        "mean": sum([result["mean"] for result in results]),
+        "first_item": sum([result["first_item"] or 0 for result in results]),
+        "requests": sum([result["requests"] for result in results]),
+        "recorded": sum([result["recorded"] for result in results]),
+        "recorded_time": sum([result["recorded_time"] for result in results]),
+        "inexact": sum([result["inexact"] for result in results]),
+    }
+    results.append(totals)
+
+    milliseconds = lambda value: "%.1f" % (value * 1000)
+    title = "Replay of %s plugin calls, latency x%s" % (len(invocations), args.latency_scale)
+    benchmark.print_results(title, results, [("first item ms", "first_item", milliseconds),
+                                             ("requests", "requests", str),
+                                             ("recorded", "recorded", str),
+                                             ("recorded net ms", "recorded_time", milliseconds),
+                                             ("inexact", "inexact", str)])
+    service_count = len([entry for entry in entries if entry["source"] == "service"])
+    if service_count:
+        print("%s service requests in the capture were not replayed" % service_count)
+    benchmark.save_results(args.json, title, results)
+
+
+def summary(args):
+    entries = load_archive(args.archive)
+    for invocation in get_invocations(entries):
+        print(invocation["source"])
+        for entry in invocation["entries"]:
+            print("    %-6s %s %6.0f ms %10s  %s" % (entry["method"], entry["status"], entry["latency"] * 1000,
+                                                   benchmark.format_bytes(entry["size"]), entry["url"]))
+    service_count = len([entry for entry in entries if entry["source"] == "service"])
+    print("%s requests, %s from the service" % (len(entries), service_count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a captured browsing session")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run_parser = commands.add_parser("run", help="replay the plugin calls against the recorded responses")
+    run_parser.add_argument("archive", help="traffic_capture.jsonl.gz from the add-on profile")
+    run_parser.add_argument("--latency-scale", type=float, default=1.0,
+                            help="multiplies the recorded latencies, 0 answers at once (default 1.0)")
+    run_parser.add_argument("--no-transfer", action="store_true",
+                            help="send the bodies at once instead of over the recorded transfer time")
+    run_parser.add_argument("--repeat", type=int, default=1, help="times the whole session is replayed (default 1)")
+    run_parser.add_argument("--json", help="append the results as a json line to this file")
+
+    summary_parser = commands.add_parser("summary", help="list the plugin calls and requests in a capture")
+    summary_parser.add_argument("archive")
+
+    anonymize_parser = commands.add_parser("anonymize", help="replace names, overviews, paths and typed text")
+    anonymize_parser.add_argument("archive")
+    anonymize_parser.add_argument("output")
+
+    args = benchmark.parse_args(parser)
+    if args.command == "run":
+        run(args)
+    elif args.command == "summary":
+        summary(args)
+    elif args.command == "anonymize":
+        entries = anonymize(load_archive(args.archive))
+        save_archive(args.output, entries)
+        print("Saved %s requests to %s" % (len(entries), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Runs every bench_*.py in its own process so the peak RSS of one does not hide the next.
+#
+#   python scripts/benchmarks/run_all.py [--quick] [--json results.jsonl]
+
+import argparse
+import os
+import subprocess
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# smaller runs to check nothing is broken, not for comparing numbers
+QUICK_ARGS = {
+    "bench_artwork.py": ["--count", "1000"],
+    "bench_browse.py": ["--movies", "200", "--series", "10", "--profiles", "lan"],
+    "bench_cache_store.py": ["--sizes", "200", "--loads", "100"],
+    "bench_directory.py": ["--count", "1000"],
+    "bench_item_details.py": ["--count", "1000"],
+    "bench_json_decode.py": ["--count", "1000"],
+    "bench_list_items.py": ["--count", "1000"],
+    "bench_settings.py": ["--count", "100"],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all the benchmarks")
+    parser.add_argument("--quick", action="store_true", help="small item counts and one timed run")
+    parser.add_argument("--json", help="append the results as json lines to this file")
+    args = parser.parse_args()
+
+    failed = []
+    for filename in sorted(os.listdir(BENCHMARK_DIR)):
+        if not filename.startswith("bench_") or not filename.endswith(".py"):
+            continue
+        command = [sys.executable, os.path.join(BENCHMARK_DIR, filename)]
+        if args.quick:
+            command += QUICK_ARGS.get(filename, []) + ["--repeat", "1"]
+        if args.json:
+            command += ["--json", os.path.abspath(args.json)]
+        print("== %s" % " ".join(command[1:]))
+        sys.stdout.flush()
+        if subprocess.call(command) != 0:
+            failed.append(filename)
+
+    if failed:
+        print("")
+        print("Failed: %s" % ", ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
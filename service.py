@@ -8,7 +8,7 @@ import xbmc
 import xbmcaddon
 import xbmcgui
 
-from resources.lib.downloadutils import DownloadUtils, save_user_details
+from resources.lib.downloadutils import DownloadUtils, save_user_details, clear_auth_header_cache, request_single_flight
 from resources.lib.simple_logging import SimpleLogging
 from resources.lib.play_utils import Service, PlaybackService, send_progress
 from resources.lib.kodi_utils import HomeWindow
@@ -19,11 +19,18 @@ from resources.lib.context_monitor import ContextMonitor
 from resources.lib.server_detect import check_server
 from resources.lib.library_change_monitor import LibraryChangeMonitor
 from resources.lib.datamanager import clear_old_cache_data
+from resources.lib.cache_store import cache_store, CacheEvictionThread
 from resources.lib.tracking import set_timing_enabled
 from resources.lib.image_server import HttpImageServerThread
+from resources.lib.prefetch import PrefetchThread
 from resources.lib.playnext import PlayNextService
 from resources.lib.skin_cloner import check_skin_installed
 from resources.lib.version_check import VersionCheck
+from resources.lib.connection_pool import connection_pool
+from resources.lib.response_cache import response_cache
+from resources.lib.circuit_breaker import circuit_breaker, ServerProbeThread
+from resources.lib.network_stats import network_stats
+from resources.lib.traffic_capture import traffic_capture
 
 settings = xbmcaddon.Addon()
 
@@ -56,6 +63,12 @@ if server is None:
 
 check_server()
 
+# move any list cache files from older versions into the cache database
+try:
+    cache_store.migrate_pickle_files()
+except Exception as error:
+    log.error("Error migrating cache files: {0}", error)
+
 download_utils = DownloadUtils()
 
 # auth the service
@@ -71,6 +84,18 @@ VersionCheck().start()
 image_server = HttpImageServerThread()
 image_server.start()
 
+# retries the server while it is unreachable so the circuit closes as soon as it is back
+server_probe = ServerProbeThread()
+server_probe.start()
+
+# keeps the directory cache inside its size budget
+cache_eviction = CacheEvictionThread()
+cache_eviction.start()
+
+# loads the directories the user is likely to open next
+prefetch_thread = PrefetchThread()
+prefetch_thread.start()
+
 # set up all the services
 monitor = Service()
 playback_service = PlaybackService(monitor)
@@ -83,6 +108,7 @@ last_random_movie_update = 0
 skin_checked = False
 skin_check_delay = 20
 user_last_changed = time.time()
+last_network_stats_flush = time.time()
 
 # start the library update monitor
 library_change_monitor = LibraryChangeMonitor()
@@ -134,10 +160,14 @@ while not kodi_monitor.abortRequested():
         else:
             screen_saver_active = xbmc.getCondVisibility("System.ScreenSaverActive")
 
-            if not screen_saver_active:
+            # skip the background server work while the server is unreachable
+            server_down = circuit_breaker.is_open()
+
+            if not screen_saver_active and not server_down:
                 user_changed = False
                 if prev_user_id != home_window.get_property("userid"):
                     log.debug("user_change_detected")
+                    clear_auth_header_cache()
                     prev_user_id = home_window.get_property("userid")
                     user_changed = True
                     user_last_changed = time.time()
@@ -164,12 +194,17 @@ while not kodi_monitor.abortRequested():
                     skin_checked = True
                     # check_skin_installed()
 
-            elif screen_saver_active:
+            elif screen_saver_active and not server_down:
                 last_random_movie_update = time.time() - (random_movie_list_interval - 15)
                 if background_interval != 0 and ((time.time() - last_background_update) > background_interval):
                     last_background_update = time.time()
                     set_background_image(False)
 
+        if (time.time() - last_network_stats_flush) > 60:
+            last_network_stats_flush = time.time()
+            network_stats.flush()
+            traffic_capture.flush()
+
     except Exception as error:
         log.error("Exception in Playback Monitor: {0}", error)
         log.error("{0}", traceback.format_exc())
@@ -177,6 +212,9 @@ while not kodi_monitor.abortRequested():
     kodi_monitor.waitForAbort(1)
 
 image_server.stop()
+server_probe.stop()
+cache_eviction.stop()
+prefetch_thread.stop()
 
 # call stop on the library update monitor
 library_change_monitor.stop()
@@ -192,6 +230,14 @@ if context_monitor:
 # stop the WebSocket Client
 websocket_client.stop_client()
 
+# close any kept alive server connections
+connection_pool.log_stats(force=True)
+response_cache.log_stats(force=True)
+request_single_flight.log_stats(force=True)
+network_stats.flush()
+traffic_capture.flush()
+connection_pool.close_all()
+
 # clear user and token when loggin off
 home_window.clear_property("userid")
 home_window.clear_property("AccessToken")
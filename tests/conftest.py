@@ -0,0 +1,14 @@
+# Gnu General Public License - see LICENSE.TXT
+#
+# Runs the add-on modules against the headless Kodi stubs of the benchmark suite.
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.abspath(os.path.join(TESTS_DIR, ".."))
+STUBS_DIR = os.path.join(ADDON_DIR, "scripts", "benchmarks", "kodi_stubs")
+
+for path in [ADDON_DIR, STUBS_DIR]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,135 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+
+import pytest
+import xbmcaddon
+
+from resources.lib import downloadutils
+from resources.lib.downloadutils import DownloadUtils, auth_header_cache
+from resources.lib.kodi_utils import HomeWindow
+from resources.lib.settings_snapshot import invalidate_settings
+
+USER_ID = "user1"
+ITEMS_URL = "{server}/emby/Users/{userid}/Items?format=json"
+
+
+class FakeResponse:
+
+    def __init__(self, status, body=b""):
+        self.status = status
+        self.reason = "OK" if status == 200 else "Unauthorized"
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def getheader(self, name, default=None):
+        return default
+
+    def getheaders(self):
+        return []
+
+
+class FakeServer:
+    # answers in place of the connection pool, tokens in valid_tokens are accepted
+    # and every login hands out the next token of login_tokens
+
+    def __init__(self, valid_tokens, login_tokens):
+        self.valid_tokens = valid_tokens
+        self.login_tokens = login_tokens
+        self.accept_logins = True
+        self.on_request = None
+        self.requests = []
+
+    def request(self, pool_key, timeout, method, url_path, body, headers):
+        token = headers.get("X-MediaBrowser-Token")
+        self.requests.append((method, url_path.split("?")[0], token))
+        if self.on_request is not None:
+            self.on_request()
+        if "/AuthenticateByName" in url_path:
+            token = self.login_tokens.pop(0)
+            if self.accept_logins:
+                self.valid_tokens.append(token)
+            body = {"AccessToken": token, "User": {"Id": USER_ID}}
+            return None, FakeResponse(200, json.dumps(body).encode("utf-8"))
+        if "/Sessions/" in url_path:
+            return None, FakeResponse(204)
+        if token not in self.valid_tokens:
+            return None, FakeResponse(401)
+        return None, FakeResponse(200, b'{"Items": []}')
+
+    def get_item_requests(self):
+        return [(method, path, token) for method, path, token in self.requests if path.endswith("/Items")]
+
+    def get_logins(self):
+        return [path for method, path, token in self.requests if path.endswith("/AuthenticateByName")]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    settings = {"protocol": "0", "ipaddress": "127.0.0.1", "port": "8096", "server_addresses": "",
+                "username": "user", "password": "pass", "save_user_to_settings": "true", "suppress_errors": "false"}
+    for setting_id, value in settings.items():
+        monkeypatch.setitem(xbmcaddon.settings, setting_id, value)
+    invalidate_settings()
+    auth_header_cache.clear()
+    window = HomeWindow()
+    window.set_property("userid", USER_ID)
+    window.set_property("userimage", "DefaultUser.png")
+    window.set_property("AccessToken", "old")
+
+    fake_server = FakeServer(["old"], ["new"])
+    monkeypatch.setattr(downloadutils.connection_pool, "request", fake_server.request)
+    monkeypatch.setattr(downloadutils.connection_pool, "release_connection", lambda conn, response: None)
+    monkeypatch.setattr(downloadutils.connection_pool, "discard_connection", lambda conn: None)
+    yield fake_server
+    auth_header_cache.clear()
+    window.clear_property("AccessToken")
+    invalidate_settings()
+
+
+def test_memoized_header_is_used(server):
+    download_utils = DownloadUtils()
+    download_utils.send_request(ITEMS_URL, True, None, "GET", True, None, None)
+    download_utils.send_request(ITEMS_URL, True, None, "GET", True, None, None)
+    assert server.get_item_requests() == [("GET", "/emby/Users/user1/Items", "old")] * 2
+    assert len(auth_header_cache) == 1
+
+
+def test_rejected_token_logs_in_again_and_retries_once(server):
+    server.valid_tokens.remove("old")
+    data = DownloadUtils().send_request(ITEMS_URL, True, None, "GET", True, None, None)
+
+    assert data == b'{"Items": []}'
+    assert server.get_item_requests() == [("GET", "/emby/Users/user1/Items", "old"),
+                                          ("GET", "/emby/Users/user1/Items", "new")]
+    assert server.get_logins() == ["/emby/Users/AuthenticateByName"]
+    assert HomeWindow().get_property("AccessToken") == "new"
+    # the saved password is only dropped when the new login is rejected too
+    assert xbmcaddon.settings["password"] == "pass"
+
+
+def test_token_renewed_by_the_other_process_is_kept(server):
+    server.valid_tokens[:] = ["other"]
+
+    def other_process_logs_in():
+        # while our request with the old token was on its way
+        HomeWindow().set_property("AccessToken", "other")
+        server.on_request = None
+    server.on_request = other_process_logs_in
+
+    data = DownloadUtils().send_request(ITEMS_URL, True, None, "GET", True, None, None)
+    assert data == b'{"Items": []}'
+    assert server.get_logins() == []
+    assert [token for method, path, token in server.get_item_requests()] == ["old", "other"]
+
+
+def test_second_401_is_not_retried(server):
+    server.valid_tokens.remove("old")
+    server.accept_logins = False
+
+    data = DownloadUtils().send_request(ITEMS_URL, True, None, "GET", True, None, None)
+    assert data == "null"
+    assert len(server.get_item_requests()) == 2
+    assert server.get_logins() == ["/emby/Users/AuthenticateByName"]
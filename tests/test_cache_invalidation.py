@@ -0,0 +1,199 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+
+import pytest
+import xbmc
+
+from resources.lib import cache_invalidation
+from resources.lib import library_change_monitor as library_change_monitor_module
+from resources.lib.cache_invalidation import (apply_user_data_changes, invalidate_library_changes, is_kept_in_sync,
+                                              set_websocket_connected)
+from resources.lib.cache_store import CacheStore
+from resources.lib.datamanager import CacheItem
+from resources.lib.item_functions import ItemDetails
+from resources.lib.kodi_utils import HomeWindow
+from resources.lib.library_change_monitor import LibraryChangeMonitor
+from resources.lib.websocket_client import WebSocketClient
+
+USER_ID = "user1"
+FOLDER_ID = "0123456789abcdef"
+OTHER_FOLDER_ID = "fedcba9876543210"
+FOLDER_URL = "{server}/emby/Users/{userid}/Items?ParentId=%s&SortBy=SortName&format=json"
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    cache_store = CacheStore()
+    cache_store.db_file = str(tmp_path / "cache.db")
+    monkeypatch.setattr(cache_invalidation, "cache_store", cache_store)
+    home_window = HomeWindow()
+    home_window.set_property("userid", USER_ID)
+    home_window.clear_property("last_content_url")
+    home_window.clear_property("websocket_connected_at")
+    del xbmc.builtins[:]
+    return cache_store
+
+
+def save_list(cache_store, url_hash, items_url, item_ids, last_sync=None):
+    cache_item = CacheItem()
+    cache_item.url_hash = url_hash
+    cache_item.user_id = USER_ID
+    cache_item.items_url = items_url
+    cache_item.last_sync = last_sync
+    cache_item.item_list = []
+    for item_id in item_ids:
+        item_details = ItemDetails()
+        item_details.id = item_id
+        item_details.name = "Item " + item_id
+        cache_item.item_list.append(item_details)
+    cache_store.save(cache_item)
+    return cache_item
+
+
+def make_user_data(item_id, played=True, favorite=False, position=0):
+    return {"ItemId": item_id, "Played": played, "IsFavorite": favorite, "PlaybackPositionTicks": position}
+
+
+def test_user_data_is_patched_into_the_lists_holding_the_item(store):
+    save_list(store, "folder", FOLDER_URL % FOLDER_ID, ["a", "b"])
+    save_list(store, "other", FOLDER_URL % OTHER_FOLDER_ID, ["c"])
+
+    updated = apply_user_data_changes(USER_ID, [make_user_data("b", favorite=True, position=600000000)])
+    assert updated == 1
+    item_b = store.load("folder", USER_ID).item_list[1]
+    assert item_b.play_count == 1
+    assert item_b.favorite == "true"
+    assert item_b.resume_time == 60
+    # the play count is a visible fingerprint field
+    assert store.load("folder", USER_ID).item_fingerprints["b"][0][1] == 1
+    # not the list on screen
+    assert xbmc.builtins == []
+
+
+def test_list_on_screen_is_refreshed(store):
+    save_list(store, "folder", FOLDER_URL % FOLDER_ID, ["a"])
+    HomeWindow().set_property("last_content_url", FOLDER_URL % FOLDER_ID)
+    apply_user_data_changes(USER_ID, [make_user_data("a")])
+    assert xbmc.builtins == ["Container.Refresh"]
+
+
+def test_lists_filtered_or_sorted_by_user_data_are_dropped(store):
+    save_list(store, "unplayed", FOLDER_URL % FOLDER_ID + "&IsPlayed=false", ["a"])
+    save_list(store, "recent", (FOLDER_URL % FOLDER_ID).replace("SortName", "DatePlayed"), ["a"])
+    assert apply_user_data_changes(USER_ID, [make_user_data("a")]) == 0
+    assert not store.exists("unplayed", USER_ID)
+    assert not store.exists("recent", USER_ID)
+
+
+def test_user_data_of_other_users_is_ignored(store):
+    save_list(store, "folder", FOLDER_URL % FOLDER_ID, ["a"])
+    assert apply_user_data_changes("other user", [make_user_data("a")]) == 0
+    assert store.load("folder", USER_ID).item_list[0].play_count == 0
+
+
+def test_library_change_drops_only_the_touched_lists(store):
+    save_list(store, "folder", FOLDER_URL % FOLDER_ID, ["a"])
+    save_list(store, "other", FOLDER_URL % OTHER_FOLDER_ID, ["c"])
+    save_list(store, "holds_c", "{server}/emby/Users/{userid}/Items?Recursive=true&format=json", ["b", "c"])
+
+    assert invalidate_library_changes(USER_ID, {"ItemsUpdated": ["c"]}) == 2
+    assert store.exists("folder", USER_ID)
+    assert invalidate_library_changes(USER_ID, {"FoldersAddedTo": [FOLDER_ID]}) == 1
+    assert not store.exists("folder", USER_ID)
+
+
+def test_kept_in_sync_only_while_connected_since_the_last_sync(store):
+    cache_item = save_list(store, "folder", FOLDER_URL % FOLDER_ID, ["a"], last_sync=1e12)
+    assert not is_kept_in_sync(cache_item)
+
+    set_websocket_connected(True)
+    assert is_kept_in_sync(cache_item)
+    # a list without a folder in the url can not be dropped by LibraryChanged
+    no_folder = save_list(store, "no_folder", "{server}/emby/Users/{userid}/Items?format=json", ["a"], last_sync=1e12)
+    assert not is_kept_in_sync(no_folder)
+    # synced before the connection, messages might have been missed
+    cache_item.last_sync = 1.0
+    assert not is_kept_in_sync(cache_item)
+
+    set_websocket_connected(False)
+    cache_item.last_sync = 1e12
+    assert not is_kept_in_sync(cache_item)
+
+
+def test_items_added_resyncs_every_list(store):
+    cache_item = save_list(store, "folder", FOLDER_URL % FOLDER_ID, ["a"], last_sync=1.0)
+    invalidate_library_changes(USER_ID, {"ItemsAdded": ["new"]})
+    # the new item's folder might not be listed, everything synced before now is checked again
+    assert not is_kept_in_sync(cache_item)
+    assert store.exists("folder", USER_ID)
+
+
+class FakeLibraryMonitor:
+
+    def __init__(self):
+        self.checks = 0
+        self.reloads = 0
+
+    def check_for_updates(self):
+        self.checks += 1
+
+    def reload_widgets(self):
+        self.reloads += 1
+
+
+def send_message(library_monitor, message_type, data):
+    client = WebSocketClient(library_monitor)
+    client.on_message(json.dumps({"MessageType": message_type, "Data": data}))
+
+
+def test_websocket_messages_update_the_cache(store):
+    save_list(store, "folder", FOLDER_URL % FOLDER_ID, ["a"])
+    library_monitor = FakeLibraryMonitor()
+
+    send_message(library_monitor, "UserDataChanged", {"UserId": USER_ID, "UserDataList": [make_user_data("a")]})
+    assert store.load("folder", USER_ID).item_list[0].play_count == 1
+    send_message(library_monitor, "UserDataChanged", {"UserId": "other user", "UserDataList": []})
+
+    send_message(library_monitor, "LibraryChanged", {"ItemsRemoved": ["a"]})
+    assert not store.exists("folder", USER_ID)
+    # no server recheck for messages the cache handled
+    assert library_monitor.checks == 0
+    assert library_monitor.reloads == 2
+
+
+def test_failed_cache_update_falls_back_to_the_recheck(store, monkeypatch):
+    def fail(user_id, data):
+        raise IOError("database is locked")
+    monkeypatch.setattr("resources.lib.websocket_client.invalidate_library_changes", fail)
+    library_monitor = FakeLibraryMonitor()
+
+    send_message(library_monitor, "LibraryChanged", {"ItemsRemoved": ["a"]})
+    assert library_monitor.checks == 1
+    assert HomeWindow().get_property("websocket_connected_at")
+
+
+def test_widgets_reload_once_the_messages_stop(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(library_change_monitor_module.time, "time", lambda: now[0])
+    library_monitor = LibraryChangeMonitor()
+    assert not library_monitor.is_widget_reload_due(now[0])
+
+    # a library scan, a message every few seconds
+    for index in range(5):
+        library_monitor.reload_widgets()
+        now[0] += 3
+        assert not library_monitor.is_widget_reload_due(now[0])
+    now[0] += LibraryChangeMonitor.widget_reload_quiet_time
+    assert library_monitor.is_widget_reload_due(now[0])
+
+
+def test_widgets_reload_while_the_messages_keep_coming(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(library_change_monitor_module.time, "time", lambda: now[0])
+    library_monitor = LibraryChangeMonitor()
+    while now[0] - 1000.0 < LibraryChangeMonitor.widget_reload_max_wait:
+        assert not library_monitor.is_widget_reload_due(now[0])
+        library_monitor.reload_widgets()
+        now[0] += 3
+    assert library_monitor.is_widget_reload_due(now[0])
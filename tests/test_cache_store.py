@@ -0,0 +1,152 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import os
+import pickle
+import sqlite3
+
+import pytest
+
+from resources.lib.cache_store import CacheStore
+from resources.lib.datamanager import CacheItem
+from resources.lib.item_functions import ItemDetails
+
+USER_ID = "user1"
+
+
+@pytest.fixture
+def store(tmp_path):
+    cache_store = CacheStore()
+    cache_store.addon_dir = str(tmp_path)
+    cache_store.db_file = str(tmp_path / "cache.db")
+    return cache_store
+
+
+def make_cache_item(url_hash, item_ids=(), last_used=100.0, items_url=None):
+    cache_item = CacheItem()
+    cache_item.url_hash = url_hash
+    cache_item.user_id = USER_ID
+    cache_item.items_url = items_url or "{server}/emby/Users/{userid}/Items?format=json"
+    cache_item.date_saved = last_used
+    cache_item.date_last_used = last_used
+    cache_item.item_list = []
+    for item_id in item_ids:
+        item_details = ItemDetails()
+        item_details.id = item_id
+        cache_item.item_list.append(item_details)
+    return cache_item
+
+
+def test_save_and_load(store):
+    store.save(make_cache_item("a", ["i1", "i2"]))
+    cache_item = store.load("a", USER_ID)
+    assert [item.id for item in cache_item.item_list] == ["i1", "i2"]
+    assert store.load("a", "other user") is None
+    assert store.exists("a", USER_ID)
+
+
+def test_touch_moves_last_sync_without_saving(store):
+    store.save(make_cache_item("a"))
+    store.touch("a", USER_ID, 200.0, last_sync=150.0)
+    assert store.load("a", USER_ID).last_sync == 150.0
+    # no last_sync keeps the one saved
+    store.touch("a", USER_ID, 300.0)
+    assert store.load("a", USER_ID).last_sync == 150.0
+
+
+def test_index_follows_the_saved_list(store):
+    items_url = "{server}/emby/Users/{userid}/Items?ParentId=0123456789abcdef&format=json"
+    store.save(make_cache_item("a", ["i1", "i2"], items_url=items_url))
+    store.save(make_cache_item("b", ["i2"]))
+    assert store.find_entries(["i2"], USER_ID) == {("a", USER_ID), ("b", USER_ID)}
+    assert store.find_entries(["0123456789abcdef"], USER_ID) == {("a", USER_ID)}
+    assert store.find_entries(["i1"], "other user") == set()
+
+    # saved again without i1, the old index rows go
+    store.save(make_cache_item("a", ["i2"]))
+    assert store.find_entries(["i1"], USER_ID) == set()
+
+    # the trigger drops the index rows of deleted lists
+    store.delete("b", USER_ID)
+    assert store.find_entries(["i2"], USER_ID) == {("a", USER_ID)}
+
+
+def test_find_entries_past_the_parameter_limit(store):
+    store.save(make_cache_item("a", ["i%s" % index for index in range(1200)]))
+    assert store.find_entries(["i%s" % index for index in range(1000, 1300)], USER_ID) == {("a", USER_ID)}
+
+
+def test_evict_drops_least_recently_used_first(store):
+    for index in range(5):
+        store.save(make_cache_item("e%s" % index, ["i%s" % index], last_used=100.0 + index))
+    store.touch("e0", USER_ID, 200.0)
+
+    assert store.evict(max_bytes=10 * 1024 * 1024, max_entries=3, batch_size=1) == 2
+    assert store.get_usage()[0] == 3
+    assert store.exists("e0", USER_ID)
+    assert not store.exists("e1", USER_ID)
+    assert not store.exists("e2", USER_ID)
+    assert store.find_entries(["i1", "i2"], USER_ID) == set()
+
+
+def test_evict_to_the_size_budget(store):
+    for index in range(4):
+        store.save(make_cache_item("e%s" % index, last_used=100.0 + index))
+    count, total_size = store.get_usage()
+    entry_size = total_size // count
+
+    store.evict(max_bytes=entry_size * 2, max_entries=100)
+    assert store.get_usage() == (2, entry_size * 2)
+    assert store.exists("e3", USER_ID)
+
+
+def test_evict_can_be_stopped(store):
+    for index in range(4):
+        store.save(make_cache_item("e%s" % index))
+    assert store.evict(max_bytes=0, max_entries=0, batch_size=1, should_stop=lambda: True) == 0
+    assert store.get_usage()[0] == 4
+
+
+def test_delete_unused_and_clear(store):
+    store.save(make_cache_item("old", ["i1"], last_used=1.0))
+    store.save(make_cache_item("new", ["i2"], last_used=1e12))
+    assert store.delete_unused(3600) == 1
+    assert not store.exists("old", USER_ID)
+    assert store.clear() == 1
+    assert store.get_usage() == (0, 0)
+    assert store.find_entries(["i2"], USER_ID) == set()
+
+
+def test_schema_update_adds_last_sync(store):
+    # a database saved before last_sync was added
+    conn = sqlite3.connect(store.db_file)
+    conn.execute("CREATE TABLE cache_items (url_hash TEXT NOT NULL, user_id TEXT NOT NULL, items_url TEXT, "
+                 "date_saved REAL, date_last_used REAL, size INTEGER, data BLOB, PRIMARY KEY (url_hash, user_id))")
+    data = pickle.dumps(make_cache_item("a"))
+    conn.execute("INSERT INTO cache_items VALUES ('a', ?, '', 1.0, 1.0, ?, ?)", (USER_ID, len(data), data))
+    conn.commit()
+    conn.close()
+
+    assert store.load("a", USER_ID).url_hash == "a"
+    store.touch("a", USER_ID, 2.0, last_sync=5.0)
+    assert store.load("a", USER_ID).last_sync == 5.0
+
+
+def test_migrate_pickle_files(store, tmp_path):
+    cache_item = make_cache_item(None, ["i1"])
+    cache_item.user_id = None
+    with open(os.path.join(str(tmp_path), "cache_abc.pickle"), "wb") as handle:
+        pickle.dump(cache_item, handle)
+    with open(os.path.join(str(tmp_path), "cache_abc.pickle.lock"), "wb") as handle:
+        handle.write(b"")
+    with open(os.path.join(str(tmp_path), "cache_bad.pickle"), "wb") as handle:
+        handle.write(b"not a pickle")
+
+    assert store.migrate_pickle_files() == 1
+    assert store.load("abc", "").item_list[0].id == "i1"
+    assert not [filename for filename in os.listdir(str(tmp_path)) if filename.startswith("cache_")]
+
+
+def test_connection_is_kept_per_thread(store):
+    assert store.connect() is store.connect()
+    assert store.connect().execute("PRAGMA synchronous").fetchone()[0] == 1
+    assert store.connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
@@ -0,0 +1,86 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import pytest
+
+from resources.lib import circuit_breaker as circuit_breaker_module
+from resources.lib.circuit_breaker import CircuitBreaker, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+
+SERVER = "127.0.0.1:8096"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def breaker(clock):
+    circuit_breaker = CircuitBreaker()
+    circuit_breaker.home_window.clear_property("server_circuit")
+    circuit_breaker.home_window.clear_property("server_circuit_state")
+    return circuit_breaker
+
+
+def open_circuit(breaker):
+    for index in range(CircuitBreaker.failure_threshold):
+        breaker.record_failure(SERVER)
+
+
+def test_opens_after_failures_in_a_row(breaker):
+    for index in range(CircuitBreaker.failure_threshold - 1):
+        breaker.record_failure(SERVER)
+        assert breaker.allow_request(SERVER)
+    breaker.record_failure(SERVER)
+    assert breaker.get_state(SERVER) == STATE_OPEN
+    assert breaker.is_open()
+    assert not breaker.allow_request(SERVER)
+
+
+def test_success_resets_the_failure_count(breaker):
+    for index in range(CircuitBreaker.failure_threshold - 1):
+        breaker.record_failure(SERVER)
+    breaker.record_success(SERVER)
+    breaker.record_failure(SERVER)
+    assert breaker.get_state(SERVER) == STATE_CLOSED
+
+
+def test_one_trial_request_after_the_cooldown(breaker, clock):
+    open_circuit(breaker)
+    server, retry_at = breaker.get_retry_at()
+    assert server == SERVER
+    assert clock[0] + CircuitBreaker.base_cooldown / 2.0 <= retry_at <= clock[0] + CircuitBreaker.base_cooldown
+
+    clock[0] = retry_at
+    assert breaker.allow_request(SERVER)
+    assert breaker.get_state(SERVER) == STATE_HALF_OPEN
+    # the others keep failing fast while the trial runs
+    assert not breaker.allow_request(SERVER)
+
+    breaker.record_success(SERVER)
+    assert breaker.get_state(SERVER) == STATE_CLOSED
+    assert not breaker.is_open()
+    assert breaker.allow_request(SERVER)
+
+
+def test_failed_trial_backs_off_longer(breaker, clock):
+    open_circuit(breaker)
+    for attempt in range(2, 12):
+        clock[0] = breaker.get_retry_at()[1]
+        assert breaker.allow_request(SERVER)
+        breaker.record_failure(SERVER)
+        assert breaker.get_state(SERVER) == STATE_OPEN
+        cooldown = min(CircuitBreaker.max_cooldown, CircuitBreaker.base_cooldown * 2 ** (attempt - 1))
+        assert clock[0] + cooldown / 2.0 <= breaker.get_retry_at()[1] <= clock[0] + cooldown
+
+
+def test_state_is_kept_per_server(breaker):
+    open_circuit(breaker)
+    assert breaker.allow_request("192.168.0.10:8096")
+    assert breaker.get_state("192.168.0.10:8096") == STATE_CLOSED
+
+
+def test_state_is_shared_through_the_home_window(breaker):
+    open_circuit(breaker)
+    assert not CircuitBreaker().allow_request(SERVER)
@@ -0,0 +1,139 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from resources.lib.connection_pool import ConnectionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    # answers on kept alive connections, drops the next server.drop_count requests without an answer
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        return
+
+    def answer(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests.append((self.command, self.client_address[1]))
+            drop = self.server.drop_count > 0
+            if drop:
+                self.server.drop_count -= 1
+        if drop:
+            self.close_connection = True
+            return
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = answer
+    do_POST = answer
+
+
+@pytest.fixture
+def server():
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    http_server.daemon_threads = True
+    http_server.lock = threading.Lock()
+    http_server.requests = []
+    http_server.drop_count = 0
+    thread = threading.Thread(target=http_server.serve_forever, kwargs={"poll_interval": 0.05})
+    thread.daemon = True
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+
+
+@pytest.fixture
+def pool():
+    connection_pool = ConnectionPool()
+    yield connection_pool
+    connection_pool.close_all()
+
+
+def get_pool_key(server):
+    return False, False, "127.0.0.1:%s" % server.server_address[1]
+
+
+def send(pool, server, method="GET"):
+    body = b"x" if method == "POST" else None
+    conn, response = pool.request(get_pool_key(server), 5, method, "/emby/Items", body, {})
+    assert response.read() == b"ok"
+    pool.release_connection(conn, response)
+    return conn
+
+
+def test_connection_is_reused(pool, server):
+    first = send(pool, server)
+    second = send(pool, server)
+    assert first is second
+    assert pool.hits == 1 and pool.misses == 1
+    assert len(set([port for method, port in server.requests])) == 1
+
+
+def test_stale_get_is_retried_on_a_new_connection(pool, server):
+    send(pool, server)
+    server.drop_count = 1
+    conn = send(pool, server)
+    assert conn.retries == 1
+    assert pool.retries == 1
+    assert len(server.requests) == 3
+
+
+def test_stale_post_that_was_sent_is_not_retried(pool, server):
+    send(pool, server)
+    server.drop_count = 1
+    with pytest.raises(http.client.RemoteDisconnected):
+        send(pool, server, method="POST")
+    assert pool.retries == 0
+    assert [method for method, port in server.requests] == ["GET", "POST"]
+
+
+def test_failure_on_a_new_connection_is_not_retried(pool, server):
+    server.drop_count = 1
+    with pytest.raises(http.client.RemoteDisconnected):
+        send(pool, server)
+    assert pool.retries == 0
+    assert len(server.requests) == 1
+
+
+def test_connection_closed_while_idle_is_not_reused(pool, server):
+    first = send(pool, server)
+    # the server closes the kept alive socket
+    server.drop_count = 1
+    first.sock.sendall(b"GET /emby/Items HTTP/1.1\r\nHost: x\r\n\r\n")
+    while len(server.requests) < 2:
+        threading.Event().wait(0.01)
+    threading.Event().wait(0.1)
+
+    second = send(pool, server)
+    assert second is not first
+    assert second.retries == 0
+    assert pool.discarded == 1
+
+
+def test_only_fully_read_responses_go_back_to_the_pool(pool, server):
+    conn, response = pool.request(get_pool_key(server), 5, "GET", "/emby/Items", None, {})
+    pool.release_connection(conn, response)
+    assert pool.idle_count == 0
+    assert conn.sock is None
+
+
+def test_idle_connections_are_limited_per_host(pool, server):
+    pool.max_idle_per_host = 1
+    responses = [pool.request(get_pool_key(server), 5, "GET", "/emby/Items", None, {}) for index in range(2)]
+    for conn, response in responses:
+        response.read()
+        pool.release_connection(conn, response)
+    assert pool.idle_count == 1
+    assert pool.discarded == 1
@@ -0,0 +1,153 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+
+import pytest
+import xbmc
+
+from resources.lib import datamanager
+from resources.lib.cache_store import CacheStore
+from resources.lib.datamanager import CacheItem, CacheManagerThread, DataManager
+from resources.lib.item_functions import NoneDict, build_gui_options, extract_item_info
+from resources.lib.kodi_utils import HomeWindow
+
+SERVER = "http://127.0.0.1:8096"
+USER_ID = "user1"
+ITEMS_URL = "{server}/emby/Users/{userid}/Items?ParentId=p1&SortBy=SortName&Fields=Etag&format=json"
+
+
+def make_raw_item(item_id, play_count=0):
+    raw = {"Id": item_id, "Name": "Item " + item_id, "Type": "Movie", "Etag": "e" + item_id,
+           "UserData": {"PlayCount": play_count, "Played": play_count > 0, "IsFavorite": False}}
+    return json.loads(json.dumps(raw), object_hook=NoneDict)
+
+
+def make_ids_results(item_ids):
+    return {"Items": [{"Id": item_id} for item_id in item_ids], "TotalRecordCount": len(item_ids)}
+
+
+class FakeServer:
+    # answers get_contents and get_content in place of DataManager, by what the url asks for
+
+    def __init__(self, item_ids, changed_items):
+        self.item_ids = item_ids
+        self.changed_items = changed_items
+        self.urls = []
+
+    def get_contents(self, urls, timeout=None):
+        self.urls.extend(urls)
+        results = []
+        for url in urls:
+            if "MinDateLastSavedForUser=" in url:
+                results.append({"Items": self.changed_items, "TotalRecordCount": len(self.changed_items)})
+            else:
+                results.append(make_ids_results(self.item_ids))
+        return results
+
+    def get_content(self, url):
+        self.urls.append(url)
+        items = [make_raw_item(item_id) for item_id in self.item_ids]
+        return {"Items": items, "TotalRecordCount": len(items)}
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    cache_store = CacheStore()
+    cache_store.db_file = str(tmp_path / "cache.db")
+    monkeypatch.setattr(datamanager, "cache_store", cache_store)
+    HomeWindow().clear_property("websocket_connected_at")
+    return cache_store
+
+
+def make_thread(item_ids, items_url=ITEMS_URL, total_records=None):
+    gui_options = build_gui_options(SERVER)
+    cache_item = CacheItem()
+    cache_item.url_hash = "h1"
+    cache_item.user_id = USER_ID
+    cache_item.items_url = items_url
+    cache_item.item_list = [extract_item_info(make_raw_item(item_id), gui_options) for item_id in item_ids]
+    cache_item.item_fingerprints = CacheManagerThread.get_fingerprints(cache_item.item_list)
+    cache_item.total_records = len(item_ids) if total_records is None else total_records
+    cache_item.last_sync = 1000.0
+    cache_item.date_saved = 1000.0
+    thread = CacheManagerThread()
+    thread.cached_item = cache_item
+    thread.gui_options = gui_options
+    return thread
+
+
+def use_server(monkeypatch, fake_server):
+    monkeypatch.setattr(DataManager, "get_contents", lambda self, urls, timeout=None: fake_server.get_contents(urls))
+    monkeypatch.setattr(DataManager, "get_content", lambda self, url: fake_server.get_content(url))
+
+
+def test_changed_items_are_merged_in_place(monkeypatch, store):
+    thread = make_thread(["a", "b", "c"])
+    cached_items = list(thread.cached_item.item_list)
+    fake_server = FakeServer(["a", "b", "c"], [make_raw_item("b", play_count=1)])
+    use_server(monkeypatch, fake_server)
+
+    loaded_items = thread.load_changed_items()
+    assert [item.id for item in loaded_items] == ["a", "b", "c"]
+    assert loaded_items[0] is cached_items[0] and loaded_items[2] is cached_items[2]
+    assert loaded_items[1].play_count == 1
+
+    changed_url, ids_url = fake_server.urls
+    # the last sync less the clock margin
+    assert changed_url == ITEMS_URL + "&MinDateLastSavedForUser=1970-01-01T00:11:40Z"
+    assert "Fields=" not in ids_url and "EnableUserData=false" in ids_url
+
+
+@pytest.mark.parametrize("server_ids, changed_ids", [
+    (["a", "c", "b"], []),
+    (["a", "b", "c", "d"], ["d"]),
+    (["a", "b"], []),
+    (["a", "b", "c"], ["d"]),
+], ids=["reordered", "added", "removed", "unknown changed item"])
+def test_list_changes_need_a_full_reload(monkeypatch, store, server_ids, changed_ids):
+    thread = make_thread(["a", "b", "c"])
+    use_server(monkeypatch, FakeServer(server_ids, [make_raw_item(item_id) for item_id in changed_ids]))
+    assert thread.load_changed_items() is None
+
+
+@pytest.mark.parametrize("items_url, total_records", [
+    (ITEMS_URL + "&StartIndex=0&Limit=2", 3),
+    (ITEMS_URL, 10),
+    (ITEMS_URL.replace("SortBy=SortName", "SortBy=DatePlayed"), 3),
+    ("{server}/emby/Shows/NextUp?UserId={userid}&format=json", 3),
+], ids=["paged", "part of a bigger list", "play state sort", "other endpoint"])
+def test_lists_that_can_not_be_merged(items_url, total_records):
+    assert not make_thread(["a", "b", "c"], items_url, total_records).can_load_changes()
+
+
+def test_server_without_an_answer_needs_a_full_reload(monkeypatch, store):
+    thread = make_thread(["a", "b", "c"])
+    monkeypatch.setattr(DataManager, "get_contents", lambda self, urls, timeout=None: [None, None])
+    assert thread.load_changed_items() is None
+
+
+def test_run_saves_the_merged_list_and_refreshes(monkeypatch, store):
+    thread = make_thread(["a", "b", "c"])
+    fake_server = FakeServer(["a", "b", "c"], [make_raw_item("c", play_count=1)])
+    use_server(monkeypatch, fake_server)
+    del xbmc.builtins[:]
+
+    thread.run()
+    # no full list download
+    assert len(fake_server.urls) == 2
+    saved = store.load("h1", USER_ID)
+    assert [item.play_count for item in saved.item_list] == [0, 0, 1]
+    assert saved.last_sync > 1000.0
+    assert xbmc.builtins == ["Container.Refresh"]
+
+
+def test_run_falls_back_to_a_full_reload(monkeypatch, store):
+    thread = make_thread(["a", "b", "c"])
+    fake_server = FakeServer(["c", "b", "a"], [])
+    use_server(monkeypatch, fake_server)
+    del xbmc.builtins[:]
+
+    thread.run()
+    assert fake_server.urls[-1] == ITEMS_URL
+    assert [item.id for item in store.load("h1", USER_ID).item_list] == ["c", "b", "a"]
+    assert xbmc.builtins == ["Container.Refresh"]
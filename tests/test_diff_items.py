@@ -0,0 +1,90 @@
+# Gnu General Public License - see LICENSE.TXT
+
+from resources.lib.datamanager import CacheItem, CacheManagerThread
+from resources.lib.item_functions import ItemDetails
+
+
+def make_item(item_id, name=None, play_count=0, favorite="false"):
+    item_details = ItemDetails()
+    item_details.id = item_id
+    item_details.name = name or "Item " + item_id
+    item_details.play_count = play_count
+    item_details.favorite = favorite
+    return item_details
+
+
+def make_thread(cached_items, with_fingerprints=True):
+    cache_item = CacheItem()
+    cache_item.item_list = cached_items
+    if with_fingerprints:
+        cache_item.item_fingerprints = CacheManagerThread.get_fingerprints(cached_items)
+    thread = CacheManagerThread()
+    thread.cached_item = cache_item
+    return thread
+
+
+def test_unchanged_list_keeps_cached_items():
+    cached = [make_item("a"), make_item("b")]
+    items, fingerprints, stats, needs_refresh = make_thread(cached).diff_items([make_item("a"), make_item("b")])
+    assert needs_refresh is False
+    assert items[0] is cached[0] and items[1] is cached[1]
+    assert stats == {"added": 0, "removed": 0, "changed": 0, "hidden_changed": 0, "reordered": False}
+
+
+def test_visible_change_needs_refresh():
+    cached = [make_item("a"), make_item("b")]
+    loaded = [make_item("a"), make_item("b", play_count=1)]
+    items, fingerprints, stats, needs_refresh = make_thread(cached).diff_items(loaded)
+    assert needs_refresh is True
+    assert stats["changed"] == 1
+    assert items[0] is cached[0]
+    assert items[1] is loaded[1]
+
+
+def test_hidden_change_is_patched_without_refresh():
+    cached = [make_item("a"), make_item("b")]
+    loaded = [make_item("a"), make_item("b", favorite="true")]
+    items, fingerprints, stats, needs_refresh = make_thread(cached).diff_items(loaded)
+    assert needs_refresh is False
+    assert stats["hidden_changed"] == 1
+    assert items[1] is loaded[1]
+    assert fingerprints == CacheManagerThread.get_fingerprints(loaded)
+
+
+def test_added_and_removed_items():
+    cached = [make_item("a"), make_item("b")]
+    loaded = [make_item("a"), make_item("c")]
+    items, fingerprints, stats, needs_refresh = make_thread(cached).diff_items(loaded)
+    assert needs_refresh is True
+    assert stats["added"] == 1
+    assert stats["removed"] == 1
+    assert [item.id for item in items] == ["a", "c"]
+
+
+def test_reordered_items():
+    cached = [make_item("a"), make_item("b")]
+    items, fingerprints, stats, needs_refresh = make_thread(cached).diff_items([make_item("b"), make_item("a")])
+    assert needs_refresh is True
+    assert stats["reordered"] is True
+    assert [item.id for item in items] == ["b", "a"]
+
+
+def test_fingerprints_worked_out_when_not_saved():
+    cached = [make_item("a"), make_item("b")]
+    thread = make_thread(cached, with_fingerprints=False)
+    items, fingerprints, stats, needs_refresh = thread.diff_items([make_item("a"), make_item("b")])
+    assert needs_refresh is False
+    assert items[0] is cached[0]
+
+
+def test_duplicate_ids_compared_by_position():
+    cached = [make_item("a"), make_item("a", name="Other")]
+    same = [make_item("a"), make_item("a", name="Other")]
+    items, fingerprints, stats, needs_refresh = make_thread(cached).diff_items(same)
+    assert needs_refresh is False
+    assert items is cached
+
+    swapped = [make_item("a", name="Other"), make_item("a")]
+    items, fingerprints, stats, needs_refresh = make_thread(cached).diff_items(swapped)
+    assert needs_refresh is True
+    assert items is swapped
@@ -0,0 +1,79 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+import pickle
+
+import pytest
+
+from resources.lib.item_functions import (ItemDetails, ITEM_DETAILS_FIELDS, ITEM_STATE_VERSION, NoneDict,
+                                          add_gui_item, build_gui_options, extract_item_info, get_list_item_builder)
+
+SERVER = "http://127.0.0.1:8096"
+
+EPISODE = {
+    "Id": "e1", "Name": "Pilot", "Type": "Episode", "SeriesId": "s1", "SeriesName": "Show",
+    "SeasonId": "se1", "ParentIndexNumber": 1, "IndexNumber": 1, "Overview": "The first one",
+    "RunTimeTicks": 27000000000, "LocationType": "FileSystem", "Etag": "etag1",
+    "ImageTags": {"Primary": "p1"}, "SeriesPrimaryImageTag": "sp1",
+    "ParentBackdropItemId": "s1", "ParentBackdropImageTags": ["b1"],
+    "UserData": {"PlayCount": 1, "Played": True, "IsFavorite": True, "PlaybackPositionTicks": 0},
+    "People": [{"Name": "Actor One", "Type": "Actor", "Role": "Lead"}],
+    "MediaStreams": [{"Type": "Video", "Codec": "h264", "Height": 1080, "Width": 1920}],
+}
+
+
+def make_item(item=None):
+    raw = json.loads(json.dumps(item or EPISODE), object_hook=NoneDict)
+    return extract_item_info(raw, build_gui_options(SERVER))
+
+
+def field_values(item_details):
+    return [getattr(item_details, field_name) for field_name, default in ITEM_DETAILS_FIELDS]
+
+
+def test_state_is_versioned_tuple():
+    version, values = make_item().__getstate__()
+    assert version == ITEM_STATE_VERSION
+    assert len(values) == len(ITEM_DETAILS_FIELDS)
+
+
+def test_pickle_round_trip():
+    item_details = make_item()
+    loaded = pickle.loads(pickle.dumps(item_details, protocol=pickle.HIGHEST_PROTOCOL))
+    assert field_values(loaded) == field_values(item_details)
+    assert loaded.art["thumb"].startswith(SERVER + "/emby/Items/e1/Images/Primary/")
+    assert loaded.cast and loaded.media_streams
+
+
+def test_legacy_dict_state_fills_defaults():
+    loaded = ItemDetails.__new__(ItemDetails)
+    loaded.__setstate__({"name": "Old", "id": "x1"})
+    assert loaded.name == "Old"
+    assert loaded.id == "x1"
+    for field_name, default in ITEM_DETAILS_FIELDS:
+        if field_name not in ("name", "id"):
+            assert getattr(loaded, field_name) == default
+
+
+def test_other_state_version_is_rejected():
+    version, values = make_item().__getstate__()
+    loaded = ItemDetails.__new__(ItemDetails)
+    with pytest.raises(ValueError):
+        loaded.__setstate__((version + 1, values))
+
+
+DISPLAY_OPTIONS = {"addCounts": True, "addResumePercent": True, "addSubtitleAvailable": True, "addUserRatings": False}
+
+
+def test_add_gui_item_reuses_the_builder():
+    builder = get_list_item_builder(DISPLAY_OPTIONS)
+    assert get_list_item_builder(dict(DISPLAY_OPTIONS)) is builder
+    url, list_item, folder = add_gui_item("e1", make_item(), DISPLAY_OPTIONS, folder=False)
+    assert url.endswith("?item_id=e1&mode=PLAY")
+    assert get_list_item_builder(DISPLAY_OPTIONS) is builder
+
+    # other options are worked out again
+    other_options = dict(DISPLAY_OPTIONS, addCounts=False)
+    other_builder = get_list_item_builder(other_options)
+    assert other_builder is not builder
+    assert not other_builder.add_counts
@@ -0,0 +1,69 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+
+import pytest
+
+from resources.lib.datamanager import iter_json_items
+
+DOCUMENTS = [
+    b'{"Items": [-2.5, 1.5e3, -1E-2, 0, 12, -0.0], "TotalRecordCount": 6}',
+    '{"Items": [{"Name": "Amélie – 映画 \U0001f3ac"}], "TotalRecordCount": 1}'.encode("utf-8"),
+    b'{"Items": [{"Name": "a \\"quoted\\" \\\\ \\u00e9\\n\\ud83c\\udfac"}]}',
+    b'{"Other": {"Items": [1, 2]}, "Items": [{"People": [{"Id": "1", "Role": null}], '
+    b'"UserData": {"Played": true, "Rating": 7.25}}, [1, [2, {}]], "x"], "Count": -12}',
+    b'{"Items": []}',
+    b'{ "TotalRecordCount" : 2 , "Items" : [ true , false , null ] }',
+    b'[{"Id": "a"}, -3.75e-1, "b", 42]',
+    b'{"TotalRecordCount": 0}',
+    b'null',
+    b'',
+]
+
+
+def expected_items(document):
+    if not document:
+        return []
+    data = json.loads(document.decode("utf-8"))
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        return data.get("Items", [])
+    return []
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_matches_json_loads_in_one_chunk(document):
+    assert list(iter_json_items([document])) == expected_items(document)
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_matches_json_loads_at_every_split(document):
+    expected = expected_items(document)
+    for split in range(len(document) + 1):
+        chunks = [document[:split], document[split:]]
+        assert list(iter_json_items(chunks)) == expected, chunks
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_matches_json_loads_one_byte_at_a_time(document):
+    chunks = [document[index:index + 1] for index in range(len(document))]
+    assert list(iter_json_items(chunks)) == expected_items(document)
+
+
+def test_object_hook_is_applied_to_items():
+    items = list(iter_json_items([b'{"Items": [{"Id": "a"}]}'], object_hook=lambda value: ("hooked", value)))
+    assert items == [("hooked", {"Id": "a"})]
+
+
+def test_items_are_yielded_before_the_response_ends():
+    def chunks():
+        yield b'{"Items": [{"Id": "a"}, '
+        raise AssertionError("read past the first item")
+
+    assert next(iter_json_items(chunks())) == {"Id": "a"}
+
+
+def test_truncated_list_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_items([b'{"Items": [1, 2']))
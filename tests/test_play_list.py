@@ -0,0 +1,26 @@
+# Gnu General Public License - see LICENSE.TXT
+
+from resources.lib import play_utils
+from resources.lib.downloadutils import DownloadUtils
+
+
+def test_failed_item_fetch_shows_the_error(monkeypatch):
+    calls = []
+
+    def download_many(self, urls, suppress=True, timeout=None):
+        calls.append((urls, suppress))
+        return ['{"Id": "a"}', "null"]
+    monkeypatch.setattr(DownloadUtils, "download_many", download_many)
+    monkeypatch.setattr(play_utils, "play_all_files", lambda items, auto_resume, monitor: items)
+
+    assert play_utils.play_list_of_items(["a", "b"], 0, None) is None
+    urls, suppress = calls[0]
+    assert urls == ["{server}/emby/Users/{userid}/Items/a?format=json", "{server}/emby/Users/{userid}/Items/b?format=json"]
+    assert suppress is False
+
+
+def test_all_items_are_played_in_order(monkeypatch):
+    monkeypatch.setattr(DownloadUtils, "download_many",
+                        lambda self, urls, suppress=True, timeout=None: ['{"Id": "a"}', '{"Id": "b"}'])
+    monkeypatch.setattr(play_utils, "play_all_files", lambda items, auto_resume, monitor: items)
+    assert [item["Id"] for item in play_utils.play_list_of_items(["a", "b"], 0, None)] == ["a", "b"]
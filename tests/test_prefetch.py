@@ -0,0 +1,200 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+import threading
+
+import pytest
+import xbmcaddon
+
+from resources.lib import circuit_breaker as circuit_breaker_module
+from resources.lib import datamanager
+from resources.lib.cache_store import CacheStore
+from resources.lib.datamanager import DataManager
+from resources.lib.downloadutils import DownloadUtils
+from resources.lib.item_functions import ItemDetails, NoneDict, build_gui_options
+from resources.lib.kodi_utils import HomeWindow
+from resources.lib.prefetch import (PrefetchThread, PRIORITY_IN_PROGRESS, PRIORITY_NEXT_PAGE, PRIORITY_OTHER,
+                                    PRIORITY_UNWATCHED, add_prefetch_target, get_item_priority,
+                                    get_prefetch_stats, request_prefetch)
+from resources.lib.settings_snapshot import invalidate_settings
+
+SERVER = "http://127.0.0.1:8096"
+USER_ID = "user1"
+
+
+@pytest.fixture
+def home_window(monkeypatch):
+    window = HomeWindow()
+    for key in ["prefetch_request", "prefetch_stats"]:
+        window.clear_property(key)
+    monkeypatch.setitem(xbmcaddon.settings, "prefetch_count", "2")
+    monkeypatch.setitem(xbmcaddon.settings, "use_cache", "true")
+    invalidate_settings()
+    yield window
+    invalidate_settings()
+
+
+def make_season(watched, unwatched):
+    item_details = ItemDetails()
+    item_details.watched_episodes = watched
+    item_details.unwatched_episodes = unwatched
+    return item_details
+
+
+def test_item_priority():
+    assert get_item_priority(make_season(2, 3)) == PRIORITY_IN_PROGRESS
+    assert get_item_priority(make_season(0, 3)) == PRIORITY_UNWATCHED
+    assert get_item_priority(make_season(3, 0)) == PRIORITY_OTHER
+
+
+def test_request_keeps_the_top_targets_in_order(home_window):
+    targets = []
+    add_prefetch_target(targets, PRIORITY_OTHER, "other")
+    add_prefetch_target(targets, PRIORITY_UNWATCHED, "unwatched 1")
+    add_prefetch_target(targets, PRIORITY_NEXT_PAGE, "next page", "Episode|name_format")
+    add_prefetch_target(targets, PRIORITY_UNWATCHED, "unwatched 2")
+    request_prefetch(targets)
+
+    request = json.loads(home_window.get_property("prefetch_request"))
+    assert request["targets"] == [["next page", "Episode|name_format"], ["unwatched 1", None]]
+
+
+def test_no_request_when_turned_off(home_window, monkeypatch):
+    monkeypatch.setitem(xbmcaddon.settings, "prefetch_count", "0")
+    invalidate_settings()
+    request_prefetch([(PRIORITY_OTHER, 0, "other", None)])
+    assert home_window.get_property("prefetch_request") == ""
+
+
+class FakePrefetch:
+    # stands in for DataManager.prefetch_items, fetches urls until block_at and then waits for release
+
+    def __init__(self, block_at=None):
+        self.urls = []
+        self.block_at = block_at
+        self.blocked = threading.Event()
+        self.release = threading.Event()
+
+    def prefetch_items(self, data_manager, url, gui_options):
+        self.urls.append(url)
+        if url == self.block_at:
+            self.blocked.set()
+            self.release.wait(5)
+        return True
+
+
+@pytest.fixture
+def prefetch_thread(home_window, monkeypatch):
+    monkeypatch.setattr(DownloadUtils, "get_server", lambda self: SERVER)
+    monkeypatch.setattr(circuit_breaker_module.circuit_breaker, "is_open", lambda: False)
+    monkeypatch.setattr(PrefetchThread, "start_delay", 0)
+    monkeypatch.setattr(PrefetchThread, "check_interval", 0.01)
+    thread = PrefetchThread()
+    yield thread
+    thread.stop()
+    thread.join(5)
+
+
+def use_prefetch(monkeypatch, fake_prefetch):
+    monkeypatch.setattr(DataManager, "prefetch_items",
+                        lambda self, url, gui_options: fake_prefetch.prefetch_items(self, url, gui_options))
+
+
+def wait_for(condition):
+    for index in range(500):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("timed out")
+
+
+def test_thread_fetches_the_requested_targets(home_window, prefetch_thread, monkeypatch):
+    fake_prefetch = FakePrefetch()
+    use_prefetch(monkeypatch, fake_prefetch)
+    request_prefetch([(PRIORITY_NEXT_PAGE, 0, "a", None), (PRIORITY_OTHER, 1, "b", None)])
+    prefetch_thread.start()
+
+    wait_for(lambda: get_prefetch_stats() == (2, 0))
+    assert fake_prefetch.urls == ["a", "b"]
+
+
+def test_newer_request_drops_the_rest_of_the_old_one(home_window, prefetch_thread, monkeypatch):
+    fake_prefetch = FakePrefetch(block_at="a")
+    use_prefetch(monkeypatch, fake_prefetch)
+    request_prefetch([(PRIORITY_NEXT_PAGE, 0, "a", None), (PRIORITY_OTHER, 1, "b", None)])
+    prefetch_thread.start()
+
+    assert fake_prefetch.blocked.wait(5)
+    # the user opened another directory while "a" was loading
+    home_window.set_property("prefetch_request", json.dumps({"id": "newer", "targets": [["c", None]]}))
+    fake_prefetch.release.set()
+
+    wait_for(lambda: get_prefetch_stats() == (2, 0))
+    assert fake_prefetch.urls == ["a", "c"]
+
+
+def test_nothing_is_fetched_while_the_server_is_down(home_window, prefetch_thread, monkeypatch):
+    fake_prefetch = FakePrefetch()
+    use_prefetch(monkeypatch, fake_prefetch)
+    monkeypatch.setattr(circuit_breaker_module.circuit_breaker, "is_open", lambda: True)
+    request_prefetch([(PRIORITY_NEXT_PAGE, 0, "a", None)])
+    prefetch_thread.start()
+
+    wait_for(lambda: prefetch_thread.last_request_id is not None)
+    threading.Event().wait(0.05)
+    assert fake_prefetch.urls == []
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    cache_store = CacheStore()
+    cache_store.db_file = str(tmp_path / "cache.db")
+    monkeypatch.setattr(datamanager, "cache_store", cache_store)
+    monkeypatch.setattr(DownloadUtils, "get_configured_server", lambda self: SERVER)
+    monkeypatch.setattr(DownloadUtils, "get_user_id", lambda self: USER_ID)
+    return cache_store
+
+
+def test_prefetched_list_is_saved_once_and_counted_when_used(home_window, store, monkeypatch):
+    url = "{server}/emby/Users/{userid}/Items?ParentId=p1&format=json"
+    downloads = []
+
+    def get_content(self, content_url):
+        downloads.append(content_url)
+        items = [{"Id": "i1", "Name": "One", "Type": "Movie"}]
+        return json.loads(json.dumps({"Items": items, "TotalRecordCount": 1}), object_hook=NoneDict)
+    monkeypatch.setattr(DataManager, "get_content", get_content)
+
+    gui_options = build_gui_options(SERVER)
+    assert DataManager().prefetch_items(url, gui_options)
+    # already in the cache
+    assert not DataManager().prefetch_items(url, gui_options)
+    assert len(downloads) == 1
+
+    url_hash = DataManager.get_url_hash(USER_ID, SERVER, url)
+    assert store.load(url_hash, USER_ID).prefetched
+
+    cache_file, item_list, total_records, cache_thread = DataManager().get_items(url, gui_options, use_cache=True)
+    assert [item.id for item in item_list] == ["i1"]
+    assert len(downloads) == 1
+    assert get_prefetch_stats() == (0, 1)
+    # saved again by the cache thread without the prefetched mark
+    assert cache_thread.save_needed and not cache_thread.cached_item.prefetched
+
+
+def test_list_cached_on_another_address_is_reloaded(home_window, store, monkeypatch):
+    url = "{server}/emby/Users/{userid}/Items?ParentId=p1&format=json"
+    downloads = []
+
+    def get_content(self, content_url):
+        downloads.append(content_url)
+        items = [{"Id": "i1", "Name": "One", "Type": "Movie"}]
+        return json.loads(json.dumps({"Items": items, "TotalRecordCount": 1}), object_hook=NoneDict)
+    monkeypatch.setattr(DataManager, "get_content", get_content)
+
+    assert DataManager().prefetch_items(url, build_gui_options("http://192.168.0.10:8096"))
+    # keyed on the configured server, the artwork urls point at the LAN address
+    cache_file, item_list, total_records, cache_thread = DataManager().get_items(url, build_gui_options(SERVER),
+                                                                                 use_cache=True)
+    assert len(downloads) == 2
+    assert cache_thread.cached_item.server == SERVER
@@ -0,0 +1,112 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import os
+import time
+
+import pytest
+
+from resources.lib.response_cache import ResponseCache
+
+URL_PATH = "/emby/Genres?format=json"
+
+
+class FakeResponse:
+
+    def __init__(self, headers):
+        self.headers = dict((name.lower(), value) for name, value in headers.items())
+
+    def getheader(self, name):
+        return self.headers.get(name.lower())
+
+
+@pytest.fixture
+def cache(tmp_path):
+    response_cache = ResponseCache()
+    response_cache.cache_dir = str(tmp_path / "response_cache")
+    return response_cache
+
+
+def reloaded(cache):
+    # another process, only the files on disk are shared
+    other = ResponseCache()
+    other.cache_dir = cache.cache_dir
+    return other
+
+
+def test_cacheable_urls():
+    assert ResponseCache.is_cacheable("/emby/Users/abc/Views?format=json")
+    assert ResponseCache.is_cacheable("/emby/Genres")
+    assert not ResponseCache.is_cacheable("/emby/Users/abc/Items?ParentId=1")
+    assert not ResponseCache.is_cacheable("/emby/GenresExtra")
+
+
+def test_etag_response_is_stored_and_revalidated(cache):
+    response = FakeResponse({"ETag": '"v1"', "Cache-Control": "max-age=60"})
+    assert cache.store("key", URL_PATH, b"body", response) == b"body"
+
+    entry = reloaded(cache).get("key")
+    assert entry["body"] == b"body"
+    assert cache.is_fresh(entry)
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+
+
+def test_last_modified_is_sent_back(cache):
+    response = FakeResponse({"Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"})
+    cache.store("key", URL_PATH, b"body", response)
+    entry = cache.get("key")
+    assert cache.conditional_headers(entry) == {"If-Modified-Since": "Sat, 17 Oct 2026 10:00:00 GMT"}
+
+
+def test_not_modified_keeps_the_body_and_takes_the_new_etag(cache):
+    cache.store("key", URL_PATH, b"body", FakeResponse({"ETag": '"v1"', "Cache-Control": "no-cache"}))
+    entry = cache.get("key")
+    assert not cache.is_fresh(entry)
+
+    body = cache.revalidated("key", entry, FakeResponse({"ETag": '"v2"', "Cache-Control": "max-age=60"}))
+    assert body == b"body"
+    entry = reloaded(cache).get("key")
+    assert entry["etag"] == '"v2"'
+    assert cache.is_fresh(entry)
+    assert cache.not_modified == 1
+
+
+def test_responses_without_validators_are_not_stored(cache):
+    cache.store("no_etag", URL_PATH, b"body", FakeResponse({"Cache-Control": "max-age=60"}))
+    cache.store("no_store", URL_PATH, b"body", FakeResponse({"ETag": '"v1"', "Cache-Control": "no-store"}))
+    cache.max_cache_bytes = 3
+    cache.store("too_big", URL_PATH, b"body", FakeResponse({"ETag": '"v1"'}))
+    for cache_key in ["no_etag", "no_store", "too_big"]:
+        assert cache.get(cache_key) is None
+    assert cache.misses == 3
+
+
+def test_default_max_age(cache):
+    before = time.time()
+    cache.store("key", URL_PATH, b"body", FakeResponse({"ETag": '"v1"'}))
+    fresh_until = cache.get("key")["fresh_until"]
+    assert before + cache.default_max_age <= fresh_until <= time.time() + cache.default_max_age
+
+
+def test_least_recently_used_files_are_evicted(cache):
+    response = FakeResponse({"ETag": '"v1"'})
+    cache.store("key0", URL_PATH, b"x" * 300, response)
+    # room for three entries
+    cache.max_cache_bytes = os.path.getsize(cache.get_file_path("key0")) * 3 + 100
+    for index in range(3):
+        cache.store("key%s" % index, URL_PATH, b"x" * 300, response)
+        # file times decide the order, make it plain
+        os.utime(cache.get_file_path("key%s" % index), (1000 + index, 1000 + index))
+    cache.hit("key0")
+
+    cache.store("key3", URL_PATH, b"x" * 300, response)
+    assert os.path.exists(cache.get_file_path("key0"))
+    assert not os.path.exists(cache.get_file_path("key1"))
+    assert os.path.exists(cache.get_file_path("key3"))
+    assert cache.evicted == 1
+    assert reloaded(cache).get("key1") is None
+
+
+def test_clear(cache):
+    cache.store("key", URL_PATH, b"body", FakeResponse({"ETag": '"v1"'}))
+    assert cache.clear() == 1
+    assert cache.get("key") is None
@@ -0,0 +1,87 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import threading
+
+import pytest
+
+from resources.lib.single_flight import SingleFlight
+
+WAITERS = 3
+
+
+def run_coalesced(single_flight, function):
+    # the leader blocks in function until every waiter has joined its call,
+    # returns the result or the exception of each caller
+    outcomes = []
+    outcomes_lock = threading.Lock()
+
+    def caller():
+        try:
+            outcome = single_flight.do("key", function)
+        except Exception as error:
+            outcome = error
+        with outcomes_lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=caller) for index in range(WAITERS + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return outcomes
+
+
+def wait_for_waiters(single_flight):
+    for index in range(1000):
+        with single_flight.lock:
+            call = single_flight.in_flight.get("key")
+            if call is not None and call.waiters == WAITERS:
+                return
+        threading.Event().wait(0.01)
+    raise AssertionError("the waiters did not join the call")
+
+
+def test_waiters_share_the_result():
+    single_flight = SingleFlight()
+    results = []
+    calls = []
+
+    def function():
+        calls.append(1)
+        wait_for_waiters(single_flight)
+        results.append(object())
+        return results[0]
+
+    outcomes = run_coalesced(single_flight, function)
+    assert len(calls) == 1
+    assert len(outcomes) == WAITERS + 1
+    assert all(outcome is results[0] for outcome in outcomes)
+    assert single_flight.saved == WAITERS
+    assert single_flight.in_flight == {}
+
+
+def test_waiters_get_the_leader_error():
+    single_flight = SingleFlight()
+    calls = []
+
+    def function():
+        calls.append(1)
+        wait_for_waiters(single_flight)
+        raise IOError("server down")
+
+    outcomes = run_coalesced(single_flight, function)
+    assert len(calls) == 1
+    assert len(outcomes) == WAITERS + 1
+    assert all(isinstance(outcome, IOError) and str(outcome) == "server down" for outcome in outcomes)
+    assert single_flight.in_flight == {}
+
+
+def test_failed_call_is_not_reused():
+    single_flight = SingleFlight()
+
+    def fail():
+        raise ValueError("bad response")
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", fail)
+    assert single_flight.do("key", lambda: "fresh") == "fresh"
@@ -0,0 +1,182 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import http.client
+import json
+import os
+import sys
+
+import pytest
+
+from resources.lib.kodi_utils import HomeWindow
+from resources.lib.traffic_capture import TrafficCapture
+
+from conftest import ADDON_DIR
+
+# replay.py and the benchmark module it uses live with the benchmarks, benchmark sets the plugin argv
+sys.path.insert(0, os.path.join(ADDON_DIR, "scripts", "benchmarks"))
+saved_argv = sys.argv
+import replay
+sys.argv = saved_argv
+
+USER_ID = "user1"
+PLUGIN_URL = "plugin://plugin.video.embycon/"
+ITEMS_PATH = "/emby/Users/user1/Items?ParentId=p1&format=json"
+ITEMS_BODY = json.dumps({"Items": [{"Id": "i1", "Name": "Holiday 2019", "Path": "/home/me/holiday.mkv"}]})
+
+
+@pytest.fixture
+def capture(tmp_path, monkeypatch):
+    traffic_capture = TrafficCapture()
+    traffic_capture.addon_dir = str(tmp_path)
+    traffic_capture.archive_file = str(tmp_path / "traffic_capture.jsonl.gz")
+    monkeypatch.setattr(sys, "argv", [PLUGIN_URL, "1", "?mode=GET_CONTENT&media_type=movies"])
+    HomeWindow().set_property("userid", USER_ID)
+    return traffic_capture
+
+
+def record(traffic_capture, path=ITEMS_PATH, body=ITEMS_BODY.encode("utf-8"), started=100.0, status=200,
+           headers=None, method="GET", post_body=None):
+    headers = headers or [("Content-Type", "application/json"), ("ETag", '"v1"'), ("Date", "today")]
+    traffic_capture.record(method, "{server}" + path, path, post_body, status, headers, body, len(body or b""),
+                           started, started + 0.02, started + 0.05)
+
+
+def test_entry_keeps_the_request_and_drops_the_private_parts(capture):
+    record(capture, path="/emby/Users/AuthenticateByName?format=json", method="POST", post_body="pw=secret",
+           body=b'{"AccessToken": "abc123", "User": {"Id": "user1"}}')
+    record(capture, path="/emby/Items/i1/Images/Primary", body=b"\x89PNG\xff")
+    capture.flush()
+
+    login, image = replay.load_archive(capture.archive_file)
+    assert login["source"] == PLUGIN_URL + "?mode=GET_CONTENT&media_type=movies"
+    assert login["body"] == '{"AccessToken": "", "User": {"Id": "user1"}}'
+    assert "secret" not in json.dumps(login)
+    assert login["headers"] == {"content-type": "application/json", "etag": '"v1"'}
+    assert abs(login["ttfb"] - 0.02) < 1e-6 and abs(login["latency"] - 0.05) < 1e-6
+    assert image["body_encoding"] == "base64"
+    assert replay.get_body(image) == b"\x89PNG\xff"
+
+
+def test_user_id_is_put_back_as_the_place_holder(capture):
+    record(capture)
+    capture.flush()
+    assert replay.load_archive(capture.archive_file)[0]["path"] == "/emby/Users/{userid}/Items?ParentId=p1&format=json"
+
+
+def test_flushes_append_to_the_archive(capture):
+    record(capture, started=200.0)
+    capture.flush()
+    # another process shares the archive
+    other = TrafficCapture()
+    # the process name is the pid and the start time, both are the same here
+    other.process = "other"
+    other.archive_file = capture.archive_file
+    record(other, started=100.0)
+    other.flush()
+    capture.flush()
+
+    entries = replay.load_archive(capture.archive_file)
+    assert [entry["started"] for entry in entries] == [100.0, 200.0]
+    assert entries[0]["process"] != entries[1]["process"]
+
+
+def test_full_archive_drops_new_requests(capture):
+    record(capture)
+    capture.flush()
+    capture.max_archive_bytes = 0
+    record(capture)
+    capture.flush()
+    assert len(replay.load_archive(capture.archive_file)) == 1
+    assert capture.open_body_file() is None
+
+
+def test_streamed_body_is_written_to_its_own_file(capture):
+    body_name, body_file = capture.open_body_file()
+    body_file.write(ITEMS_BODY[:10].encode("utf-8"))
+    body_file.write(ITEMS_BODY[10:].encode("utf-8"))
+    body_file.close()
+    capture.record("GET", "{server}" + ITEMS_PATH, ITEMS_PATH, None, 200, [], None, 50, 100.0, 100.1, 100.2,
+                   body_file=body_name)
+    capture.flush()
+
+    entry = replay.load_archive(capture.archive_file)[0]
+    assert "body" not in entry
+    assert entry["body_file"] == os.path.join(capture.addon_dir, body_name)
+    assert replay.get_body(entry) == ITEMS_BODY.encode("utf-8")
+
+
+def test_anonymize_scrubs_text_and_inlines_streamed_bodies(capture):
+    body_name, body_file = capture.open_body_file()
+    body_file.write(ITEMS_BODY.encode("utf-8"))
+    body_file.close()
+    capture.record("GET", "{server}" + ITEMS_PATH, ITEMS_PATH, None, 200, [], None, 50, 100.0, 100.1, 100.2,
+                   body_file=body_name)
+    record(capture, path="/emby/Items/i1/Images/Primary", body=b"\x89PNG\xff", started=101.0)
+    record(capture, path="/emby/Users/user1/Items?SearchTerm=holiday&format=json", started=102.0)
+    capture.flush()
+
+    streamed, image, search = replay.anonymize(replay.load_archive(capture.archive_file))
+    assert "body_file" not in streamed
+    item = json.loads(streamed["body"])["Items"][0]
+    assert item["Id"] == "i1"
+    assert item["Name"] != "Holiday 2019" and item["Path"] != "/home/me/holiday.mkv"
+    # the same text always scrubs to the same words
+    assert item["Name"] == json.loads(search["body"])["Items"][0]["Name"]
+    assert image["body"] is None and "body_encoding" not in image
+    assert "holiday" not in search["path"].lower()
+
+
+def make_entries(capture):
+    record(capture, started=100.0)
+    record(capture, started=101.0, body=ITEMS_BODY.replace("2019", "2020").encode("utf-8"))
+    record(capture, path="/emby/Users/user1/Items?ParentId=p1&StartIndex=0&format=json", started=102.0,
+           body=b'{"Items": []}')
+    record(capture, path="/emby/Users/user1/Views?format=json", status=304, started=103.0, body=None,
+           headers=[("ETag", '"v1"')])
+    capture.flush()
+    return replay.load_archive(capture.archive_file)
+
+
+def test_replay_server_answers_in_recorded_order(capture):
+    replay_server = replay.ReplayServer(make_entries(capture))
+    try:
+        request_path = ITEMS_PATH.replace(USER_ID, replay.benchmark.USER_ID)
+        assert replay_server.find("GET", request_path, b"")["started"] == 100.0
+        assert replay_server.find("GET", request_path, b"")["started"] == 101.0
+        # the last answer is kept for any more
+        assert replay_server.find("GET", request_path, b"")["started"] == 101.0
+        replay_server.rewind()
+        assert replay_server.find("GET", request_path, b"")["started"] == 100.0
+
+        # a changed query gets the closest recorded request on the path
+        assert replay_server.find("GET", request_path + "&StartIndex=0&Limit=50", b"")["started"] == 102.0
+        assert replay_server.find("GET", "/emby/Genres?format=json", b"") is None
+        assert replay_server.requests == {"exact": 4, "inexact": 1, "missing": 1}
+    finally:
+        replay_server.server.server_close()
+
+
+def test_replay_server_serves_the_recorded_responses(capture):
+    replay_server = replay.ReplayServer(make_entries(capture), latency_scale=0)
+    # start() would also point the add-on settings at it
+    replay_server.thread.start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", replay_server.port, timeout=5)
+        conn.request("GET", ITEMS_PATH.replace(USER_ID, replay.benchmark.USER_ID), headers={"Accept-Encoding": "gzip"})
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.read() == ITEMS_BODY.encode("utf-8")
+
+        # recorded as a revalidation, a client without the cached copy gets the body
+        conn.request("GET", "/emby/Users/%s/Views?format=json" % replay.benchmark.USER_ID)
+        response = conn.getresponse()
+        assert response.status == 200
+        response.read()
+        conn.request("GET", "/emby/Users/%s/Views?format=json" % replay.benchmark.USER_ID,
+                     headers={"If-None-Match": '"v1"'})
+        response = conn.getresponse()
+        assert response.status == 304
+        response.read()
+        conn.close()
+    finally:
+        replay_server.stop()